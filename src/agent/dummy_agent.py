@@ -22,8 +22,19 @@ from src.agent.tools.human_in_the_loop.human_in_the_loop import(
 
 from src.agent.tools.navigation import get_navigation_tools, get_file_management_tools
 from src.agent.tools.github import (
-    git_clone_tool,
+    git_clone_async_tool,
+    list_branch_worktrees,
+    prune_branch_worktrees,
+)
+from src.agent.tools.extraction_tools import (
     extract_repository_details,
+    extract_repositories_batch,
+    extract_monorepo_projects,
+    start_extraction_job,
+    get_extraction_job_status,
+    get_extraction_job_partial_results,
+    cancel_extraction_job,
+    expand_repository_tree,
     load_extracted_repository
 )
 
@@ -39,8 +50,11 @@ from src.agent.tools.archlens import (
 navigation_tools = get_navigation_tools()
 file_management_tools = get_file_management_tools()
 drawing_tools = get_drawing_tools()
-tools = [git_clone_tool,
-         extract_repository_details,
+tools = [git_clone_async_tool, list_branch_worktrees, prune_branch_worktrees,
+         extract_repository_details, extract_repositories_batch, extract_monorepo_projects,
+         start_extraction_job, get_extraction_job_status,
+         get_extraction_job_partial_results, cancel_extraction_job,
+         expand_repository_tree,
          load_extracted_repository, run_archlens, init_archlens,
          read_archlens_config_file, write_archlens_config_file,
          create_archlens_config_object, add_view_to_archlens_config_object]  + \
@@ -1,3 +1,12 @@
 """Tool configurations, constants, and shared settings."""
 
 GITINGEST_DEFAULT_OUTPUT_LOCATION = "extract_repository_details.json"
+EXTRACTION_DEFAULT_OUTPUT_LOCATION = "extract_repository_details.ndjson"
+EXTRACTION_COMPRESSED_OUTPUT_LOCATION = "extract_repository_details.ndjson.z"
+# Default artifact name when extracting a git revision instead of the working tree
+REVISION_OUTPUT_LOCATION = "extract_repository_details@{revision}.ndjson"
+# Index linking the per-project artifacts of a monorepo extraction
+PROJECT_INDEX_LOCATION = "extract_repository_details.projects.json"
+
+# Seconds after which an asynchronous clone is aborted
+DEFAULT_CLONE_TIMEOUT = 30 * 60
@@ -0,0 +1,39 @@
+"""
+src.agent.tools.extraction - building blocks for extracting repositories
+into an LLM readable format (filesystem walk, incremental cache, streaming
+artifacts, git revisions, digests, background jobs, content pruning, compact views,
+secret redaction, monorepo projects).
+"""
+from .artifact import ArtifactReader, write_artifact
+from .cache import ExtractionCache
+from .compaction import render_view
+from .digest import build_digest, rank_files
+from .filesystem import build_file_tree, iter_file_nodes
+from .git_objects import GitObjectReader, iter_revision_extraction
+from .jobs import ExtractionJob, start_job, get_job
+from .pipeline import iter_extraction, collect_extraction
+from .projects import Project, find_projects
+from .pruning import ContentPruner
+from .secrets import SecretRedactor
+
+__all__ = [
+    "ArtifactReader",
+    "write_artifact",
+    "ExtractionCache",
+    "render_view",
+    "build_digest",
+    "rank_files",
+    "build_file_tree",
+    "iter_file_nodes",
+    "GitObjectReader",
+    "iter_revision_extraction",
+    "ExtractionJob",
+    "start_job",
+    "get_job",
+    "iter_extraction",
+    "collect_extraction",
+    "Project",
+    "find_projects",
+    "ContentPruner",
+    "SecretRedactor",
+]
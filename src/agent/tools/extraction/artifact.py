@@ -0,0 +1,340 @@
+"""
+Streaming extraction artifacts.
+
+An artifact is an NDJSON file holding one extraction record per line (see
+`pipeline.py`) and a sidecar index `{artifact}.index.json` mapping the tree,
+the summary and every file path to the byte offset and length of its record.
+The index also holds per-directory aggregates for the collapsed tree view
+(see `tree_view.py`).
+Readers memory-map the artifact and slice out only the records they need,
+so the rest is neither read into memory nor parsed. The index records the
+size and mtime of its artifact, so a reader never pairs an artifact with the
+index of another extraction written to the same path.
+
+A compressed artifact (`.ndjson.z`) stores the same lines in independently
+zlib-compressed blocks. The index then also lists the blocks, and every entry
+points to a block and an offset inside it, so reading one file only inflates
+the block holding it.
+"""
+import json
+import mmap
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+
+from pathspec import PathSpec
+
+from src.agent.tools.extraction.config import (
+    ARTIFACT_EXTENSION,
+    ARTIFACT_INDEX_SUFFIX,
+    ARTIFACT_FORMAT_VERSION,
+    ARTIFACT_BLOCK_SIZE,
+    ARTIFACT_BLOCK_CACHE_SIZE,
+    ARTIFACT_COMPRESSION_LEVEL,
+    ARTIFACT_OPEN_ATTEMPTS,
+    ARTIFACT_OPEN_RETRY_SECONDS,
+    COMPRESSED_ARTIFACT_EXTENSION,
+    COLLAPSED_TREE_DEPTH,
+    COLLAPSED_TREE_MAX_ENTRIES,
+)
+from src.agent.tools.extraction.compaction import render_view
+from src.agent.tools.extraction.tree_view import DirectoryAggregates, render_tree_view
+
+
+def index_path_for(artifact_path: str) -> str:
+    """Return the path of the sidecar index belonging to an artifact."""
+    return artifact_path + ARTIFACT_INDEX_SUFFIX
+
+
+def is_artifact_path(path: str) -> bool:
+    """Return True if the path names a streaming artifact rather than a legacy JSON file."""
+    return path.endswith((ARTIFACT_EXTENSION, COMPRESSED_ARTIFACT_EXTENSION))
+
+
+def is_compressed_artifact_path(path: str) -> bool:
+    """Return True if the path names a block-compressed streaming artifact."""
+    return path.endswith(COMPRESSED_ARTIFACT_EXTENSION)
+
+
+def partial_path_for(artifact_path: str, writer_id: str) -> str:
+    """Return the path one writer writes an artifact to until it is complete."""
+    return f"{artifact_path}.{writer_id}.tmp"
+
+
+def write_artifact(
+    artifact_path: str,
+    records: Iterable[Dict[str, Any]],
+    on_record: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    partial_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Write extraction records to an artifact as they are produced.
+
+    Args:
+        artifact_path: Destination NDJSON file; a `.ndjson.z` path is block-compressed.
+        records: Extraction records (tree, files, summary) in any order.
+        on_record: Called with every record and its index entry once it is written.
+            Lines of a plain artifact are flushed to the partial file before the
+            call, so they can already be read there.
+        partial_path: File the artifact is written to until it is complete
+            (default: a `partial_path_for` the artifact unique to this call).
+
+    Returns:
+        The index written next to the artifact.
+    """
+    index: Dict[str, Any] = {
+        "version": ARTIFACT_FORMAT_VERSION,
+        "summary": None,
+        "tree": None,
+        "files": [],
+    }
+    aggregates = DirectoryAggregates()
+    tmp_path = partial_path or partial_path_for(artifact_path, uuid.uuid4().hex[:12])
+    try:
+        with open(tmp_path, "wb") as f:
+            blocks = _BlockWriter(f) if is_compressed_artifact_path(artifact_path) else None
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                if blocks is not None:
+                    entry = blocks.add(line)
+                else:
+                    entry = {"offset": f.tell(), "length": len(line)}
+                    f.write(line)
+                if record["type"] == "file":
+                    entry = {
+                        "path": record["path"],
+                        **entry,
+                        "bytes": len(record["content"].encode("utf-8")),
+                        "tokens": record.get("tokens"),
+                    }
+                    if "pruned" in record:
+                        entry["pruned"] = record["pruned"]
+                    index["files"].append(entry)
+                    aggregates.add(record["path"], record.get("original_bytes", entry["bytes"]),
+                                   record["content"], record.get("pruned"))
+                else:
+                    index[record["type"]] = entry
+                if record["type"] == "tree" and record.get("pruned"):
+                    # Files pruned without a record still count in (and show in) the tree
+                    index["pruned"] = record["pruned"]
+                    for pruned in record["pruned"]:
+                        aggregates.add(pruned["path"], pruned["bytes"], "", pruned["pruned"])
+                if on_record is not None:
+                    if blocks is None:
+                        f.flush()
+                    on_record(record, entry)
+            if blocks is not None:
+                index["compression"] = "zlib"
+                index["blocks"] = blocks.close()
+        index["directories"] = aggregates.directories
+        stat = os.stat(tmp_path)
+        index["artifact"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        index_tmp_path = index_path_for(tmp_path)
+        with open(index_tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+    except BaseException:
+        # Never leave a half written artifact behind (failures, cancellation)
+        for path in (tmp_path, index_path_for(tmp_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    # The renames keep the size and mtime the index records, which readers check
+    os.replace(tmp_path, artifact_path)
+    os.replace(index_tmp_path, index_path_for(artifact_path))
+    return index
+
+
+class ArtifactReader:
+    """Random access reader for a streaming extraction artifact."""
+
+    def __init__(self, artifact_path: str):
+        """
+        Open an artifact and its index.
+
+        Raises:
+            ValueError: If the artifact does not belong to its index (e.g. an
+                extraction was interrupted between writing the two).
+        """
+        self.path = artifact_path
+        for attempt in range(ARTIFACT_OPEN_ATTEMPTS):
+            with open(index_path_for(artifact_path), "r", encoding="utf-8") as f:
+                self.index: Dict[str, Any] = json.load(f)
+            with open(artifact_path, "rb") as f:
+                if _matches_index(os.fstat(f.fileno()), self.index):
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    break
+            # A writer may be between replacing the artifact and its index
+            if attempt + 1 < ARTIFACT_OPEN_ATTEMPTS:
+                time.sleep(ARTIFACT_OPEN_RETRY_SECONDS)
+        else:
+            raise ValueError(f"{artifact_path} does not match its index, extract it again")
+        self._offsets = {entry["path"]: entry for entry in self.index["files"]}
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+
+    def __enter__(self) -> "ArtifactReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory map of the artifact."""
+        self._map.close()
+
+    def tree_view(self, subtree: str = "", depth: int = COLLAPSED_TREE_DEPTH,
+                  max_entries: int = COLLAPSED_TREE_MAX_ENTRIES) -> str:
+        """Render a collapsed view of a subtree with per-directory aggregates."""
+        directories = self.index.get("directories")
+        if directories is None:
+            # Written before aggregates were indexed: compute them from the records
+            aggregates = DirectoryAggregates()
+            for record in self.iter_files():
+                aggregates.add(record["path"], len(record["content"].encode("utf-8")),
+                               record["content"])
+            directories = self.index["directories"] = aggregates.directories
+        return render_tree_view(directories, self.index["files"] + self.index.get("pruned", []),
+                                subtree, depth, max_entries)
+
+    @property
+    def paths(self) -> List[str]:
+        """All file paths in the artifact, in content order."""
+        return [entry["path"] for entry in self.index["files"]]
+
+    def summary(self) -> Optional[str]:
+        """Return the extraction summary."""
+        record = self._read(self.index.get("summary"))
+        return record["summary"] if record else None
+
+    def tree(self) -> Optional[str]:
+        """Return the directory tree."""
+        record = self._read(self.index.get("tree"))
+        return record["tree"] if record else None
+
+    def file(self, path: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a single file, or None if it is not in the artifact."""
+        return self._read(self._offsets.get(path))
+
+    def iter_files(self, paths: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield file records for the given paths (default: all files, in content order)."""
+        entries = self.index["files"] if paths is None else (
+            self._offsets[path] for path in paths if path in self._offsets
+        )
+        for entry in entries:
+            yield self._read(entry)
+
+    def select(  # pylint: disable=too-many-locals
+        self,
+        file_paths: Optional[Iterable[str]] = None,
+        include_patterns: Optional[Iterable[str]] = None,
+        exclude_patterns: Optional[Iterable[str]] = None,
+        max_bytes: Optional[int] = None,
+        view: str = "full",
+    ) -> Dict[str, Any]:
+        """
+        Select files by explicit path and/or glob patterns within a byte budget.
+
+        Only the index is consulted to make the selection; the records of the
+        selected files are then sliced out of the memory-mapped artifact.
+        With a compacted view, the budget applies to the compacted contents.
+
+        Args:
+            file_paths: Explicit paths to consider (default: every file, in content order).
+            include_patterns: Gitignore-style globs a path must match (e.g. "src/**/*.py").
+            exclude_patterns: Gitignore-style globs that drop a matching path.
+            max_bytes: Maximum total content size in bytes; files that do not fit
+                are skipped and counted as omitted.
+            view: "full", "compact" or "skeleton" (see compaction.py).
+
+        Returns:
+            A dict with files (path -> content), missing (explicit paths not in the
+            artifact) and omitted (number of matching files left out by the budget).
+        """
+        if file_paths is None:
+            candidates, missing = list(self.index["files"]), []
+        else:
+            file_paths = list(file_paths)
+            candidates = [self._offsets[p] for p in file_paths if p in self._offsets]
+            missing = [p for p in file_paths if p not in self._offsets]
+
+        include_spec = PathSpec.from_lines("gitwildmatch", include_patterns or [])
+        exclude_spec = PathSpec.from_lines("gitwildmatch", exclude_patterns or [])
+        candidates = [
+            entry for entry in candidates
+            if (not include_patterns or include_spec.match_file(entry["path"]))
+            and not (exclude_patterns and exclude_spec.match_file(entry["path"]))
+        ]
+
+        files, used, omitted = {}, 0, 0
+        for entry in candidates:
+            content = None
+            if view != "full":
+                content = render_view(entry["path"], self._read(entry)["content"], view)
+            size = entry.get("bytes", entry["length"]) if content is None else len(
+                content.encode("utf-8"))
+            if max_bytes is not None and used + size > max_bytes:
+                omitted += 1
+                continue
+            used += size
+            files[entry["path"]] = self._read(entry)["content"] if content is None else content
+
+        return {"files": files, "missing": missing, "omitted": omitted}
+
+    def _read(self, entry: Optional[Dict[str, int]]) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        start = entry["offset"]
+        if "block" in entry:
+            return json.loads(self._block(entry["block"])[start:start + entry["length"]])
+        return json.loads(self._map[start:start + entry["length"]])
+
+    def _block(self, number: int) -> bytes:
+        """Return an inflated block, keeping the most recently used ones around."""
+        if number in self._blocks:
+            self._blocks.move_to_end(number)
+            return self._blocks[number]
+        block = self.index["blocks"][number]
+        data = zlib.decompress(self._map[block["offset"]:block["offset"] + block["length"]])
+        self._blocks[number] = data
+        if len(self._blocks) > ARTIFACT_BLOCK_CACHE_SIZE:
+            self._blocks.popitem(last=False)
+        return data
+
+
+def _matches_index(stat: os.stat_result, index: Dict[str, Any]) -> bool:
+    """Whether an artifact file is the one an index was written for."""
+    expected = index.get("artifact")
+    # Indexes written before they recorded their artifact are trusted
+    return expected is None or (stat.st_size == expected["size"]
+                                and stat.st_mtime_ns == expected["mtime_ns"])
+
+
+class _BlockWriter:
+    """Packs artifact lines into independently compressed blocks."""
+
+    def __init__(self, f: BinaryIO):
+        self._file = f
+        self._buffer = bytearray()
+        self._blocks: List[Dict[str, int]] = []
+
+    def add(self, line: bytes) -> Dict[str, int]:
+        """Append a line and return its index entry (block number, offset and length)."""
+        if self._buffer and len(self._buffer) + len(line) > ARTIFACT_BLOCK_SIZE:
+            self._flush()
+        entry = {"block": len(self._blocks), "offset": len(self._buffer), "length": len(line)}
+        self._buffer += line
+        return entry
+
+    def close(self) -> List[Dict[str, int]]:
+        """Write the last block and return the file offset and length of every block."""
+        if self._buffer:
+            self._flush()
+        return self._blocks
+
+    def _flush(self) -> None:
+        data = zlib.compress(bytes(self._buffer), ARTIFACT_COMPRESSION_LEVEL)
+        self._blocks.append({"offset": self._file.tell(), "length": len(data)})
+        self._file.write(data)
+        self._buffer.clear()
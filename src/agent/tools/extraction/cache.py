@@ -0,0 +1,328 @@
+"""
+Per-repository, content-addressed extraction cache.
+
+Rendered file contents are stored once per git blob SHA under
+`{EXTRACTION_CACHE_ROOT}/{repository}/objects/`. A manifest maps every
+extracted path to its blob SHA, size, mtime and token count, so a
+re-extraction only reads and renders files whose content actually changed.
+Caches of repositories not extracted for a while are evicted (see
+`evict_cache_entries`).
+
+Several runs (an extraction and a prefetch, possibly in other processes) may
+use the cache of a repository at the same time: each holds a shared lock on
+it, and objects are only pruned by a run that finds itself alone. Where file
+locks are not available (Windows), runs do not see each other and objects are
+left to cache eviction instead of being pruned.
+
+Blob SHAs are taken from the git index for tracked, unmodified files, from
+the manifest when size and mtime are unchanged, and are otherwise computed
+from the file bytes (same SHA as `git hash-object`), which the extraction
+pipeline leaves to its rendering workers.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import IO, Any, Dict, Optional, Tuple
+
+from gitingest.schemas import FileSystemNode, FileSystemNodeType
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+from src.agent.tools.extraction.config import (
+    EXTRACTION_CACHE_ROOT,
+    CACHE_LOCK_NAME,
+    CACHE_MANIFEST_NAME,
+    CACHE_OBJECTS_DIR,
+)
+from src.agent.tools.extraction.filesystem import format_content_string, relative_posix_path
+from src.agent.tools.extraction.util import git_blob_sha, count_tokens
+from src.agent.tools.navigation.config import CACHE_MAX_AGE_SECONDS, CACHE_MAX_ENTRIES
+from src.agent.tools.navigation.util import evict_cache_entries
+
+GITLINK_MODE = "160000"
+
+
+class ExtractionCache:  # pylint: disable=too-many-instance-attributes
+    """Content-addressed cache of rendered file contents for one repository."""
+
+    def __init__(self, repository_path: str, cache_root: Optional[Path] = None):
+        """
+        Open (or create) the cache belonging to a repository.
+
+        Args:
+            repository_path: Absolute path of the directory being extracted.
+            cache_root: Directory holding all caches (default: EXTRACTION_CACHE_ROOT).
+        """
+        self.root = Path(cache_root or EXTRACTION_CACHE_ROOT) / cache_name(repository_path)
+        evict_cache_entries(self.root.parent, self.root, CACHE_MAX_ENTRIES, CACHE_MAX_AGE_SECONDS)
+        self.manifest: Dict[str, Dict[str, Any]] = self._load_manifest()
+        self._next_manifest: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, os.stat_result] = {}
+        self._git_blobs = read_git_blob_shas(Path(repository_path))
+        self.hits = 0
+        self.misses = 0
+        self._lock_file: Optional[IO[bytes]] = None
+
+    @property
+    def objects_dir(self) -> Path:
+        """Directory holding the rendered file contents, one file per object."""
+        return self.root / CACHE_OBJECTS_DIR
+
+    @property
+    def manifest_path(self) -> Path:
+        """Path of the manifest describing the latest extraction."""
+        return self.root / CACHE_MANIFEST_NAME
+
+    def start_run(self, wait: bool = True) -> bool:
+        """
+        Register a run (an extraction or a prefetch) on the cache until `finish_run`.
+
+        Args:
+            wait: If False, the run only starts when no other run of the repository
+                is active, and False is returned otherwise.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.root / CACHE_LOCK_NAME, "ab")  # pylint: disable=consider-using-with
+        if not wait and _lock_alone(lock_file) is False:
+            lock_file.close()
+            return False
+        # Shared, so extractions starting in the meantime do not wait for this run
+        _lock_shared(lock_file)
+        self._lock_file = lock_file
+        return True
+
+    def finish_run(self) -> None:
+        """Unregister the run started by `start_run`."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def render(self, node: FileSystemNode) -> Tuple[str, int]:
+        """
+        Return the content of a file node and the token count of its rendered block.
+
+        Unchanged files are served from the cache without being read.
+        """
+        if node.type == FileSystemNodeType.SYMLINK:
+            return "", count_tokens(format_content_string(node, ""))
+
+        object_id, cached = self.lookup(node)
+        content = self.load(object_id) if cached else None
+        if content is None:
+            content = node.content
+            self.store(object_id, content)
+        return content, self.record(node, object_id, content)
+
+    def lookup(self, node: FileSystemNode,
+               defer_hashing: bool = False) -> Tuple[Optional[str], bool]:
+        """
+        Return the object id of a file node and whether its content is cached.
+
+        Every looked up node must be passed to `record` to stay in the manifest.
+        With `defer_hashing`, a file whose blob SHA is not known without reading it
+        gets None as object id: the caller computes it with `object_id_for`
+        (e.g. in a worker process) and passes it to `resolve`.
+        """
+        rel_path = relative_posix_path(node)
+        stat = node.path.stat()
+        self._stats[rel_path] = stat
+        sha = self._known_blob_sha(rel_path, stat, self.manifest.get(rel_path))
+        if sha is None and defer_hashing:
+            return None, False
+        object_id = object_id_for(node.path, sha)
+        return object_id, self.resolve(object_id)
+
+    def resolve(self, object_id: str) -> bool:
+        """Return whether the content of an object is cached, counting hits and misses."""
+        cached = self._object_path(object_id).exists()
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return cached
+
+    def load(self, object_id: str) -> Optional[str]:
+        """Return the cached content of an object, or None if it is not cached."""
+        return self._read_object(object_id)
+
+    def store(self, object_id: str, content: str) -> None:
+        """Store the rendered content of an object that `lookup` missed."""
+        self._write_object(object_id, content)
+
+    def record(self, node: FileSystemNode, object_id: str, content: str,
+               tokens: Optional[int] = None) -> int:
+        """
+        Add a looked up node to the next manifest and return its token count.
+
+        The token count is reused from the manifest when the object is unchanged,
+        taken from `tokens` when given, and counted otherwise.
+        """
+        rel_path = relative_posix_path(node)
+        previous = self.manifest.get(rel_path)
+        if previous and previous.get("object") == object_id and "tokens" in previous:
+            tokens = previous["tokens"]
+        elif tokens is None:
+            tokens = count_tokens(format_content_string(node, content))
+
+        stat = self._stats.pop(rel_path)
+        self._next_manifest[rel_path] = {
+            "object": object_id,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "tokens": tokens,
+        }
+        return tokens
+
+    def save(self) -> None:
+        """
+        Persist the manifest of the latest extraction and drop unreferenced objects.
+
+        Objects are only dropped when no other run holds the cache, since it may
+        still store or reference them; a later run prunes them otherwise.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = _tmp_path(self.manifest_path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._next_manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        self.manifest = self._next_manifest
+        self._next_manifest = {}
+
+        started = self._lock_file is not None
+        if not started:
+            self.start_run()
+        try:
+            if _lock_alone(self._lock_file):
+                self._prune_objects()
+        finally:
+            _lock_shared(self._lock_file)
+            if not started:
+                self.finish_run()
+
+    def _known_blob_sha(self, rel_path: str, stat: os.stat_result,
+                        previous: Optional[Dict[str, Any]]) -> Optional[str]:
+        if rel_path in self._git_blobs:
+            return self._git_blobs[rel_path]
+        if (previous and previous.get("size") == stat.st_size
+                and previous.get("mtime_ns") == stat.st_mtime_ns):
+            return previous["object"].removesuffix("-nb")
+        return None
+
+    def _object_path(self, object_id: str) -> Path:
+        return stored_object_path(self.objects_dir, object_id)
+
+    def _read_object(self, object_id: str) -> Optional[str]:
+        try:
+            return self._object_path(object_id).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _write_object(self, object_id: str, content: str) -> None:
+        object_path = self._object_path(object_id)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _tmp_path(object_path)
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, object_path)
+
+    def _prune_objects(self) -> None:
+        if not self.objects_dir.exists():
+            return
+        referenced = {entry["object"] for entry in self.manifest.values()}
+        for object_path in self.objects_dir.glob("*/*"):
+            if object_path.parent.name + object_path.name not in referenced:
+                object_path.unlink(missing_ok=True)
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+
+def _lock_shared(lock_file: IO[bytes]) -> None:
+    """Hold a shared lock on the lock file of a cache (no-op without `fcntl`)."""
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+
+
+def _lock_alone(lock_file: IO[bytes]) -> Optional[bool]:
+    """
+    Try to hold the lock file of a cache exclusively, without waiting.
+
+    Returns:
+        Whether no other run holds the cache, or None if that cannot be told
+        (no `fcntl`).
+    """
+    if fcntl is None:
+        return None
+    try:
+        # Converting a shared lock fails while another run holds the cache
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _tmp_path(path: Path) -> Path:
+    """Return a temporary file name next to `path`, unique to this process and thread."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def object_id_for(path: Path, sha: Optional[str] = None) -> str:
+    """Return the cache object id of a file, hashing its bytes unless its blob SHA is given."""
+    sha = sha or git_blob_sha(path.read_bytes())
+    return sha + ("-nb" if path.suffix == ".ipynb" else "")
+
+
+def stored_object_path(objects_dir: Path, object_id: str) -> Path:
+    """Return where the content of an object is stored in an objects directory."""
+    return objects_dir / object_id[:2] / object_id[2:]
+
+
+def cache_name(repository_path: str) -> str:
+    """Return a stable, readable cache directory name for a repository path."""
+    resolved = str(Path(repository_path).resolve())
+    digest = hashlib.sha1(resolved.encode("utf-8"), usedforsecurity=False).hexdigest()[:12]
+    return f"{Path(resolved).name}-{digest}"
+
+
+def read_git_blob_shas(repository_path: Path) -> Dict[str, str]:
+    """
+    Map paths (relative to repository_path) of tracked, unmodified files to their blob SHA.
+
+    Returns an empty dict when the directory is not inside a git work tree.
+    """
+    staged = _run_git(repository_path, "ls-files", "-s", "-z")
+    if staged is None:
+        return {}
+    modified_output = _run_git(repository_path, "ls-files", "-m", "-z") or ""
+    modified = set(filter(None, modified_output.split("\0")))
+
+    blobs = {}
+    for entry in filter(None, staged.split("\0")):
+        info, path = entry.split("\t", 1)
+        mode, sha, _ = info.split(" ", 2)
+        if mode != GITLINK_MODE and path not in modified:
+            blobs[path] = sha
+    return blobs
+
+
+def _run_git(cwd: Path, *args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(cwd), *args],
+            capture_output=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode("utf-8", errors="surrogateescape")
@@ -0,0 +1,266 @@
+"""
+Token-compact views of extracted file contents.
+
+Architecture questions rarely need comments or function bodies, so file
+contents can be served in one of three views:
+
+- "full": the content as extracted.
+- "compact": comments, docstrings and blank lines stripped (blank runs are only
+  collapsed in prose such as Markdown).
+- "skeleton": imports and the headers of classes and functions only. Python is
+  parsed with `ast`; brace languages (Java, Go, JS/TS, Rust, C#, ...) go through a
+  small tokenizer that keeps type bodies and elides function bodies as `{ ... }`;
+  Markdown keeps its headings. Other files fall back to the compact view.
+
+Views are computed when files are loaded, so the artifact keeps the full text.
+"""
+import ast
+import copy
+import io
+import posixpath
+import re
+import tokenize
+from typing import List, Optional, Set, Tuple
+
+from src.agent.tools.extraction.tree_view import PLACEHOLDER_CONTENTS
+
+VIEWS = ("full", "compact", "skeleton")
+
+PYTHON_SUFFIXES = (".py", ".pyi")
+C_STYLE_SUFFIXES = (
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".java", ".kt", ".kts", ".scala", ".groovy",
+    ".gradle", ".go", ".rs", ".swift", ".dart", ".php", ".js", ".jsx", ".mjs", ".cjs", ".ts",
+    ".tsx", ".proto",
+)
+HASH_SUFFIXES = (
+    ".sh", ".bash", ".zsh", ".rb", ".pl", ".r", ".yaml", ".yml", ".toml", ".tf", ".cmake",
+)
+HASH_NAMES = ("Dockerfile", "Makefile", "Gemfile", "Rakefile", "CMakeLists.txt")
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+
+# A block opened after one of these keywords is a type whose members stay in the skeleton
+TYPE_DECLARATION_REGEX = re.compile(
+    r"\b(?:class|interface|struct|enum|union|namespace|trait|impl|module|object|record"
+    r"|protocol|extension|service|message)\b"
+)
+STRING_REGEX = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`')
+
+
+def render_view(path: str, content: str, view: str) -> str:
+    """
+    Return the content of a file in the requested view.
+
+    Raises:
+        ValueError: If `view` is not one of VIEWS.
+    """
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view: {view!r} (expected one of {', '.join(VIEWS)})")
+    if view == "full" or content in PLACEHOLDER_CONTENTS or content.startswith("[Duplicate of"):
+        return content
+    if view == "compact":
+        return compact_content(path, content)
+    return skeleton_content(path, content)
+
+
+def compact_content(path: str, content: str) -> str:
+    """Strip comments, docstrings and blank lines from a file."""
+    if path.endswith(PYTHON_SUFFIXES):
+        compacted = _compact_python(content)
+        if compacted is not None:
+            return compacted
+    marker = _comment_marker(path)
+    if marker is None:
+        return _collapse_blank_runs(content)
+    return _drop_blank_lines(_strip_comments(content, marker))
+
+
+def skeleton_content(path: str, content: str) -> str:
+    """Return only the imports and class/function headers of a file."""
+    if path.endswith(PYTHON_SUFFIXES):
+        skeleton = _skeleton_python(content)
+        if skeleton is not None:
+            return skeleton
+    elif path.endswith(C_STYLE_SUFFIXES):
+        return _skeleton_braces(_drop_blank_lines(_strip_comments(content, "//")))
+    elif path.endswith(MARKDOWN_SUFFIXES):
+        return _skeleton_markdown(content)
+    return compact_content(path, content)
+
+
+def _comment_marker(path: str) -> Optional[str]:
+    """Return the line comment marker of a file's language, if it is known."""
+    if path.endswith(C_STYLE_SUFFIXES):
+        return "//"
+    if path.endswith(HASH_SUFFIXES + PYTHON_SUFFIXES) or posixpath.basename(path) in HASH_NAMES:
+        return "#"
+    return None
+
+
+def _compact_python(content: str) -> Optional[str]:
+    """Drop comments and docstrings using the tokenizer and the AST; None if it does not parse."""
+    try:
+        tree = ast.parse(content)
+        comments = [token.start for token in tokenize.generate_tokens(io.StringIO(content).readline)
+                    if token.type == tokenize.COMMENT]
+    except (SyntaxError, ValueError, tokenize.TokenError):
+        return None
+
+    lines = content.split("\n")
+    # Docstrings standing alone on their lines; a body of only a docstring becomes `...`
+    dropped: Set[int] = set()
+    for first, last, replace in _python_docstrings(tree):
+        dropped.update(range(first, last + 1))
+        if replace:
+            indent = lines[first - 1][:len(lines[first - 1]) - len(lines[first - 1].lstrip())]
+            lines[first - 1] = indent + "..."
+            dropped.discard(first)
+    for row, col in comments:
+        lines[row - 1] = lines[row - 1][:col]
+
+    return _drop_blank_lines("\n".join(line for number, line in enumerate(lines, 1)
+                                       if number not in dropped))
+
+
+def _python_docstrings(tree: ast.AST) -> List[Tuple[int, int, bool]]:
+    """
+    Return (first line, last line, is the whole body) of every docstring on lines of its own.
+
+    Docstrings sharing a line with their header (a one-line class or function) or
+    with the next statement are kept, since dropping their lines would drop code.
+    """
+    docstrings = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        body = node.body
+        if not (body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            continue
+        on_header_line = not isinstance(node, ast.Module) and body[0].lineno <= node.lineno
+        if on_header_line or (len(body) > 1 and body[1].lineno <= body[0].end_lineno):
+            continue
+        docstrings.append((body[0].lineno, body[0].end_lineno,
+                           len(body) == 1 and not isinstance(node, ast.Module)))
+    return docstrings
+
+
+def _skeleton_python(content: str) -> Optional[str]:
+    """Unparse imports and class/function headers of a module; None if it does not parse."""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+    return _drop_blank_lines(ast.unparse(ast.Module(body=_skeleton_body(tree.body),
+                                                    type_ignores=[])))
+
+
+def _skeleton_body(body: List[ast.stmt]) -> List[ast.stmt]:
+    skeleton: List[ast.stmt] = []
+    for node in body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            skeleton.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            stub = copy.copy(node)
+            stub.body = [ast.Expr(ast.Constant(...))]
+            skeleton.append(stub)
+        elif isinstance(node, ast.ClassDef):
+            stub = copy.copy(node)
+            # Class level annotations are the fields of dataclasses and models
+            members = [member for member in node.body if isinstance(member, ast.AnnAssign)]
+            stub.body = members + _skeleton_body(node.body) or [ast.Expr(ast.Constant(...))]
+            skeleton.append(stub)
+    return skeleton
+
+
+def _strip_comments(content: str, marker: str) -> str:
+    """
+    Remove line comments (`marker`) and, for `//` languages, block comments.
+
+    String literals are skipped so comment markers inside them survive; quotes
+    other than backticks end at the line end, which keeps a stray quote (e.g. a
+    Rust lifetime) from swallowing the rest of the file. `#` only starts a comment
+    at the start of a line or after whitespace, as in shell scripts.
+    """
+    out, i, length = [], 0, len(content)
+    quote: Optional[str] = None
+    hash_style = marker == "#"
+    while i < length:
+        char = content[i]
+        if quote is not None:
+            out.append(char)
+            if char == "\\" and i + 1 < length:
+                out.append(content[i + 1])
+                i += 1
+            elif char == quote or (char == "\n" and quote != "`"):
+                quote = None
+        elif char in "\"'`":
+            quote = char
+            out.append(char)
+        elif content.startswith(marker, i) and (not hash_style or i == 0
+                                                or content[i - 1].isspace()):
+            end = content.find("\n", i)
+            i = length if end == -1 else end
+            continue
+        elif marker == "//" and content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            # Keep the line structure of the file
+            out.append("\n" * content.count("\n", i, end))
+            i = end
+            continue
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _skeleton_braces(content: str) -> str:
+    """Keep declarations of a brace language and elide function bodies as `{ ... }`."""
+    lines, stack = [], []
+    for line in content.split("\n"):
+        code = STRING_REGEX.sub('""', line)
+        kept = []
+        for char in code:
+            in_body = "body" in stack
+            if char == "{":
+                header = "".join(kept)
+                stack.append("type" if TYPE_DECLARATION_REGEX.search(header) else "body")
+                if not in_body and stack[-1] == "body":
+                    kept.append("{ ... }")
+                    continue
+            elif char == "}" and stack:
+                was_body = stack.pop() == "body"
+                if was_body and "body" not in stack:
+                    continue
+            if not in_body:
+                kept.append(char)
+        text = "".join(kept).rstrip()
+        if text.strip():
+            lines.append(_restore_strings(line, text))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _restore_strings(line: str, text: str) -> str:
+    """Put the string literals blanked out for brace counting back into a kept line."""
+    literals = iter(STRING_REGEX.findall(line))
+    return re.sub(r'""', lambda match: next(literals, '""'), text)
+
+
+def _skeleton_markdown(content: str) -> str:
+    """Keep the headings of a Markdown document."""
+    headings, fenced = [], False
+    for line in content.split("\n"):
+        if line.lstrip().startswith(("```", "~~~")):
+            fenced = not fenced
+        elif not fenced and re.match(r"#{1,6}\s", line):
+            headings.append(line.rstrip())
+    return "\n".join(headings) + "\n" if headings else ""
+
+
+def _drop_blank_lines(content: str) -> str:
+    lines = [line.rstrip() for line in content.split("\n")]
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def _collapse_blank_runs(content: str) -> str:
+    return re.sub(r"\n(?:[ \t]*\n)+", "\n\n", content)
@@ -0,0 +1,151 @@
+"""Constants and configurations for repository extraction."""
+import os
+
+from src.agent.tools.config import (
+    GITINGEST_DEFAULT_OUTPUT_LOCATION,
+    EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    PROJECT_INDEX_LOCATION,
+    REVISION_OUTPUT_LOCATION,
+)
+from src.agent.tools.navigation.config import AGENT_WORKSPACE_BASE_PATH
+
+# Patterns always excluded when extracting a repository
+DEFAULT_EXCLUDE_PATTERNS = {
+    "*.pyc",
+    "__pycache__",
+    ".git",
+    ".venv",
+    "venv",
+    "env",
+    "node_modules",
+    ".DS_Store",
+    "*.log",
+    ".pytest_cache",
+    "*.egg-info",
+    "dist",
+    "build",
+    "*.lock",
+    ".pylintrc",
+    ".bare",
+    GITINGEST_DEFAULT_OUTPUT_LOCATION,
+    f"{EXTRACTION_DEFAULT_OUTPUT_LOCATION}*",
+    REVISION_OUTPUT_LOCATION.format(revision="*") + "*",
+    PROJECT_INDEX_LOCATION,
+}
+
+# Per-repository extraction caches live under the agent workspace
+EXTRACTION_CACHE_DIR = "temp/extractions"
+EXTRACTION_CACHE_ROOT = AGENT_WORKSPACE_BASE_PATH / EXTRACTION_CACHE_DIR
+CACHE_MANIFEST_NAME = "manifest.json"
+CACHE_OBJECTS_DIR = "objects"
+# Locked (shared) by every extraction run using a cache, see ExtractionCache.start_run
+CACHE_LOCK_NAME = "lock"
+
+# Tokenizer used for token estimates (same as gitingest)
+TOKEN_ENCODING = "o200k_base"
+# Fallback ratio when the tokenizer is unavailable (e.g. offline)
+CHARS_PER_TOKEN = 4
+
+# Streaming extraction artifacts: one JSON record per line plus a sidecar index
+ARTIFACT_EXTENSION = ".ndjson"
+ARTIFACT_INDEX_SUFFIX = ".index.json"
+ARTIFACT_FORMAT_VERSION = 1
+# Compressed artifacts: lines packed into zlib blocks of about this many (raw) bytes
+COMPRESSED_ARTIFACT_EXTENSION = ".ndjson.z"
+ARTIFACT_BLOCK_SIZE = 256 * 1024
+ARTIFACT_COMPRESSION_LEVEL = 6
+# Inflated blocks a reader keeps in memory
+ARTIFACT_BLOCK_CACHE_SIZE = 8
+# Times a reader opens an artifact whose index is being replaced, and the wait in between
+ARTIFACT_OPEN_ATTEMPTS = 5
+ARTIFACT_OPEN_RETRY_SECONDS = 0.05
+
+# Worker processes used to extract several repositories at the same time
+DEFAULT_BATCH_WORKERS = os.cpu_count() or 1
+# Finished background extraction jobs are forgotten after this many seconds
+EXTRACTION_JOB_TTL_SECONDS = 60 * 60
+
+# Processes rendering the files of one repository, and the minimum number of files
+# to render before a pool is worth starting
+DEFAULT_INGESTION_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_FILES = 1000
+# Shards the file list is split into per worker
+SHARDS_PER_WORKER = 4
+
+# Digest ranking: file names treated as entry points and as manifests / build files
+ENTRY_POINT_NAMES = {
+    "__main__.py", "main.py", "app.py", "manage.py", "wsgi.py", "asgi.py", "cli.py",
+    "server.py", "index.js", "index.ts", "main.js", "main.ts", "server.js", "app.js",
+    "main.go", "Main.java", "Application.java", "main.rs", "Program.cs",
+}
+MANIFEST_NAMES = {
+    "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "Pipfile",
+    "package.json", "tsconfig.json", "go.mod", "Cargo.toml", "pom.xml", "build.gradle",
+    "build.gradle.kts", "settings.gradle", "Gemfile", "composer.json", "Makefile",
+    "Dockerfile", "docker-compose.yml", "docker-compose.yaml", "compose.yml",
+    "compose.yaml", "langgraph.json",
+}
+# Score per signal; fan-in is weighted by log2(1 + importers), depth is a penalty per level
+DIGEST_WEIGHTS = {
+    "entry_point": 10.0,
+    "manifest": 8.0,
+    "package_init": 4.0,
+    "fan_in": 3.0,
+    "depth": 0.5,
+}
+# Artifacts whose import fan-in (the dependency graph of the digest) is kept in memory
+FAN_IN_CACHE_SIZE = 8
+
+# Collapsed tree view: expanded directory levels and entries listed per directory
+COLLAPSED_TREE_DEPTH = 2
+COLLAPSED_TREE_MAX_ENTRIES = 25
+# Language of a file by extension (or full file name)
+LANGUAGE_EXTENSIONS = {
+    ".py": "Python", ".pyi": "Python", ".ipynb": "Jupyter",
+    ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin", ".scala": "Scala", ".groovy": "Groovy",
+    ".go": "Go", ".rs": "Rust", ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++",
+    ".hpp": "C++", ".cs": "C#", ".rb": "Ruby", ".php": "PHP", ".swift": "Swift",
+    ".m": "Objective-C", ".dart": "Dart", ".lua": "Lua", ".r": "R", ".jl": "Julia",
+    ".sh": "Shell", ".bash": "Shell", ".ps1": "PowerShell", ".sql": "SQL",
+    ".html": "HTML", ".css": "CSS", ".scss": "CSS", ".vue": "Vue", ".svelte": "Svelte",
+    ".proto": "Protobuf", ".graphql": "GraphQL", ".tf": "Terraform",
+    ".yml": "YAML", ".yaml": "YAML", ".json": "JSON", ".toml": "TOML", ".xml": "XML",
+    ".md": "Markdown", ".rst": "reStructuredText",
+    "Dockerfile": "Dockerfile", "Makefile": "Makefile",
+}
+
+# Pruning (see pruning.py): vendored and generated paths are left out of the content body
+VENDORED_PATH_PATTERNS = [
+    "vendor/", "vendored/", "third_party/", "third-party/", "thirdparty/",
+    "bower_components/", "Pods/", "jspm_packages/",
+]
+GENERATED_PATH_PATTERNS = [
+    "generated/", "__generated__/", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.cc",
+    "*.pb.h", "*.g.dart", "*.freezed.dart", "*.generated.*", "*.min.js", "*.min.css",
+    "*.bundle.js", "*.designer.cs",
+]
+# Lines searched for a generated-code header
+GENERATED_HEADER_LINES = 10
+# A JS/CSS file with a longer line than this is treated as minified
+MINIFIED_LINE_LENGTH = 1000
+# Smaller files are never collapsed into a duplicate reference
+DUPLICATE_MIN_BYTES = 128
+
+# Secret redaction (see secrets.py): minimum Shannon entropy (bits per character) of a
+# value assigned to a secret-looking key, and minimum length and entropy and maximum
+# mean case run length (words have long runs) of a string literal redacted as random
+SECRET_VALUE_MIN_ENTROPY = 3.0
+SECRET_LITERAL_MIN_LENGTH = 20
+SECRET_LITERAL_MIN_ENTROPY = 4.0
+SECRET_LITERAL_MAX_RUN_LENGTH = 3
+
+# Build manifests marking the root of a project in a monorepo, and their ecosystem
+PROJECT_MARKERS = {
+    "pyproject.toml": "python",
+    "package.json": "node",
+    "go.mod": "go",
+    "pom.xml": "maven",
+    "Cargo.toml": "rust",
+}
@@ -0,0 +1,214 @@
+"""
+Token-budgeted digest of an extraction artifact.
+
+Files are ranked by architectural importance and added to the digest, best
+first, until a token budget is spent:
+
+- entry points (main.py, __main__.py, index.js, main.go, ...)
+- manifests and build files (pyproject.toml, package.json, go.mod, Dockerfile, ...)
+- package `__init__.py` files that contain code
+- modules imported by many other files (fan-in, for Python, Java/Kotlin and JS/TS)
+
+Shallow paths win ties. Token counts are taken from the artifact index; only
+source files are read, to find their imports. The fan-in of an artifact is kept
+in memory until the artifact changes, so it can be computed ahead of time.
+"""
+import functools
+import math
+import os
+import posixpath
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.agent.tools.extraction.artifact import ArtifactReader
+from src.agent.tools.extraction.config import (
+    DIGEST_WEIGHTS,
+    ENTRY_POINT_NAMES,
+    FAN_IN_CACHE_SIZE,
+    MANIFEST_NAMES,
+)
+from src.agent.tools.extraction.pipeline import file_block
+from src.agent.tools.extraction.util import count_tokens
+
+DOTTED_MODULE_SUFFIXES = (".py", ".java", ".kt")
+SCRIPT_SUFFIXES = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+
+PYTHON_IMPORT_REGEX = re.compile(
+    r"^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([\w*, \t]+)"
+    r"|import[ \t]+([\w., \t]+))",
+    re.MULTILINE,
+)
+JVM_IMPORT_REGEX = re.compile(r"^[ \t]*import[ \t]+(?:static[ \t]+)?([\w.]+)", re.MULTILINE)
+SCRIPT_IMPORT_REGEX = re.compile(
+    r"""(?:\bfrom|\bimport|\brequire[ \t]*\(|\bimport[ \t]*\()[ \t]*['"](\.{1,2}/[^'"]+)['"]"""
+)
+
+
+def rank_files(reader: ArtifactReader) -> List[Dict[str, Any]]:
+    """
+    Rank the files of an artifact by architectural importance.
+
+    Returns:
+        One {"path", "score", "tokens", "reasons"} dict per file, best first.
+    """
+    fan_in = artifact_fan_in(reader.path)
+    ranking = []
+    for entry in reader.index["files"]:
+        path = entry["path"]
+        score, reasons = 0.0, []
+        name = posixpath.basename(path)
+        depth = path.count("/")
+
+        if name in ENTRY_POINT_NAMES:
+            score += DIGEST_WEIGHTS["entry_point"]
+            reasons.append("entry point")
+        if name in MANIFEST_NAMES or (depth == 0 and name.lower().startswith("readme")):
+            score += DIGEST_WEIGHTS["manifest"]
+            reasons.append("manifest")
+        if name == "__init__.py" and entry.get("bytes", 0) > len("[Empty file]"):
+            score += DIGEST_WEIGHTS["package_init"]
+            reasons.append("package init")
+        if fan_in.get(path):
+            score += DIGEST_WEIGHTS["fan_in"] * math.log2(1 + fan_in[path])
+            reasons.append(f"imported by {fan_in[path]} file{'s' if fan_in[path] > 1 else ''}")
+        score -= DIGEST_WEIGHTS["depth"] * depth
+
+        ranking.append({
+            "path": path,
+            "score": round(score, 2),
+            "tokens": entry.get("tokens") or 0,
+            "reasons": reasons,
+        })
+
+    ranking.sort(key=lambda item: (-item["score"], item["path"]))
+    return ranking
+
+
+def build_digest(reader: ArtifactReader, token_budget: int,
+                 include_tree: bool = True) -> Dict[str, Any]:
+    """
+    Fill a token budget with the summary, the tree and the highest ranked files.
+
+    Args:
+        reader: Open reader of the extraction artifact.
+        token_budget: Maximum number of tokens of the digest.
+        include_tree: If True, the directory tree is included when it fits the budget.
+
+    Returns:
+        A dict with summary, tree (if included), content (the selected file blocks in
+        repository order), selected ({"path", "tokens", "reasons"} in rank order),
+        omitted (number of files left out) and tokens (estimated size of the digest).
+    """
+    digest: Dict[str, Any] = {"summary": reader.summary() or ""}
+    used = count_tokens(digest["summary"])
+
+    tree = reader.tree() or ""
+    tree_tokens = count_tokens(tree)
+    if include_tree and used + tree_tokens <= token_budget:
+        digest["tree"] = tree
+        used += tree_tokens
+
+    selected, omitted = [], 0
+    for item in rank_files(reader):
+        if used + item["tokens"] > token_budget:
+            omitted += 1
+            continue
+        used += item["tokens"]
+        selected.append({key: item[key] for key in ("path", "tokens", "reasons")})
+
+    chosen = {item["path"] for item in selected}
+    digest["content"] = "\n".join(
+        file_block(record)
+        for record in reader.iter_files(path for path in reader.paths if path in chosen)
+    )
+    digest.update({"selected": selected, "omitted": omitted, "tokens": used})
+    return digest
+
+
+def count_fan_in(reader: ArtifactReader) -> Dict[str, int]:
+    """Return, per file path, the number of other files in the artifact importing it."""
+    paths = reader.paths
+    modules = _module_index(paths)
+    path_set = set(paths)
+    importers: Dict[str, Set[str]] = {}
+
+    sources = [path for path in paths if path.endswith(DOTTED_MODULE_SUFFIXES + SCRIPT_SUFFIXES)]
+    for record in reader.iter_files(sources):
+        importer = record["path"]
+        for target in _resolve_imports(importer, record["content"], modules, path_set):
+            if target != importer:
+                importers.setdefault(target, set()).add(importer)
+    return {path: len(files) for path, files in importers.items()}
+
+
+def artifact_fan_in(artifact_path: str) -> Dict[str, int]:
+    """Return `count_fan_in` of an artifact, computed once per version of the artifact."""
+    info = os.stat(artifact_path)
+    return _cached_fan_in(artifact_path, (info.st_mtime_ns, info.st_size))
+
+
+@functools.lru_cache(maxsize=FAN_IN_CACHE_SIZE)
+def _cached_fan_in(artifact_path: str, _version: Tuple[int, int]) -> Dict[str, int]:
+    with ArtifactReader(artifact_path) as reader:
+        return count_fan_in(reader)
+
+
+def _module_index(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Map every dotted suffix of a module name to its file.
+
+    `src/agent/tools/github.py` is reachable as `github`, `tools.github`, ...
+    Suffixes shared by several files map to None, as they cannot be resolved.
+    """
+    modules: Dict[str, Optional[str]] = {}
+    for path in paths:
+        if not path.endswith(DOTTED_MODULE_SUFFIXES):
+            continue
+        parts = posixpath.splitext(path)[0].split("/")
+        if parts[-1] == "__init__":
+            parts.pop()
+        for i in range(len(parts)):
+            suffix = ".".join(parts[i:])
+            modules[suffix] = path if modules.get(suffix, path) == path else None
+    return modules
+
+
+def _resolve_imports(importer: str, content: str, modules: Dict[str, Optional[str]],
+                     paths: Set[str]) -> Set[str]:
+    """Return the artifact paths imported by a source file."""
+    if importer.endswith(SCRIPT_SUFFIXES):
+        return {target for spec in SCRIPT_IMPORT_REGEX.findall(content)
+                if (target := _resolve_script(importer, spec, paths))}
+
+    names = []
+    if importer.endswith(".py"):
+        for from_module, imported, plain in PYTHON_IMPORT_REGEX.findall(content):
+            if plain:
+                names += [name.split()[0] for name in plain.split(",") if name.strip()]
+                continue
+            base = _absolute_module(importer, from_module)
+            # `from pkg import module` imports a submodule, otherwise a name from pkg
+            names += [f"{base}.{name.split()[0]}".strip(".")
+                      for name in imported.split(",") if name.strip() and name.strip() != "*"]
+            names.append(base)
+    else:
+        names = JVM_IMPORT_REGEX.findall(content)
+    return {modules[name] for name in names if modules.get(name)}
+
+
+def _absolute_module(importer: str, module: str) -> str:
+    """Resolve a (possibly relative) `from` module against the importing file."""
+    level = len(module) - len(module.lstrip("."))
+    if level == 0:
+        return module
+    package = importer.split("/")[:-1]
+    package = package[:len(package) - (level - 1)] if level > 1 else package
+    return ".".join([*package, module.lstrip(".")]).strip(".")
+
+
+def _resolve_script(importer: str, spec: str, paths: Set[str]) -> Optional[str]:
+    """Resolve a relative JS/TS import to a file of the artifact."""
+    base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+    candidates = [base, *(base + suffix for suffix in SCRIPT_SUFFIXES),
+                  *(f"{base}/index{suffix}" for suffix in SCRIPT_SUFFIXES)]
+    return next((candidate for candidate in candidates if candidate in paths), None)
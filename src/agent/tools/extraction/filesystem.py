@@ -0,0 +1,147 @@
+"""
+Filesystem walk used by extraction.
+
+Mirrors gitingest's directory traversal (same filtering, limits and ordering),
+but compiles the include/exclude patterns once instead of once per path, and
+exposes the file nodes so their content can be rendered individually.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from pathspec import PathSpec
+from gitingest.ingestion import _process_file, _process_symlink, limit_exceeded
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats, IngestionQuery
+from gitingest.schemas.filesystem import SEPARATOR
+from gitingest.utils.compat_func import readlink
+
+from src.agent.tools.extraction.util import count_tokens
+
+
+def build_file_tree(query: IngestionQuery) -> FileSystemNode:
+    """
+    Walk the directory of an ingestion query and build a gitingest node tree.
+
+    Args:
+        query: Parsed ingestion query (local directory, patterns, max file size).
+
+    Returns:
+        The root directory node, with children sorted like gitingest does.
+    """
+    subpath = Path(query.subpath.strip("/")).as_posix()
+    path = query.local_path / subpath
+    if not path.is_dir():
+        raise ValueError(f"{query.slug} is not a directory")
+
+    ignore_spec = compile_patterns(query.ignore_patterns)
+    include_spec = compile_patterns(query.include_patterns)
+
+    root = FileSystemNode(
+        name=path.name,
+        type=FileSystemNodeType.DIRECTORY,
+        path_str=str(path.relative_to(query.local_path)),
+        path=path,
+    )
+    _process_directory(root, query, ignore_spec, include_spec, FileSystemStats())
+    return root
+
+
+def iter_file_nodes(node: FileSystemNode) -> Iterator[FileSystemNode]:
+    """Yield file and symlink nodes in the order gitingest writes their content."""
+    if node.type != FileSystemNodeType.DIRECTORY:
+        yield node
+        return
+    for child in node.children:
+        yield from iter_file_nodes(child)
+
+
+def relative_posix_path(node: FileSystemNode) -> str:
+    """Return the node path relative to the ingestion root with forward slashes."""
+    return str(node.path_str).replace(os.sep, "/")
+
+
+def symlink_target(node: FileSystemNode) -> Optional[str]:
+    """Return the name a symlink node points to, or None for regular files."""
+    if node.type != FileSystemNodeType.SYMLINK:
+        return None
+    return readlink(node.path).name
+
+
+def format_content_string(node: FileSystemNode, content: str) -> str:
+    """Render a file node the same way as gitingest's `FileSystemNode.content_string`."""
+    return format_file_block(relative_posix_path(node), node.type.name, content,
+                             symlink_target(node))
+
+
+def format_file_block(path: str, node_type: str, content: str,
+                      target: Optional[str] = None) -> str:
+    """Render one file of the content body (separator, header, separator, content)."""
+    header = f"{node_type}: {path}"
+    if target is not None:
+        header += f" -> {target}"
+    return "\n".join([SEPARATOR, header, SEPARATOR, content]) + "\n\n"
+
+
+def with_content(record: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """Return a copy of a file record with another content and its token count."""
+    tokens = count_tokens(format_file_block(record["path"], record["node_type"], content,
+                                            record.get("target")))
+    return {**record, "content": content, "tokens": tokens}
+
+
+def attach_directory(parent: FileSystemNode, child: FileSystemNode) -> None:
+    """Add a processed directory to its parent, unless nothing inside it was kept."""
+    if not child.children:
+        return
+    parent.children.append(child)
+    parent.size += child.size
+    parent.file_count += child.file_count
+    parent.dir_count += 1 + child.dir_count
+
+
+def compile_patterns(patterns: Optional[set[str]]) -> Optional[PathSpec]:
+    """Compile gitwildmatch patterns once, or return None when there are none."""
+    if not patterns:
+        return None
+    return PathSpec.from_lines("gitwildmatch", patterns)
+
+
+def _process_directory(
+    node: FileSystemNode,
+    query: IngestionQuery,
+    ignore_spec: Optional[PathSpec],
+    include_spec: Optional[PathSpec],
+    stats: FileSystemStats,
+) -> None:
+    """Recursive equivalent of gitingest's `_process_node` using precompiled specs."""
+    if limit_exceeded(stats, depth=node.depth):
+        return
+
+    for sub_path in node.path.iterdir():
+        rel_path = str(sub_path.relative_to(query.local_path))
+        if ignore_spec and ignore_spec.match_file(rel_path):
+            continue
+
+        is_dir = sub_path.is_dir()
+        if include_spec and not is_dir and not include_spec.match_file(rel_path):
+            continue
+
+        if sub_path.is_symlink():
+            _process_symlink(path=sub_path, parent_node=node, stats=stats,
+                             local_path=query.local_path)
+        elif sub_path.is_file():
+            if sub_path.stat().st_size > query.max_file_size:
+                continue
+            _process_file(path=sub_path, parent_node=node, stats=stats, local_path=query.local_path)
+        elif is_dir:
+            child = FileSystemNode(
+                name=sub_path.name,
+                type=FileSystemNodeType.DIRECTORY,
+                path_str=rel_path,
+                path=sub_path,
+                depth=node.depth + 1,
+            )
+            _process_directory(child, query, ignore_spec, include_spec, stats)
+            attach_directory(node, child)
+
+    node.sort_children()
@@ -0,0 +1,334 @@
+"""
+Extraction of a git revision straight from the object database.
+
+Trees and blobs are read through one long-lived `git cat-file --batch-command`
+process, so any commit, tag or branch can be extracted without checking it out.
+Blobs missing from the object database (e.g. not fetched by a partial clone) are
+left out, like files that cannot be read from a working tree.
+The produced records are the same as `iter_extraction` yields for a working tree
+(see pipeline.py), so they can be collected or written to an artifact as usual.
+"""
+import io
+import os
+import subprocess
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from gitingest.config import MAX_FILE_SIZE, MAX_FILES, MAX_TOTAL_SIZE_BYTES
+from gitingest.ingestion import limit_exceeded
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.utils.file_utils import _CHUNK_SIZE, _decodes, _get_preferred_encodings
+from gitingest.utils.notebook import process_notebook
+
+from src.agent.tools.extraction.filesystem import (
+    attach_directory,
+    compile_patterns,
+    format_file_block,
+    iter_file_nodes,
+    relative_posix_path,
+)
+from src.agent.tools.extraction.pruning import ContentPruner
+from src.agent.tools.extraction.secrets import SecretRedactor
+from src.agent.tools.extraction.util import count_tokens, format_token_count
+
+TREE_MODE = b"40000"
+SYMLINK_MODE = b"120000"
+GITLINK_MODE = b"160000"
+
+# Seconds to wait for `git cat-file` to exit after its input is closed
+CAT_FILE_EXIT_TIMEOUT = 5
+
+
+class GitObjectReader:
+    """Reads objects of one repository through a single `git cat-file` process."""
+
+    def __init__(self, repository_path: str):
+        """
+        Start the `git cat-file --batch-command` process for a repository.
+
+        Args:
+            repository_path: Path of a working tree or bare repository.
+        """
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            ["git", "-C", str(repository_path), "cat-file", "--batch-command"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the `git cat-file` process."""
+        if self._process.poll() is not None:
+            return
+        self._process.stdin.close()
+        try:
+            self._process.wait(timeout=CAT_FILE_EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def info(self, spec: str) -> Optional[Tuple[str, str, int]]:
+        """Return (sha, type, size) of an object, or None if it does not exist."""
+        self._send("info", spec)
+        return self._read_header()
+
+    def read(self, spec: str) -> Optional[Tuple[str, str, bytes]]:
+        """Return (sha, type, data) of an object, or None if it does not exist."""
+        self._send("contents", spec)
+        header = self._read_header()
+        if header is None:
+            return None
+        sha, object_type, size = header
+        data = self._process.stdout.read(size)
+        self._process.stdout.read(1)  # trailing newline
+        return sha, object_type, data
+
+    def resolve_commit(self, revision: str) -> Optional[str]:
+        """Return the commit SHA a branch, tag or commit-ish points to."""
+        header = self.info(f"{revision}^{{commit}}")
+        return header[0] if header else None
+
+    def tree_entries(self, tree_sha: str) -> List[Tuple[bytes, str, str]]:
+        """Return the (mode, name, sha) entries of a tree object."""
+        result = self.read(tree_sha)
+        if result is None or result[1] != "tree":
+            raise ValueError(f"{tree_sha} is not a tree object")
+        data, entries, pos = result[2], [], 0
+        while pos < len(data):
+            space = data.index(b" ", pos)
+            nul = data.index(b"\0", space)
+            mode = data[pos:space]
+            name = data[space + 1:nul].decode("utf-8", errors="surrogateescape")
+            entries.append((mode, name, data[nul + 1:nul + 21].hex()))
+            pos = nul + 21
+        return entries
+
+    def _send(self, command: str, spec: str) -> None:
+        if "\n" in spec:
+            raise ValueError(f"Invalid object name: {spec!r}")
+        self._process.stdin.write(f"{command} {spec}\n".encode("utf-8"))
+        self._process.stdin.flush()
+
+    def _read_header(self) -> Optional[Tuple[str, str, int]]:
+        line = self._process.stdout.readline()
+        if not line:
+            raise RuntimeError("git cat-file exited unexpectedly")
+        parts = line.decode("utf-8", errors="replace").split()
+        if len(parts) != 3 or parts[-1] in ("missing", "ambiguous"):
+            return None
+        return parts[0], parts[1], int(parts[2])
+
+
+def iter_revision_extraction(  # pylint: disable=too-many-arguments,too-many-locals
+    repository_path: str,
+    revision: str,
+    *,
+    ignore_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    max_file_size: int = MAX_FILE_SIZE,
+    prune: bool = False,
+    redact_secrets: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield tree, file and summary records for a revision of a repository.
+
+    Args:
+        repository_path: Path of a working tree or bare repository.
+        revision: Any commit-ish (commit SHA, tag, branch, `HEAD~3`, ...).
+        ignore_patterns: Gitwildmatch patterns of paths to skip.
+        include_patterns: If given, only files matching these patterns are extracted.
+        max_file_size: Blobs larger than this (in bytes) are skipped.
+        prune: If True, vendored, generated and duplicate files are pruned from the
+            content (see pruning.py).
+        redact_secrets: If True, secrets in file contents are redacted (see secrets.py).
+
+    Raises:
+        ValueError: If the revision does not resolve to a commit.
+    """
+    name = Path(repository_path).resolve().name
+    with GitObjectReader(repository_path) as reader:
+        commit = reader.resolve_commit(revision)
+        if commit is None:
+            raise ValueError(f"Unknown revision: {revision}")
+
+        walk = _RevisionWalk(reader, ignore_patterns, include_patterns, max_file_size)
+        root = FileSystemNode(name=name, type=FileSystemNodeType.DIRECTORY,
+                              path_str="", path=Path())
+        walk.process_tree(root, f"{commit}^{{tree}}")
+
+        tree = "Directory structure:\n" + _render_tree(root, walk.targets)
+        total_tokens = count_tokens(tree)
+
+        pruner = ContentPruner() if prune else None
+        nodes = (pruner.select_nodes(iter_file_nodes(root)) if pruner
+                 else list(iter_file_nodes(root)))
+        yield {"type": "tree", "tree": tree, "files": len(nodes),
+               "pruned": pruner.skipped if pruner else []}
+
+        redactor = SecretRedactor() if redact_secrets else None
+        for node in nodes:
+            record = walk.file_record(node)
+            if pruner is not None:
+                record = pruner.prune(record)
+            record = redactor.redact(record) if redactor else record
+            total_tokens += record["tokens"]
+            yield record
+
+    summary = (f"Repository: {name}\nRevision: {revision}\nCommit: {commit}\n"
+               f"Files analyzed: {root.file_count}\n")
+    summary += (pruner.describe() if pruner else "") + (redactor.describe() if redactor else "")
+    if token_estimate := format_token_count(total_tokens):
+        summary += f"\nEstimated tokens: {token_estimate}"
+    yield {"type": "summary", "summary": summary}
+
+
+def decode_blob(data: bytes, name: str) -> str:
+    """Render blob bytes the same way gitingest renders the content of a file on disk."""
+    if name.endswith(".ipynb"):
+        return _decode_notebook(data)
+    chunk = data[:_CHUNK_SIZE]
+    if chunk == b"":
+        return "[Empty file]"
+    if not _decodes(chunk, "utf-8"):
+        return "[Binary file]"
+
+    good_enc = next(
+        (enc for enc in _get_preferred_encodings() if _decodes(chunk, encoding=enc)),
+        None,
+    )
+    if good_enc is None:
+        return "Error: Unable to decode file with available encodings"
+    try:
+        # Text mode decoding, so newlines are translated like reading the file would
+        return io.TextIOWrapper(io.BytesIO(data), encoding=good_enc).read()
+    except UnicodeDecodeError as exc:
+        return f"Error reading file with {good_enc!r}: {exc}"
+
+
+class _RevisionWalk:
+    """State of one revision walk: filters, traversal limits and the blobs found."""
+
+    def __init__(self, reader: GitObjectReader, ignore_patterns: Optional[set[str]],
+                 include_patterns: Optional[set[str]], max_file_size: int):
+        self.reader = reader
+        self.ignore_spec = compile_patterns(ignore_patterns)
+        self.include_spec = compile_patterns(include_patterns)
+        self.max_file_size = max_file_size
+        self.stats = FileSystemStats()
+        self.blobs: Dict[str, str] = {}
+        self.targets: Dict[str, str] = {}
+
+    def process_tree(self, node: FileSystemNode, tree_sha: str) -> None:
+        """Add the entries of a tree object below `node`, like `_process_directory`."""
+        if limit_exceeded(self.stats, depth=node.depth):
+            return
+
+        for mode, name, sha in self.reader.tree_entries(tree_sha):
+            rel_path = f"{node.path_str}/{name}" if node.path_str else name
+            if self.ignore_spec and self.ignore_spec.match_file(rel_path):
+                continue
+            is_dir = mode == TREE_MODE
+            if self.include_spec and not is_dir and not self.include_spec.match_file(rel_path):
+                continue
+
+            if is_dir:
+                child = self._child(node, name, rel_path, FileSystemNodeType.DIRECTORY)
+                self.process_tree(child, sha)
+                attach_directory(node, child)
+            elif mode == SYMLINK_MODE:
+                self._add_symlink(node, name, rel_path, sha)
+            elif mode != GITLINK_MODE:
+                self._add_file(node, name, rel_path, sha)
+
+        node.sort_children()
+
+    def file_record(self, node: FileSystemNode) -> Dict[str, Any]:
+        """Read the blob of a file node and return its extraction record."""
+        rel_path = relative_posix_path(node)
+        target = self.targets.get(rel_path)
+        if node.type == FileSystemNodeType.SYMLINK:
+            content = ""
+        else:
+            _, _, data = self.reader.read(self.blobs[rel_path])
+            content = decode_blob(data, node.name)
+        return {
+            "type": "file",
+            "path": rel_path,
+            "node_type": node.type.name,
+            "target": target,
+            "content": content,
+            "tokens": count_tokens(format_file_block(rel_path, node.type.name, content, target)),
+        }
+
+    def _add_file(self, parent: FileSystemNode, name: str, rel_path: str, sha: str) -> None:
+        header = self.reader.info(sha)
+        if header is None:
+            return
+        size = header[2]
+        if size > self.max_file_size or self.stats.total_files + 1 > MAX_FILES:
+            return
+        if self.stats.total_size + size > MAX_TOTAL_SIZE_BYTES:
+            return
+        self.stats.total_files += 1
+        self.stats.total_size += size
+
+        child = self._child(parent, name, rel_path, FileSystemNodeType.FILE)
+        child.size, child.file_count = size, 1
+        parent.children.append(child)
+        parent.size += size
+        parent.file_count += 1
+        self.blobs[rel_path] = sha
+
+    def _add_symlink(self, parent: FileSystemNode, name: str, rel_path: str, sha: str) -> None:
+        blob = self.reader.read(sha)
+        if blob is None:
+            return
+        target = blob[2].decode("utf-8", errors="surrogateescape")
+        self.targets[rel_path] = PurePosixPath(target).name
+        self.stats.total_files += 1
+        parent.children.append(self._child(parent, name, rel_path, FileSystemNodeType.SYMLINK))
+        parent.file_count += 1
+
+    @staticmethod
+    def _child(parent: FileSystemNode, name: str, rel_path: str,
+               node_type: FileSystemNodeType) -> FileSystemNode:
+        return FileSystemNode(name=name, type=node_type, path_str=rel_path,
+                              path=Path(rel_path), depth=parent.depth + 1)
+
+
+def _render_tree(node: FileSystemNode, targets: Dict[str, str],
+                 prefix: str = "", is_last: bool = True) -> str:
+    """Equivalent of gitingest's `_create_tree_structure` without reading symlinks on disk."""
+    display_name = node.name
+    if node.type == FileSystemNodeType.DIRECTORY:
+        display_name += "/"
+    elif node.type == FileSystemNodeType.SYMLINK:
+        display_name += " -> " + targets[relative_posix_path(node)]
+
+    tree_str = f"{prefix}{'└── ' if is_last else '├── '}{display_name}\n"
+    if node.type == FileSystemNodeType.DIRECTORY and node.children:
+        prefix += "    " if is_last else "│   "
+        for i, child in enumerate(node.children):
+            tree_str += _render_tree(child, targets, prefix, i == len(node.children) - 1)
+    return tree_str
+
+
+def _decode_notebook(data: bytes) -> str:
+    # process_notebook only accepts a path, so the blob goes through a temporary file
+    with tempfile.NamedTemporaryFile(suffix=".ipynb", delete=False) as f:
+        f.write(data)
+    try:
+        return process_notebook(Path(f.name))
+    # pylint: disable=broad-exception-caught
+    except Exception as exc:
+        return f"Error processing notebook: {exc}"
+    finally:
+        os.unlink(f.name)
@@ -0,0 +1,238 @@
+"""
+Background extraction jobs.
+
+A job writes an extraction artifact on a daemon thread, so it outlives the tool
+call that started it. While it runs, its progress (files and bytes done, ETA)
+can be polled, the tree and already extracted files can be read from the
+partial artifact, and it can be cancelled between two files. Finished jobs
+are forgotten after EXTRACTION_JOB_TTL_SECONDS.
+"""
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.agent.tools.extraction.artifact import ArtifactReader, partial_path_for, write_artifact
+from src.agent.tools.extraction.config import EXTRACTION_JOB_TTL_SECONDS
+
+RecordsFactory = Callable[[], Iterator[Dict[str, Any]]]
+
+
+class ExtractionCancelled(Exception):
+    """Raised inside a job's thread to stop an extraction that was cancelled."""
+
+
+class ExtractionJob:  # pylint: disable=too-many-instance-attributes
+    """One extraction running in the background."""
+
+    def __init__(self, job_id: str, repository: str, output_file: str,
+                 records: RecordsFactory):
+        """
+        Prepare a job; `start` runs it.
+
+        Args:
+            job_id: Identifier returned to the agent.
+            repository: Path of the repository being extracted.
+            output_file: Artifact the extraction is written to.
+            records: Returns the extraction records (see pipeline.py) when called.
+        """
+        self.job_id = job_id
+        self.repository = repository
+        self.output_file = output_file
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self._records = records
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._progress: Dict[str, Any] = {
+            "total_files": None,
+            "files_done": 0,
+            "bytes_done": 0,
+            "started_at": None,
+            "finished_at": None,
+        }
+        # Read by `partial_results` while the job writes it
+        self._partial_path = partial_path_for(output_file, job_id)
+        self._tree: Optional[str] = None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._thread = threading.Thread(target=self._run, name=f"extraction-{job_id}",
+                                        daemon=True)
+
+    def start(self) -> None:
+        """Run the extraction on a background thread."""
+        self.status = "running"
+        self._progress["started_at"] = time.monotonic()
+        self._thread.start()
+
+    def cancel(self) -> bool:
+        """Ask the job to stop; returns False if it already finished."""
+        if self.status not in ("pending", "running"):
+            return False
+        self._cancelled.set()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finished; returns False on timeout."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def expired(self, ttl: Optional[float] = None) -> bool:
+        """Return whether the job finished more than `ttl` (default: the job TTL) seconds ago."""
+        with self._lock:
+            finished_at = self._progress["finished_at"]
+        ttl = EXTRACTION_JOB_TTL_SECONDS if ttl is None else ttl
+        return finished_at is not None and time.monotonic() - finished_at > ttl
+
+    def describe(self) -> Dict[str, Any]:
+        """Return the status and progress of the job."""
+        with self._lock:
+            progress = dict(self._progress)
+        end = progress["finished_at"] or time.monotonic()
+        elapsed = end - progress["started_at"] if progress["started_at"] else 0.0
+        total, done = progress["total_files"], progress["files_done"]
+
+        eta = None
+        if self.status == "running" and total is not None and done:
+            eta = round(elapsed / done * (total - done), 1)
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "repository": self.repository,
+            "path": self.output_file,
+            "files_done": done,
+            "total_files": total,
+            "bytes_done": progress["bytes_done"],
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+            "error": self.error,
+        }
+
+    def partial_results(self, file_paths: Optional[Iterable[str]] = None,
+                        include_tree: bool = True) -> Dict[str, Any]:
+        """
+        Return what has been extracted so far.
+
+        Args:
+            file_paths: Paths whose content should be returned if already extracted.
+            include_tree: If True, include the directory tree (known once the walk finished).
+
+        Returns:
+            A dict with files_done (paths extracted so far), files (path -> content for
+            the requested paths that are done), pending (requested paths not extracted
+            yet), unavailable (requested paths that were extracted but whose content is
+            gone, e.g. with the partial artifact of a failed or cancelled job) and the tree.
+        """
+        with self._lock:
+            entries = dict(self._entries)
+            tree = self._tree
+        result: Dict[str, Any] = {"files_done": list(entries)}
+        if include_tree:
+            result["tree"] = tree
+
+        if file_paths is not None:
+            requested = list(file_paths)
+            result["files"] = self._read_contents([entries[p] for p in requested if p in entries])
+            result["pending"] = [p for p in requested if p not in entries]
+            result["unavailable"] = [p for p in requested
+                                     if p in entries and p not in result["files"]]
+        return result
+
+    def _run(self) -> None:
+        try:
+            write_artifact(self.output_file, self._tracked(), on_record=self._on_record,
+                           partial_path=self._partial_path)
+            self.status = "completed"
+        except ExtractionCancelled:
+            self.status = "cancelled"
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            self.status, self.error = "failed", str(e)
+        with self._lock:
+            self._progress["finished_at"] = time.monotonic()
+
+    def _tracked(self) -> Iterator[Dict[str, Any]]:
+        """Yield the extraction records, stopping between two records once cancelled."""
+        records = self._records()
+        try:
+            for record in records:
+                if self._cancelled.is_set():
+                    raise ExtractionCancelled()
+                yield record
+        finally:
+            records.close()
+
+    def _on_record(self, record: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if record["type"] == "tree":
+                self._tree = record["tree"]
+                self._progress["total_files"] = record.get("files")
+            elif record["type"] == "file":
+                self._entries[record["path"]] = entry
+                self._progress["files_done"] += 1
+                self._progress["bytes_done"] += entry["bytes"]
+
+    def _read_contents(self, entries: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Read file contents from the finished or the partial (plain) artifact."""
+        if self.status == "completed":
+            with ArtifactReader(self.output_file) as reader:
+                return {entry["path"]: reader.file(entry["path"])["content"]
+                        for entry in entries}
+        if any("block" in entry for entry in entries):
+            # Blocks of a compressed artifact are only readable once written in full
+            return {}
+
+        paths = [self._partial_path]
+        if self.status == "running":
+            # The partial file may just have been renamed to the final artifact; once the
+            # job failed or was cancelled, the file there is an older artifact
+            paths.append(self.output_file)
+        contents = {}
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    for entry in entries:
+                        f.seek(entry["offset"])
+                        try:
+                            record = json.loads(f.read(entry["length"]))
+                        except ValueError:
+                            continue
+                        contents[entry["path"]] = record["content"]
+                return contents
+            except FileNotFoundError:
+                continue
+        return contents
+
+
+_JOBS: Dict[str, ExtractionJob] = {}
+_JOBS_LOCK = threading.Lock()
+
+
+def start_job(repository: str, output_file: str, records: RecordsFactory) -> ExtractionJob:
+    """Create, register and start a background extraction job."""
+    job = ExtractionJob(uuid.uuid4().hex[:12], repository, output_file, records)
+    with _JOBS_LOCK:
+        _evict_expired_jobs()
+        _JOBS[job.job_id] = job
+    job.start()
+    return job
+
+
+def get_job(job_id: str) -> Optional[ExtractionJob]:
+    """Return a job by id, or None if it does not exist (or expired)."""
+    with _JOBS_LOCK:
+        _evict_expired_jobs()
+        return _JOBS.get(job_id)
+
+
+def list_jobs() -> List[ExtractionJob]:
+    """Return all jobs started in this process that did not expire."""
+    with _JOBS_LOCK:
+        _evict_expired_jobs()
+        return list(_JOBS.values())
+
+
+def _evict_expired_jobs() -> None:
+    """Forget the jobs that finished more than EXTRACTION_JOB_TTL_SECONDS ago (lock held)."""
+    for job_id in [job_id for job_id, job in _JOBS.items() if job.expired()]:
+        del _JOBS[job_id]
@@ -0,0 +1,230 @@
+"""
+Record based extraction pipeline.
+
+An extraction is produced as a stream of records so it can be written to disk
+while ingestion runs instead of being assembled into one string first:
+
+- {"type": "tree", "tree": str, "files": int, "pruned": list}   (number of file
+   records to follow, and the files of the tree pruned without a record:
+   {"path", "bytes", "pruned"})
+- {"type": "file", "path": str, "node_type": str, "target": str | None,
+   "content": str, "tokens": int}   (one per file, in gitingest order; pruned
+   files also carry "pruned" and "original_bytes", duplicates "duplicate_of")
+- {"type": "summary", "summary": str}
+
+File contents can be rendered by a pool of worker processes. The file list is
+split into contiguous shards and the results are consumed in the original
+order, so the output is identical to the serial path. Files whose blob SHA is
+not known to the cache are hashed by the workers too (see `render_task`).
+"""
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gitingest.output_formatter import _create_summary_prefix, _create_tree_structure
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, IngestionQuery
+
+from src.agent.tools.extraction.cache import (
+    ExtractionCache,
+    object_id_for,
+    stored_object_path,
+)
+from src.agent.tools.extraction.config import PARALLEL_MIN_FILES, SHARDS_PER_WORKER
+from src.agent.tools.extraction.filesystem import (
+    build_file_tree,
+    iter_file_nodes,
+    relative_posix_path,
+    symlink_target,
+    format_content_string,
+    format_file_block,
+)
+from src.agent.tools.extraction.pruning import ContentPruner
+from src.agent.tools.extraction.secrets import SecretRedactor
+from src.agent.tools.extraction.util import count_tokens, format_token_count
+
+
+def iter_extraction(  # pylint: disable=too-many-locals
+    query: IngestionQuery,
+    use_cache: bool = True,
+    workers: int = 1,
+    prune: bool = False,
+    redact_secrets: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Walk the query directory and yield tree, file and summary records.
+
+    Args:
+        query: Parsed ingestion query for a local directory.
+        use_cache: If True, file contents are rendered through the repository's
+            `ExtractionCache`; otherwise every file is read again.
+        workers: Number of processes rendering file contents. Parallel rendering
+            only starts for at least PARALLEL_MIN_FILES files to render.
+        prune: If True, vendored, generated and duplicate files are pruned from the
+            content (see pruning.py); the tree still lists them.
+        redact_secrets: If True, secrets (keys, tokens, passwords, ...) in file
+            contents are replaced by `<REDACTED>` (see secrets.py).
+    """
+    root = build_file_tree(query)
+    tree = "Directory structure:\n" + _create_tree_structure(query, node=root)
+    total_tokens = count_tokens(tree)
+
+    pruner = ContentPruner() if prune else None
+    nodes = pruner.select_nodes(iter_file_nodes(root)) if pruner else list(iter_file_nodes(root))
+    yield {"type": "tree", "tree": tree, "files": len(nodes),
+           "pruned": pruner.skipped if pruner else []}
+
+    redactor = SecretRedactor() if redact_secrets else None
+    cache = ExtractionCache(str(query.local_path)) if use_cache else None
+    if cache is not None:
+        cache.start_run()
+    try:
+        for node, content, tokens in _render_files(nodes, cache, workers):
+            record = {
+                "type": "file",
+                "path": relative_posix_path(node),
+                "node_type": node.type.name,
+                "target": symlink_target(node),
+                "content": content,
+                "tokens": tokens,
+            }
+            if pruner is not None:
+                record = pruner.prune(record)
+            if redactor is not None:
+                record = redactor.redact(record)
+            total_tokens += record["tokens"]
+            yield record
+        if cache is not None:
+            cache.save()
+    finally:
+        if cache is not None:
+            cache.finish_run()
+
+    summary = _create_summary_prefix(query) + f"Files analyzed: {root.file_count}\n"
+    summary += (pruner.describe() if pruner else "") + (redactor.describe() if redactor else "")
+    if token_estimate := format_token_count(total_tokens):
+        summary += f"\nEstimated tokens: {token_estimate}"
+    yield {"type": "summary", "summary": summary}
+
+
+def render_file(node: FileSystemNode) -> Tuple[str, int]:
+    """
+    Read a file node and return its content and the token count of its block.
+
+    Module level so it can run in worker processes.
+    """
+    if node.type == FileSystemNodeType.SYMLINK:
+        content = ""
+    else:
+        content = node.content
+    return content, count_tokens(format_content_string(node, content))
+
+
+def render_task(
+    node: FileSystemNode,
+    objects_dir: Optional[Path] = None,
+) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """
+    Render a file node for `_render_files`.
+
+    Module level so it can run in worker processes. With `objects_dir`, the
+    cache does not know the blob SHA of the file yet: it is hashed here, and
+    the file is only rendered if that cache holds no object for it.
+
+    Returns:
+        (object id, content, tokens). The object id is None unless it was hashed;
+        content and tokens are None if the object is cached.
+    """
+    if objects_dir is None:
+        return None, *render_file(node)
+    object_id = object_id_for(node.path)
+    if stored_object_path(objects_dir, object_id).exists():
+        return object_id, None, None
+    return object_id, *render_file(node)
+
+
+def file_block(record: Dict[str, Any]) -> str:
+    """Render a file record as its block in the gitingest content body."""
+    return format_file_block(record["path"], record["node_type"], record["content"],
+                             record.get("target"))
+
+
+def collect_extraction(records: Iterable[Dict[str, Any]]) -> Tuple[str, str, str]:
+    """Assemble extraction records into gitingest's (summary, tree, content) strings."""
+    summary, tree, blocks = "", "", []
+    for record in records:
+        if record["type"] == "tree":
+            tree = record["tree"]
+        elif record["type"] == "summary":
+            summary = record["summary"]
+        else:
+            blocks.append(file_block(record))
+    return summary, tree, "\n".join(blocks)
+
+
+def _render_files(
+    nodes: List[FileSystemNode],
+    cache: Optional[ExtractionCache],
+    workers: int,
+) -> Iterator[Tuple[FileSystemNode, str, int]]:
+    """Yield (node, content, tokens) for every node, in order."""
+    # (node, object id, cached); symlinks are rendered without reading anything
+    planned = []
+    for node in nodes:
+        if cache is None or node.type == FileSystemNodeType.SYMLINK:
+            planned.append((node, None, False))
+        else:
+            planned.append((node, *cache.lookup(node, defer_hashing=True)))
+
+    # Files to read: misses, and files the renderers hash first (unknown object id)
+    misses, objects_dirs = [], []
+    for node, object_id, cached in planned:
+        if not cached and node.type != FileSystemNodeType.SYMLINK:
+            misses.append(node)
+            objects_dirs.append(cache.objects_dir if cache and object_id is None else None)
+
+    if workers <= 1 or len(misses) < PARALLEL_MIN_FILES:
+        yield from _consume(planned, cache, map(render_task, misses, objects_dirs))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # Contiguous shards keep the per-task overhead low; map returns them in order
+        chunksize = max(1, math.ceil(len(misses) / (workers * SHARDS_PER_WORKER)))
+        yield from _consume(planned, cache, pool.map(render_task, misses, objects_dirs,
+                                                     chunksize=chunksize))
+    finally:
+        # Drop shards not started yet when the consumer stops early (e.g. a cancelled job)
+        pool.shutdown(cancel_futures=True)
+
+
+def _consume(
+    planned: List[Tuple[FileSystemNode, Optional[str], bool]],
+    cache: Optional[ExtractionCache],
+    rendered: Iterator[Tuple[Optional[str], Optional[str], Optional[int]]],
+) -> Iterator[Tuple[FileSystemNode, str, int]]:
+    """Merge cached and freshly rendered contents back into the order of the file list."""
+    for node, object_id, cached in planned:
+        if node.type == FileSystemNodeType.SYMLINK:
+            yield node, *render_file(node)
+            continue
+        content = tokens = None
+        if not cached:
+            # One rendered result exists per miss
+            hashed_id, content, tokens = next(rendered)  # pylint: disable=stop-iteration-return
+            if cache is not None and object_id is None:
+                object_id = hashed_id
+                cache.resolve(object_id)
+        if content is None:
+            content = cache.load(object_id)
+            if content is None:
+                # Evicted since the lookup
+                content, tokens = render_file(node)
+                cache.store(object_id, content)
+        elif cache is not None:
+            cache.store(object_id, content)
+        if cache is not None:
+            tokens = cache.record(node, object_id, content, tokens)
+        yield node, content, tokens
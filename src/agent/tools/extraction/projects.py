@@ -0,0 +1,141 @@
+"""
+Sub-project detection for monorepos.
+
+A directory holding a build manifest (PROJECT_MARKERS) is the root of a
+project. A monorepo is extracted as one unit per project plus a root unit for
+the files outside every project. Each unit leaves out the projects nested in
+it, so every file is extracted exactly once, and a project index links the
+artifacts of the units.
+
+Units are extracted from their own directory, so the ignore files of the
+directories above a project are rebased onto it and passed as exclude patterns.
+"""
+import json
+import os
+import posixpath
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from gitingest.utils.pattern_utils import process_patterns
+
+from src.agent.tools.extraction.config import PROJECT_MARKERS, VENDORED_PATH_PATTERNS
+from src.agent.tools.navigation.ignore import ignore_rules_for
+
+ROOT_UNIT = "."
+
+
+class Project(NamedTuple):
+    """A unit of a monorepo: its directory relative to the repository and its manifests."""
+    path: str
+    markers: Tuple[str, ...]
+
+    @property
+    def languages(self) -> List[str]:
+        """Ecosystems of the manifests ("python", "node", ...)."""
+        return list(dict.fromkeys(PROJECT_MARKERS[marker] for marker in self.markers))
+
+    def contains(self, other: "Project") -> bool:
+        """Whether another unit lies below this one."""
+        return other.path != self.path and (self.path == ROOT_UNIT
+                                            or other.path.startswith(self.path + "/"))
+
+
+def find_projects(root: str, exclude_patterns: Optional[Iterable[str]] = None) -> List[Project]:
+    """
+    Return the root unit and every project of a repository, in walk order.
+
+    Ignored and vendored directories are not searched, so the manifests of
+    `node_modules` or `third_party` packages are not taken for projects.
+    """
+    ignore_patterns, _ = process_patterns(exclude_patterns=set(exclude_patterns or ()))
+    rules = ignore_rules_for(Path(root), {*ignore_patterns, *VENDORED_PATH_PATTERNS})
+
+    projects = []
+    for directory, _, files in rules.walk():
+        rel_dir = Path(os.path.relpath(directory, root)).as_posix()
+        names = {entry.name for entry in files}
+        markers = tuple(marker for marker in PROJECT_MARKERS if marker in names)
+        if markers or rel_dir == ROOT_UNIT:
+            projects.append(Project(rel_dir, markers))
+    return projects
+
+
+def unit_exclude_patterns(root: str, projects: List[Project], project: Project) -> set[str]:
+    """
+    Return the patterns to exclude when extracting one unit from its directory.
+
+    These are its nested projects, and the ignore files of the directories above it.
+    """
+    prefix = "" if project.path == ROOT_UNIT else project.path + "/"
+    # Anchored at the unit, so a project "api" does not exclude every "api" directory
+    patterns = {f"/{other.path[len(prefix):]}/**" for other in projects
+                if project.contains(other)}
+    if project.path != ROOT_UNIT:
+        inherited = ignore_rules_for(Path(root)).rules_for(posixpath.dirname(project.path))
+        patterns.update(_rebase_patterns(inherited.patterns, project.path))
+    return patterns
+
+
+def _rebase_patterns(patterns: Iterable[str], directory: str) -> Iterator[str]:
+    """
+    Make root-relative ignore patterns relative to a directory.
+
+    Patterns without a slash apply at any depth and are kept as they are; patterns
+    anchored in the directory lose its prefix, and those anchored elsewhere are dropped.
+    """
+    for pattern in patterns:
+        negated = pattern.startswith("!")
+        body = pattern[1:] if negated else pattern
+        if "/" not in body.rstrip("/") or body.startswith("**/"):
+            rebased = body
+        elif body.startswith(directory + "/"):
+            rebased = body[len(directory) + 1:]
+        else:
+            continue
+        yield f"!{rebased}" if negated else rebased
+
+
+def write_project_index(
+    index_file: str,
+    projects: List[Project],
+    results: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Write the index linking the artifacts of every unit of a monorepo.
+
+    Args:
+        index_file: Path of the JSON index, in the repository root.
+        projects: Units of the repository, as returned by `find_projects`.
+        results: Outcome of the extraction of every unit, by unit path (see
+            `extract_many_to_artifacts`).
+
+    Returns:
+        The index: the repository and, per unit, its path, manifests, languages,
+        nested projects and artifact path and file count (or error).
+    """
+    index = {
+        "repository": os.path.dirname(os.path.abspath(index_file)),
+        "projects": [
+            {
+                "path": project.path,
+                "markers": list(project.markers),
+                "languages": project.languages,
+                "subprojects": [other.path for other in projects if project.contains(other)],
+                **_unit_result(results.get(project.path)),
+            }
+            for project in projects
+        ],
+    }
+    with open(index_file, "w", encoding="utf-8") as file:
+        json.dump(index, file, ensure_ascii=False, indent=2)
+    return index
+
+
+def _unit_result(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Index entry of the extraction of a unit; its artifact path becomes "artifact"."""
+    if result is None:
+        return {"success": False, "error": "Not extracted"}
+    result = dict(result)
+    if "path" in result:
+        result["artifact"] = result.pop("path")
+    return result
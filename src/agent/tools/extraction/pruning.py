@@ -0,0 +1,162 @@
+"""
+Pruning of duplicate, vendored and generated content during extraction.
+
+- Vendored and generated files recognised by their path (`vendor/`,
+  `third_party/`, `*_pb2.py`, `*.min.js`, ...) are left out before they are read.
+- Generated files recognised by the comment header at their top ("Code generated
+  ... DO NOT EDIT.", "@generated", "This file is auto-generated", ...) and
+  minified JS/CSS keep their block, with a placeholder instead of their content.
+- Exact duplicates of an earlier file are replaced by a reference to it.
+
+Pruned files stay in the directory tree; only the content body shrinks. The
+summary reports how many files were pruned for which reason, and pruned files
+keep their size in the directory aggregates (see tree_view.py).
+"""
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from gitingest.schemas import FileSystemNode
+
+from pathspec import PathSpec
+
+from src.agent.tools.extraction.config import (
+    DUPLICATE_MIN_BYTES,
+    GENERATED_HEADER_LINES,
+    GENERATED_PATH_PATTERNS,
+    MINIFIED_LINE_LENGTH,
+    VENDORED_PATH_PATTERNS,
+)
+from src.agent.tools.extraction.filesystem import relative_posix_path, with_content
+
+# The established markers, e.g. Go's "Code generated by X. DO NOT EDIT." and protoc's
+# "Generated by the protocol buffer compiler.  DO NOT EDIT!"
+GENERATED_HEADER_REGEX = re.compile(
+    r"\b(?:Code generated|Generated by) .*DO NOT EDIT\b|@generated\b"
+    r"|(?i:\bthis file (?:is|was|has been) (?:automatically |auto-?)generated\b)"
+)
+# Line comment and block comment prefixes a header line can start with
+COMMENT_PREFIXES = ("#", "//", "--", ";", "%", "/*", "<!--")
+# Lines that may precede the header comment (PHP/XML declarations)
+PREAMBLE_PREFIXES = ("<?",)
+GENERATED_PLACEHOLDER = "[Generated file]"
+MINIFIABLE_SUFFIXES = (".js", ".mjs", ".cjs", ".css")
+# Documentation talks about generated code rather than being generated
+DOCUMENT_SUFFIXES = (".md", ".rst", ".txt")
+
+
+class ContentPruner:
+    """Decides, file by file, what is kept out of the content body of one extraction."""
+
+    def __init__(self):
+        self.counts = {"duplicate": 0, "vendored": 0, "generated": 0}
+        # Files left out by `select_nodes`: {"path", "bytes", "pruned" (the reason)}
+        self.skipped: List[Dict[str, Any]] = []
+        self._first_paths: Dict[str, str] = {}
+
+    def skip_path(self, path: str) -> bool:
+        """Return True (and count it) if a file is left out because of its path alone."""
+        return self._path_reason(path) is not None
+
+    def select_nodes(self, nodes: Iterable[FileSystemNode]) -> List[FileSystemNode]:
+        """Return the file nodes that are not left out because of their path."""
+        selected = []
+        for node in nodes:
+            path = relative_posix_path(node)
+            reason = self._path_reason(path)
+            if reason is None:
+                selected.append(node)
+            else:
+                self.skipped.append({"path": path, "bytes": node.size, "pruned": reason})
+        return selected
+
+    def prune(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the file record to write in place of `record`.
+
+        Generated files get a placeholder content; duplicates get a reference to
+        the first file holding the same content (also set as "duplicate_of").
+        Both also carry the reason ("pruned") and the size of the content they
+        replace ("original_bytes").
+        """
+        content = record["content"]
+        if record["node_type"] != "FILE":
+            return record
+        if is_generated(record["path"], content):
+            self.counts["generated"] += 1
+            return {**with_content(record, GENERATED_PLACEHOLDER), "pruned": "generated",
+                    "original_bytes": _byte_size(content)}
+        if len(content) < DUPLICATE_MIN_BYTES:
+            return record
+
+        digest = hashlib.sha1(content.encode("utf-8", errors="surrogatepass"),
+                              usedforsecurity=False).hexdigest()
+        first = self._first_paths.setdefault(digest, record["path"])
+        if first == record["path"]:
+            return record
+
+        self.counts["duplicate"] += 1
+        return {**with_content(record, f"[Duplicate of {first}]"), "duplicate_of": first,
+                "pruned": "duplicate", "original_bytes": _byte_size(content)}
+
+    def describe(self) -> str:
+        """Return a summary line of the pruned files, or "" if nothing was pruned."""
+        parts = [f"{count} {reason}" for reason, count in self.counts.items() if count]
+        return f"Files pruned: {', '.join(parts)}\n" if parts else ""
+
+    def _path_reason(self, path: str) -> Optional[str]:
+        reason = path_reason(path)
+        if reason is not None:
+            self.counts[reason] += 1
+        return reason
+
+
+def path_reason(path: str) -> Optional[str]:
+    """Return "vendored" or "generated" if a path alone marks a file as such."""
+    vendored, generated = _path_specs()
+    if vendored.match_file(path):
+        return "vendored"
+    if generated.match_file(path):
+        return "generated"
+    return None
+
+
+def is_generated(path: str, content: str) -> bool:
+    """Return True for files with a generated-code header and for minified JS/CSS."""
+    if path.endswith(DOCUMENT_SUFFIXES):
+        return False
+    if GENERATED_HEADER_REGEX.search(header_comment(content)):
+        return True
+    if path.endswith(MINIFIABLE_SUFFIXES):
+        return max(len(line) for line in content.split("\n")) > MINIFIED_LINE_LENGTH
+    return False
+
+
+def header_comment(content: str) -> str:
+    """
+    Return the comment lines at the top of a file (within GENERATED_HEADER_LINES).
+
+    Scanning stops at the first line of code, so markers in docstrings, strings or
+    comments further down never count.
+    """
+    lines, in_block = [], False
+    for line in content.split("\n", GENERATED_HEADER_LINES)[:GENERATED_HEADER_LINES]:
+        stripped = line.strip()
+        if in_block or stripped.startswith(COMMENT_PREFIXES):
+            lines.append(stripped)
+            if stripped.startswith(("/*", "<!--")) or in_block:
+                in_block = "*/" not in stripped and "-->" not in stripped
+        elif stripped and not stripped.startswith(PREAMBLE_PREFIXES):
+            break
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def _path_specs() -> tuple[PathSpec, PathSpec]:
+    return (PathSpec.from_lines("gitwildmatch", VENDORED_PATH_PATTERNS),
+            PathSpec.from_lines("gitwildmatch", GENERATED_PATH_PATTERNS))
+
+
+def _byte_size(content: str) -> int:
+    return len(content.encode("utf-8", errors="surrogatepass"))
@@ -0,0 +1,167 @@
+"""
+Collapsed, aggregated view of an extracted repository tree.
+
+While an artifact is written, every directory accumulates the number of files,
+bytes, lines of code and lines per language below it. Pruned files (see
+pruning.py) count with their original size and no lines, and are marked. The view renders a few
+levels of that hierarchy with the aggregates on every directory, collapses the
+rest, and can be expanded from any subtree later on:
+
+    src/  [412 files, 1.2 MB, 48,210 LOC; Python 91%, Shell 6%]
+    ├── agent/  [380 files, 1.1 MB, 45,002 LOC; Python 100%]
+    └── ... 3 more directories, 12 files
+"""
+import posixpath
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.agent.tools.extraction.config import (
+    COLLAPSED_TREE_DEPTH,
+    COLLAPSED_TREE_MAX_ENTRIES,
+    LANGUAGE_EXTENSIONS,
+)
+
+PLACEHOLDER_CONTENTS = ("[Binary file]", "[Empty file]", "[Generated file]")
+
+
+class DirectoryAggregates:
+    """Per-directory totals of the files added to an artifact."""
+
+    def __init__(self):
+        self.directories: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, path: str, size: int, content: str, pruned: Optional[str] = None) -> None:
+        """
+        Count a file in its directory and in every directory above it.
+
+        A pruned file (`pruned` is the reason) counts with the size of the content it
+        was pruned of, and without lines.
+        """
+        if content in PLACEHOLDER_CONTENTS and not pruned:
+            # Only extracted text counts towards bytes and lines
+            size = 0
+        loc = 0 if pruned else count_loc(content)
+        language = language_for(path)
+        parts = path.split("/")[:-1]
+        for depth in range(len(parts) + 1):
+            stats = self.directories.setdefault("/".join(parts[:depth]), {
+                "files": 0, "bytes": 0, "loc": 0, "languages": {}, "pruned": 0,
+            })
+            stats["files"] += 1
+            stats["bytes"] += size
+            stats["loc"] += loc
+            if pruned:
+                stats["pruned"] += 1
+            if language and loc:
+                stats["languages"][language] = stats["languages"].get(language, 0) + loc
+
+
+def count_loc(content: str) -> int:
+    """Return the number of lines of a rendered file (0 for binary and empty files)."""
+    if not content or content in PLACEHOLDER_CONTENTS:
+        return 0
+    return content.count("\n") + (0 if content.endswith("\n") else 1)
+
+
+def language_for(path: str) -> Optional[str]:
+    """Return the language of a file from its extension, if known."""
+    name = posixpath.basename(path)
+    return LANGUAGE_EXTENSIONS.get(name) or LANGUAGE_EXTENSIONS.get(posixpath.splitext(name)[1])
+
+
+def render_tree_view(
+    directories: Dict[str, Dict[str, Any]],
+    files: Iterable[Dict[str, Any]],
+    subtree: str = "",
+    depth: int = COLLAPSED_TREE_DEPTH,
+    max_entries: int = COLLAPSED_TREE_MAX_ENTRIES,
+) -> str:
+    """
+    Render a subtree with aggregates, `depth` levels deep.
+
+    Args:
+        directories: Aggregates per directory path ("" is the repository root).
+        files: Index entries of the files ({"path", "bytes", ...}); pruned ones
+            (with "pruned") are marked.
+        subtree: Directory to start from, relative to the repository root.
+        depth: Number of directory levels below `subtree` that are expanded.
+        max_entries: Maximum number of entries listed per directory; the largest
+            directories are listed first and the remainder is summarized.
+
+    Raises:
+        KeyError: If `subtree` is not a directory of the extraction.
+    """
+    subtree = subtree.strip("/")
+    if subtree not in directories:
+        raise KeyError(subtree)
+
+    children: Dict[str, Tuple[List[str], List[Dict[str, Any]]]] = {}
+    for path in directories:
+        if path:
+            children.setdefault(posixpath.dirname(path), ([], []))[0].append(path)
+    for entry in files:
+        children.setdefault(posixpath.dirname(entry["path"]), ([], []))[1].append(entry)
+
+    name = posixpath.basename(subtree) or "."
+    lines = [f"{name}/  [{_describe(directories[subtree])}]"]
+    _render_children(subtree, directories, children, "", depth, max_entries, lines)
+    return "\n".join(lines) + "\n"
+
+
+def _render_children(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    directory: str,
+    directories: Dict[str, Dict[str, Any]],
+    children: Dict[str, Tuple[List[str], List[Dict[str, Any]]]],
+    prefix: str,
+    depth: int,
+    max_entries: int,
+    lines: List[str],
+) -> None:
+    if depth <= 0:
+        return
+    subdirs, files = children.get(directory, ([], []))
+    subdirs = sorted(subdirs, key=lambda path: (-directories[path]["files"], path))
+    files = sorted(files, key=lambda entry: entry["path"])
+
+    entries = [(path, True, None) for path in subdirs] + [
+        (entry["path"], False, entry.get("pruned")) for entry in files]
+    shown, hidden = entries[:max_entries], entries[max_entries:]
+    for i, (path, is_dir, pruned) in enumerate(shown):
+        is_last = i == len(shown) - 1 and not hidden
+        connector = "└── " if is_last else "├── "
+        if is_dir:
+            lines.append(f"{prefix}{connector}{posixpath.basename(path)}/  "
+                         f"[{_describe(directories[path])}]")
+            _render_children(path, directories, children,
+                             prefix + ("    " if is_last else "│   "),
+                             depth - 1, max_entries, lines)
+        else:
+            lines.append(f"{prefix}{connector}{posixpath.basename(path)}"
+                         + (f"  ({pruned})" if pruned else ""))
+
+    if hidden:
+        hidden_dirs = sum(1 for _, is_dir, _ in hidden if is_dir)
+        hidden_files = len(hidden) - hidden_dirs
+        lines.append(f"{prefix}└── ... {hidden_dirs} more directories, {hidden_files} files")
+
+
+def _describe(stats: Dict[str, Any]) -> str:
+    """Format the aggregates of a directory."""
+    files = stats["files"]
+    text = (f"{files:,} file{'s' if files != 1 else ''}, "
+            f"{_format_bytes(stats['bytes'])}, {stats['loc']:,} LOC")
+    shares = [(language, round(100 * loc / stats["loc"]))
+              for language, loc in sorted(stats["languages"].items(), key=lambda item: -item[1])]
+    shares = [(language, share) for language, share in shares[:3] if share > 0]
+    if shares:
+        text += "; " + ", ".join(f"{language} {share}%" for language, share in shares)
+    if stats.get("pruned"):
+        text += f"; {stats['pruned']:,} pruned"
+    return text
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,47 @@
+"""Utility functions for hashing and token counting during extraction."""
+import hashlib
+from functools import lru_cache
+from typing import Optional
+
+from src.agent.tools.extraction.config import TOKEN_ENCODING, CHARS_PER_TOKEN
+
+_TOKEN_THRESHOLDS = [
+    (1_000_000, "M"),
+    (1_000, "k"),
+]
+
+
+def git_blob_sha(data: bytes) -> str:
+    """Return the git blob SHA-1 of the given bytes (same as `git hash-object`)."""
+    header = f"blob {len(data)}\0".encode("ascii")
+    return hashlib.sha1(header + data, usedforsecurity=False).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer once; returns None if it cannot be loaded (e.g. offline)."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    # pylint: disable=broad-exception-caught
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text, falling back to a character based estimate."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def format_token_count(total_tokens: int) -> Optional[str]:
+    """Return a human-readable token count (e.g. 1.2k, 1.2M), matching gitingest."""
+    if total_tokens <= 0:
+        return None
+    for threshold, suffix in _TOKEN_THRESHOLDS:
+        if total_tokens >= threshold:
+            return f"{total_tokens / threshold:.1f}{suffix}"
+    return str(total_tokens)
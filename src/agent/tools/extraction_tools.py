@@ -0,0 +1,640 @@
+"""
+This file defines tools to extract repository details and load the extractions.
+"""
+import functools
+import os
+import re
+import json
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple
+
+from langchain.tools import tool
+from gitingest.config import MAX_FILE_SIZE
+
+from src.agent.tools.navigation import resolve_repository_path
+from src.agent.tools.navigation.prefetch import register_warmer
+from .config import (
+    GITINGEST_DEFAULT_OUTPUT_LOCATION,
+    EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    EXTRACTION_COMPRESSED_OUTPUT_LOCATION,
+    REVISION_OUTPUT_LOCATION,
+    PROJECT_INDEX_LOCATION,
+)
+from .extraction.artifact import ArtifactReader, index_path_for, is_artifact_path
+from .extraction.compaction import VIEWS, render_view
+from .extraction.digest import build_digest
+from .extraction.jobs import start_job, get_job, list_jobs
+from .extraction.config import (
+    DEFAULT_EXCLUDE_PATTERNS,
+    DEFAULT_INGESTION_WORKERS,
+    COLLAPSED_TREE_DEPTH,
+    COLLAPSED_TREE_MAX_ENTRIES,
+)
+from .extraction.pipeline import file_block
+from .extraction.projects import find_projects, unit_exclude_patterns, write_project_index
+from .github import progress_writer
+from .gitingest_helpers import (
+    ingest_local_incremental,
+    extract_local_to_artifact,
+    extract_many_to_artifacts,
+    extract_revision_to_artifact,
+    extraction_records,
+    ingest_revision,
+    normalize_path,
+    warm_dependency_graph,
+    warm_extraction_cache,
+)
+
+# Warm the caches of the extraction tools whenever the agent enters a repository
+register_warmer("extraction_cache", warm_extraction_cache)
+register_warmer("dependency_graph", warm_dependency_graph)
+
+
+@tool("extract_git_repository_details_to_file")
+async def extract_repository_details(  # pylint: disable=too-many-return-statements,too-many-arguments,too-many-positional-arguments
+    local_repository_path: Optional[str],
+    output_path: Optional[str] = EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    use_cache: bool = True,
+    revision: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    prune_content: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract and ingest a Git repository (local or remote) into a readable LLM format.
+    Secrets in file contents (keys, tokens, passwords) are replaced by "<REDACTED>".
+    For a monorepo, `extract_monorepo_projects` extracts every project on its own.
+    A single file is extracted on its own: its extraction is returned as data, or
+    written as a JSON object next to it when output_path is not an ".ndjson" path.
+
+    Args:
+        local_repository_path: Path to a local repository directory.
+        github_url: HTTPS URL of a remote GitHub repository.
+        output_path: Output path for the extraction
+            (default: "extract_repository_details.ndjson" (EXTRACTION_DEFAULT_OUTPUT_LOCATION),
+            use "-" or "stdout" for stdout). A ".ndjson" path is written as a streaming
+            artifact with one record per file and a ".index.json" sidecar; a ".ndjson.z"
+            path (e.g. "extract_repository_details.ndjson.z") writes the same artifact in
+            independently compressed blocks, which takes far less disk space while single
+            files can still be loaded on their own; any other path is written as a single
+            JSON object.
+        use_cache: If True, reuse the per-repository extraction cache so only
+            files changed since the last extraction are read again.
+        revision: Commit, tag or branch to extract instead of the working tree.
+            It is read from the git object database without a checkout, and the
+            default output becomes "extract_repository_details@{revision}.ndjson".
+        token_budget: If given, also return a digest of the repository: the summary,
+            the tree and the most important files (entry points, manifests, package
+            __init__s, most imported modules) that fit in this many tokens.
+            The full extraction stays on disk for `load_extracted_repository_from_file`.
+        prune_content: If True, leave vendored code (vendor/, third_party/, ...) out of
+            the content, replace generated files (protobuf stubs, minified bundles,
+            "DO NOT EDIT" headers) by a placeholder and exact duplicates by a reference
+            to the first copy. The tree still lists every file.
+    Returns:
+        path to the extraction holding summary (str), tree (str), and content of the repository.
+        For ".ndjson"/".ndjson.z" outputs also an overview: a collapsed tree with file counts,
+        size, lines of code and languages per directory (expand it with
+        `expand_repository_tree`), plus the digest (dict) when token_budget is given.
+    """
+
+    try:
+        # Get current working directory in a non-blocking way
+        cwd = await asyncio.to_thread(os.getcwd)
+        if local_repository_path is not None:
+            path = normalize_path(local_repository_path, cwd)
+        else:
+            return {
+                "success": False,
+                "error": "local_repository_path must be provided"
+            }
+
+        if revision is None and not await asyncio.to_thread(os.path.isdir, path):
+            return await _extract_single_file(path, output_path)
+
+        if revision is not None and output_path == EXTRACTION_DEFAULT_OUTPUT_LOCATION:
+            output_path = _revision_output_path(revision)
+
+        if output_path not in (None, "-", "stdout") and is_artifact_path(output_path):
+            return await _extract_artifact(path, os.path.join(path, output_path), revision,
+                                           use_cache=use_cache, token_budget=token_budget,
+                                           prune=prune_content)
+        if token_budget is not None:
+            return {"success": False, "error": "token_budget requires an .ndjson output_path"}
+
+        if revision is not None:
+            summary, tree, content = await ingest_revision(
+                path,
+                revision,
+                max_file_size=MAX_FILE_SIZE,
+                exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+                prune=prune_content,
+            )
+        else:
+            # Non-blocking record pipeline, which also redacts secrets from the content
+            summary, tree, content = await ingest_local_incremental(
+                path,
+                workers=DEFAULT_INGESTION_WORKERS,
+                use_cache=use_cache,
+                prune=prune_content,
+                max_file_size=MAX_FILE_SIZE,
+                exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+                include_gitignored=False
+            )
+
+        extraction = {"summary": summary, "tree": tree, "content": content}
+
+        if output_path in ["-", "stdout"]:
+            print(json.dumps(extraction, ensure_ascii=False, indent=2))
+            return {"success": True, "data": extraction}
+
+        if output_path is not None:
+            # Save the output file in the repository folder
+            output_file_path = os.path.join(path, output_path)
+            await asyncio.to_thread(
+                _write_json_file,
+                output_file_path,
+                extraction
+            )
+            return {"success": True, "path": output_file_path}
+
+        return {"success": True, "data": extraction}
+
+    except PermissionError as e:
+        return {"success": False, "error": f"Permission denied: {e}"}
+    # pylint: disable=broad-exception-caught
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@tool("extract_repositories_batch")
+async def extract_repositories_batch(
+    repositories: List[str],
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    prune_content: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract several repositories in ./repositories/ at the same time.
+
+    Each repository is ingested in its own worker process into the same artifact
+    `extract_git_repository_details_to_file` writes
+    ("extract_repository_details.ndjson" inside the repository).
+    Progress is streamed per repository as it finishes.
+
+    Args:
+        repositories: Names of the repository folders inside ./repositories/.
+        max_workers: Number of repositories extracted at once (default: one per CPU core).
+        use_cache: If True, reuse the per-repository extraction caches.
+        prune_content: If True, prune vendored, generated and duplicate files from
+            the content (see `extract_git_repository_details_to_file`).
+    Returns:
+        success (True if every repository was extracted) and, per repository,
+        its artifact path and file count or an error.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    jobs: Dict[str, Tuple[str, str]] = {}
+    for name in dict.fromkeys(repositories):
+        path = str(resolve_repository_path(name))
+        if await asyncio.to_thread(os.path.isdir, path):
+            jobs[name] = (path, os.path.join(path, EXTRACTION_DEFAULT_OUTPUT_LOCATION))
+        else:
+            results[name] = {"success": False, "error": f"Repository not found: {path}"}
+
+    results.update(await extract_many_to_artifacts(
+        jobs,
+        max_workers=max_workers,
+        on_progress=progress_writer("extraction_progress"),
+        max_file_size=MAX_FILE_SIZE,
+        exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+        use_cache=use_cache,
+        prune=prune_content,
+    ))
+    return {
+        "success": all(result["success"] for result in results.values()),
+        "repositories": results,
+    }
+
+@tool("extract_monorepo_projects")
+async def extract_monorepo_projects(
+    local_repository_path: str,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    prune_content: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract every project of a monorepo into its own artifact, in parallel.
+
+    Directories holding a pyproject.toml, package.json, go.mod, pom.xml or Cargo.toml
+    are projects. Each is extracted without its nested projects into
+    "extract_repository_details.ndjson" inside the project, with its own tree and
+    summary; the files outside every project go to the artifact of the repository
+    root. Load a project with `load_extracted_repository_from_file` and its path.
+
+    Args:
+        local_repository_path: Path to a local repository directory.
+        max_workers: Number of projects extracted at once (default: one per CPU core).
+        use_cache: If True, reuse the per-project extraction caches.
+        prune_content: If True, prune vendored, generated and duplicate files from
+            the content (see `extract_git_repository_details_to_file`).
+    Returns:
+        success (True if every project was extracted), the path of the project index
+        ("extract_repository_details.projects.json" in the repository) and, per
+        project, its path, manifests, languages, nested projects, artifact and
+        file count or an error.
+    """
+    try:
+        cwd = await asyncio.to_thread(os.getcwd)
+        path = normalize_path(local_repository_path, cwd)
+        if not await asyncio.to_thread(os.path.isdir, path):
+            return {"success": False, "error": f"Directory not found: {path}"}
+
+        projects = await asyncio.to_thread(find_projects, path, DEFAULT_EXCLUDE_PATTERNS)
+        jobs, excludes = {}, {}
+        for project in projects:
+            directory = os.path.normpath(os.path.join(path, project.path))
+            jobs[project.path] = (directory,
+                                  os.path.join(directory, EXTRACTION_DEFAULT_OUTPUT_LOCATION))
+            excludes[project.path] = unit_exclude_patterns(path, projects, project)
+
+        results = await extract_many_to_artifacts(
+            jobs,
+            max_workers=max_workers,
+            on_progress=progress_writer("extraction_progress"),
+            max_file_size=MAX_FILE_SIZE,
+            exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+            job_exclude_patterns=excludes,
+            use_cache=use_cache,
+            prune=prune_content,
+        )
+        index_file = os.path.join(path, PROJECT_INDEX_LOCATION)
+        index = await asyncio.to_thread(write_project_index, index_file, projects, results)
+        return {
+            "success": all(result["success"] for result in results.values()),
+            "index": index_file,
+            "projects": index["projects"],
+        }
+
+    except PermissionError as e:
+        return {"success": False, "error": f"Permission denied: {e}"}
+    # pylint: disable=broad-exception-caught
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+async def _extract_single_file(path: str, output_path: Optional[str]) -> Dict[str, Any]:
+    """Extract one file through gitingest's single file ingestion."""
+    summary, tree, content = await ingest_local_incremental(
+        path,
+        max_file_size=MAX_FILE_SIZE,
+        exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+        include_gitignored=False
+    )
+    extraction = {"summary": summary, "tree": tree, "content": content}
+
+    if output_path in ["-", "stdout"]:
+        print(json.dumps(extraction, ensure_ascii=False, indent=2))
+    elif output_path is not None and not is_artifact_path(output_path):
+        output_file_path = os.path.join(os.path.dirname(path), output_path)
+        await asyncio.to_thread(_write_json_file, output_file_path, extraction)
+        return {"success": True, "path": output_file_path}
+    return {"success": True, "data": extraction}
+
+async def _extract_artifact(  # pylint: disable=too-many-arguments
+    path: str,
+    output_file_path: str,
+    revision: Optional[str],
+    *,
+    use_cache: bool,
+    token_budget: Optional[int],
+    prune: bool,
+) -> Dict[str, Any]:
+    """Stream an extraction straight to disk instead of building one big string."""
+    if revision is not None:
+        index = await extract_revision_to_artifact(
+            path,
+            revision,
+            output_file_path,
+            max_file_size=MAX_FILE_SIZE,
+            exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+            prune=prune,
+        )
+    else:
+        index = await extract_local_to_artifact(
+            path,
+            output_file_path,
+            max_file_size=MAX_FILE_SIZE,
+            exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+            include_gitignored=False,
+            use_cache=use_cache,
+            workers=DEFAULT_INGESTION_WORKERS,
+            prune=prune,
+        )
+    result = {
+        "success": True,
+        "path": output_file_path,
+        "index": index_path_for(output_file_path),
+        "files": len(index["files"]),
+    }
+    result.update(await asyncio.to_thread(_describe_artifact, output_file_path, token_budget))
+    return result
+
+def _describe_artifact(path: str, token_budget: Optional[int]) -> Dict[str, Any]:
+    """Return the collapsed tree overview and, with a token budget, the digest of an artifact."""
+    with ArtifactReader(path) as reader:
+        description = {"overview": reader.tree_view()}
+        if token_budget is not None:
+            description["digest"] = build_digest(reader, token_budget)
+    return description
+
+@tool("start_extraction_job")
+async def start_extraction_job(
+    local_repository_path: str,
+    output_path: str = EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    revision: Optional[str] = None,
+    use_cache: bool = True,
+    prune_content: bool = True,
+) -> Dict[str, Any]:
+    """
+    Start extracting a repository in the background and return a job id right away.
+
+    Use this for large repositories instead of `extract_git_repository_details_to_file`;
+    keep working while it runs and check on it with `get_extraction_job_status`.
+
+    Args:
+        local_repository_path: Path to a local repository directory.
+        output_path: Artifact to write inside the repository (".ndjson" or ".ndjson.z",
+            default: "extract_repository_details.ndjson").
+        revision: Commit, tag or branch to extract instead of the working tree.
+        use_cache: If True, reuse the per-repository extraction cache.
+        prune_content: If True, prune vendored, generated and duplicate files from
+            the content (see `extract_git_repository_details_to_file`).
+    Returns:
+        job_id and the path of the artifact being written.
+    """
+    cwd = await asyncio.to_thread(os.getcwd)
+    path = normalize_path(local_repository_path, cwd)
+    if not await asyncio.to_thread(os.path.isdir, path):
+        return {"success": False, "error": f"Directory not found: {path}"}
+    if revision is not None and output_path == EXTRACTION_DEFAULT_OUTPUT_LOCATION:
+        output_path = _revision_output_path(revision)
+    if not is_artifact_path(output_path):
+        return {"success": False, "error": "output_path must end in .ndjson or .ndjson.z"}
+
+    records = functools.partial(
+        extraction_records,
+        path,
+        revision=revision,
+        max_file_size=MAX_FILE_SIZE,
+        exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+        use_cache=use_cache,
+        workers=DEFAULT_INGESTION_WORKERS,
+        prune=prune_content,
+    )
+    job = start_job(path, os.path.join(path, output_path), records)
+    return {"success": True, "job_id": job.job_id, "path": job.output_file}
+
+@tool("get_extraction_job_status")
+def get_extraction_job_status(job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Report the progress of a background extraction job.
+
+    Args:
+        job_id: Id returned by `start_extraction_job`; if omitted, all jobs are listed.
+    Returns:
+        status (pending, running, completed, failed or cancelled), files_done, total_files,
+        bytes_done, elapsed_seconds, eta_seconds and the artifact path.
+    """
+    if job_id is None:
+        return {"success": True, "jobs": [job.describe() for job in list_jobs()]}
+    job = get_job(job_id)
+    if job is None:
+        return {"success": False, "error": f"Unknown extraction job: {job_id}"}
+    return {"success": True, **job.describe()}
+
+@tool("get_extraction_job_partial_results")
+def get_extraction_job_partial_results(
+    job_id: str,
+    file_paths: Optional[List[str]] = None,
+    include_tree: bool = True,
+) -> Dict[str, Any]:
+    """
+    Return what a background extraction job has extracted so far.
+
+    Args:
+        job_id: Id returned by `start_extraction_job`.
+        file_paths: Repository relative paths whose content should be returned
+            if they are already extracted.
+        include_tree: If True, include the directory tree once it is known.
+    Returns:
+        files_done (paths extracted so far), files (path -> content), pending
+        (requested paths not extracted yet), unavailable (requested paths extracted
+        but no longer readable, e.g. after the job failed or was cancelled) and the tree.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return {"success": False, "error": f"Unknown extraction job: {job_id}"}
+    return {"success": True, "status": job.status,
+            **job.partial_results(file_paths, include_tree)}
+
+@tool("cancel_extraction_job")
+def cancel_extraction_job(job_id: str) -> Dict[str, Any]:
+    """
+    Cancel a background extraction job. Its partial artifact is removed.
+
+    Args:
+        job_id: Id returned by `start_extraction_job`.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return {"success": False, "error": f"Unknown extraction job: {job_id}"}
+    if not job.cancel():
+        return {"success": False, "error": f"Extraction job already {job.status}"}
+    return {"success": True, "job_id": job_id, "status": "cancelling"}
+
+def _revision_output_path(revision: str) -> str:
+    """Return the default artifact name for a revision, safe to use as a file name."""
+    return REVISION_OUTPUT_LOCATION.format(revision=re.sub(r"[^\w.-]", "_", revision))
+
+def _write_json_file(file_path: str, data: Dict[str, Any]) -> None:
+    """Helper function to write JSON data to a file."""
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+@tool("load_extracted_repository_from_file")
+def load_extracted_repository(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-return-statements
+    path: str = EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    include_summary: bool = True,
+    include_tree: bool = True,
+    include_content: bool = True,
+    file_paths: Optional[List[str]] = None,
+    include_patterns: Optional[List[str]] = None,
+    exclude_patterns: Optional[List[str]] = None,
+    max_bytes: Optional[int] = None,
+    view: str = "full",
+) -> Dict[str, Any]:
+    """
+    Load the extracted repository details from a file.
+    This file is expected to be generated by the `extract_repository_details` tool.
+
+    Args:
+        path: Path to the extraction file containing the extracted repository details.
+              Defaults to 'extract_repository_details.ndjson' (".ndjson.z" compressed
+              extractions are read the same way).
+              If a directory is provided, will look for the extraction file in that directory.
+        include_summary: If True, include the summary in the response.
+        include_tree: If True, include the tree structure in the response.
+        include_content: If True, include the file contents in the response.
+        file_paths: Optional list of repository relative file paths. If given, only these
+              files are returned (under "files") instead of the whole content.
+        include_patterns: Optional globs (e.g. "src/**/*.py"); only matching files are returned.
+        exclude_patterns: Optional globs; matching files are left out.
+        max_bytes: Optional budget for the total size of the returned file contents.
+        view: How file contents are returned, to save tokens:
+              "full" (as extracted), "compact" (comments, docstrings and blank lines
+              stripped) or "skeleton" (only imports and class/function signatures;
+              Markdown keeps its headings). Use "skeleton" to survey the architecture
+              and load single files in full when their bodies matter.
+        The file selection options and views are only supported for ".ndjson"/".ndjson.z"
+        extractions.
+
+    Returns:
+        A dict with the loaded repository details containing the requested parts:
+        - summary (str): Overview of the repository (if include_summary=True)
+        - tree (str): Directory structure (if include_tree=True)
+        - content (str): File contents (if include_content=True and no file_paths)
+        - files (dict): Path to file content (if file_paths is given)
+        - missing (list): Requested file paths not found in the extraction
+        - omitted (int): Matching files left out because of max_bytes
+    """
+    # If path is a directory, look for the default extraction file in that directory
+    if os.path.isdir(path):
+        path = _default_extraction_file(path)
+    if not os.path.exists(path):
+        return {"success": False, "error": f"File not found: {path}"}
+    if not os.path.isfile(path):
+        return {"success": False, "error": f"Path is not a file: {path}"}
+    if view not in VIEWS:
+        return {"success": False, "error": f"view must be one of: {', '.join(VIEWS)}"}
+
+    try:
+        selection = None
+        if any(option is not None
+               for option in (file_paths, include_patterns, exclude_patterns, max_bytes)):
+            selection = {
+                "file_paths": file_paths,
+                "include_patterns": include_patterns,
+                "exclude_patterns": exclude_patterns,
+                "max_bytes": max_bytes,
+            }
+        if is_artifact_path(path):
+            return _load_artifact(path, include_summary, include_tree, include_content,
+                                  selection, view)
+        if view != "full":
+            return {"success": False,
+                    "error": "Views require an .ndjson extraction, re-run the extraction"}
+        return _load_json_file(path, include_summary, include_tree, include_content, selection)
+
+    except json.JSONDecodeError:
+        return {"success": False, "error": "Invalid JSON format in file"}
+    # pylint: disable=broad-exception-caught
+    except Exception as e:
+        return {"success": False, "error": f"Error loading file: {str(e)}"}
+
+
+@tool("expand_repository_tree")
+def expand_repository_tree(
+    path: str = EXTRACTION_DEFAULT_OUTPUT_LOCATION,
+    subtree: str = "",
+    depth: int = COLLAPSED_TREE_DEPTH,
+    max_entries: int = COLLAPSED_TREE_MAX_ENTRIES,
+) -> Dict[str, Any]:
+    """
+    Show part of an extracted repository tree, with aggregates per directory.
+
+    Every directory is shown with its number of files, size, lines of code and main
+    languages; directories deeper than `depth` are collapsed. Use it to drill into
+    the overview returned by the extraction.
+
+    Args:
+        path: Extraction artifact (".ndjson"/".ndjson.z"), or the directory holding it.
+        subtree: Directory to expand, relative to the repository root (default: the root).
+        depth: Number of directory levels to expand below the subtree.
+        max_entries: Maximum number of entries listed per directory.
+    Returns:
+        tree (str): The rendered subtree.
+    """
+    if os.path.isdir(path):
+        path = _default_extraction_file(path)
+    if not is_artifact_path(path) or not os.path.isfile(path):
+        return {"success": False, "error": f"Extraction artifact not found: {path}"}
+    try:
+        with ArtifactReader(path) as reader:
+            return {"success": True, "tree": reader.tree_view(subtree, depth, max_entries)}
+    except KeyError:
+        return {"success": False, "error": f"Directory not found in the extraction: {subtree}"}
+
+
+def _default_extraction_file(directory: str) -> str:
+    """Return the extraction file in a directory, preferring the streaming artifacts."""
+    for name in (EXTRACTION_DEFAULT_OUTPUT_LOCATION, EXTRACTION_COMPRESSED_OUTPUT_LOCATION):
+        artifact = os.path.join(directory, name)
+        if os.path.exists(artifact):
+            return artifact
+    return os.path.join(directory, GITINGEST_DEFAULT_OUTPUT_LOCATION)
+
+
+def _load_json_file(
+    path: str,
+    include_summary: bool,
+    include_tree: bool,
+    include_content: bool,
+    selection: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Load the requested parts of a legacy single-object JSON extraction."""
+    if selection is not None:
+        return {"success": False,
+                "error": "Selecting files requires an .ndjson extraction, re-run the extraction"}
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    result = {"success": True}
+
+    if include_summary and "summary" in data:
+        result["summary"] = data["summary"]
+
+    if include_tree and "tree" in data:
+        result["tree"] = data["tree"]
+
+    if include_content and "content" in data:
+        result["content"] = data["content"]
+
+    return result
+
+
+def _load_artifact(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    path: str,
+    include_summary: bool,
+    include_tree: bool,
+    include_content: bool,
+    selection: Optional[Dict[str, Any]],
+    view: str = "full",
+) -> Dict[str, Any]:
+    """Load the requested parts of a streaming artifact, reading only their records."""
+    result: Dict[str, Any] = {"success": True}
+    with ArtifactReader(path) as reader:
+        if include_summary:
+            result["summary"] = reader.summary()
+
+        if include_tree:
+            result["tree"] = reader.tree()
+
+        if selection is not None:
+            result.update(reader.select(**selection, view=view))
+        elif include_content:
+            result["content"] = "\n".join(
+                file_block({**record, "content": render_view(record["path"], record["content"],
+                                                             view)})
+                for record in reader.iter_files()
+            )
+
+    return result
@@ -0,0 +1,296 @@
+"""
+Helper functions for the local object stores used by the git tools.
+
+Every remote URL gets one bare mirror under `{AGENT_WORKSPACE_BASE_PATH}/{TEMP_DIR}`.
+Working clones borrow objects from the mirror through git alternates
+(`git clone --reference`), so cloning a repository again only transfers
+what changed since the mirror was last fetched.
+
+Branch checkouts of one repository are git worktrees of a single bare
+store in `repositories/{dest}/.bare`, so every branch shares one object database.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from git import Git, Repo, GitCommandError
+from git.exc import NoSuchPathError, InvalidGitRepositoryError
+
+from src.agent.tools.navigation.config import AGENT_WORKSPACE_BASE_PATH, TEMP_DIR
+
+MIRROR_CACHE_ROOT = AGENT_WORKSPACE_BASE_PATH / TEMP_DIR
+WORKTREE_STORE_DIR = ".bare"
+MIRROR_FETCH_ARGS = ["--prune", "origin"]
+GIT_PROGRESS_REGEX = re.compile(
+    r"^(?:remote: )?(?P<phase>[A-Za-z ]+):\s+(?P<percent>\d+)% \((?P<done>\d+)/(?P<total>\d+)\)"
+)
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def mirror_path_for(repo_url: str, cache_root: Optional[Path] = None) -> Path:
+    """Return the location of the bare mirror for a repository URL."""
+    name = repo_url.rstrip("/").rsplit("/", 1)[-1].removesuffix(".git") or "repository"
+    digest = hashlib.sha1(repo_url.encode("utf-8"), usedforsecurity=False).hexdigest()[:12]
+    return Path(cache_root or MIRROR_CACHE_ROOT) / f"{name}-{digest}.git"
+
+
+def update_mirror(repo_url: str, cache_root: Optional[Path] = None) -> Optional[Path]:
+    """
+    Fetch the latest refs and objects into the mirror of a repository, if one exists.
+
+    Returns:
+        The mirror path, or None when the repository has not been mirrored yet.
+        A failed fetch (e.g. offline) still returns the mirror, since the objects
+        it already holds can be reused.
+    """
+    mirror = mirror_path_for(repo_url, cache_root)
+    if not mirror.is_dir():
+        return None
+    try:
+        Repo(mirror).git.fetch(*MIRROR_FETCH_ARGS)
+    except GitCommandError:
+        pass
+    return mirror
+
+
+async def update_mirror_async(repo_url: str, cache_root: Optional[Path] = None,
+                              timeout: Optional[float] = None) -> Optional[Path]:
+    """
+    Like `update_mirror`, but fetch through an asyncio subprocess.
+
+    A fetch that times out is treated like a failed one: the mirror is still returned.
+    Cancellation kills the fetch and is re-raised.
+    """
+    mirror = mirror_path_for(repo_url, cache_root)
+    if not await asyncio.to_thread(mirror.is_dir):
+        return None
+    try:
+        await run_git_fetch(mirror, MIRROR_FETCH_ARGS, timeout=timeout)
+    except (GitCommandError, TimeoutError):
+        pass
+    return mirror
+
+
+def seed_mirror(repo_url: str, clone_path: str,
+                cache_root: Optional[Path] = None) -> Optional[Path]:
+    """
+    Create the mirror of a repository from a fresh, complete clone of it.
+
+    The clone already holds every object, so the mirror is built locally
+    (hardlinked where possible) instead of downloading the repository again.
+    Seeding is best effort: failures leave no mirror behind and return None.
+    """
+    mirror = mirror_path_for(repo_url, cache_root)
+    if mirror.exists():
+        return mirror
+    tmp_mirror = mirror.with_name(mirror.name + ".tmp")
+    try:
+        _remove_leftover(tmp_mirror)
+        Git().clone("--mirror", "--quiet", str(clone_path), str(tmp_mirror))
+        repo = Repo(tmp_mirror)
+        repo.git.remote("set-url", "origin", repo_url)
+        # Working clones reference these objects, so they must never be pruned
+        repo.git.config("gc.pruneExpire", "never")
+        repo.close()
+        tmp_mirror.rename(mirror)
+        return mirror
+    except (GitCommandError, InvalidGitRepositoryError, NoSuchPathError, OSError):
+        _remove_leftover(tmp_mirror)
+        return None
+
+
+def _remove_leftover(path: Path) -> None:
+    """Remove a partially written mirror, if any."""
+    if path.exists():
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def ensure_worktree_store(repo_url: str, container: Path, clone_options: Dict[str, Any],
+                          fetch: bool = True) -> Repo:
+    """
+    Return the bare object store shared by all branch worktrees of a repository.
+
+    The store lives in `{container}/{WORKTREE_STORE_DIR}`. It is cloned on first
+    use and fetched afterwards, with every remote branch mapped to a
+    remote-tracking ref so any branch can be checked out as a worktree.
+    Callers that already fetched the store (e.g. asynchronously) pass fetch=False.
+    """
+    store = container / WORKTREE_STORE_DIR
+    if store.is_dir():
+        repo = open_worktree_store(store)
+    else:
+        options = {key: value for key, value in clone_options.items() if key != "sparse"}
+        repo = configure_worktree_store(Repo.clone_from(repo_url, store, bare=True, **options))
+
+    if fetch:
+        repo.git.fetch(*worktree_fetch_args(clone_options))
+    return repo
+
+
+def worktree_fetch_args(clone_options: Dict[str, Any]) -> List[str]:
+    """Return the `git fetch` arguments that update a worktree store."""
+    fetch_args = ["--prune", "origin"]
+    if clone_options.get("depth"):
+        fetch_args.append(f"--depth={clone_options['depth']}")
+    return fetch_args
+
+
+def open_worktree_store(store: Path) -> Repo:
+    """
+    Open an existing bare worktree store.
+
+    A sparse checkout in a worktree moves `core.bare` into the store's
+    `config.worktree`, which GitPython does not read, so it would take the
+    container for a working tree. Pinning GIT_DIR keeps git commands on the store.
+    """
+    repo = Repo(store)
+    repo.git.update_environment(GIT_DIR=str(store))
+    return repo
+
+
+def configure_worktree_store(repo: Repo) -> Repo:
+    """Map every remote branch of a freshly cloned bare store to a remote-tracking ref."""
+    repo.git.config("remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*")
+    return repo
+
+
+def add_worktree(store: Repo, path: Path, branch: str,
+                 sparse_paths: Optional[List[str]] = None) -> Repo:
+    """
+    Check out a branch of the store as a worktree at `path`.
+
+    The local branch is (re)set to the remote-tracking branch, and if
+    sparse paths are given only those directories are checked out.
+    """
+    store.git.worktree("add", "--no-checkout", "-B", branch, str(path), f"origin/{branch}")
+    worktree = Repo(path)
+    if sparse_paths:
+        worktree.git.sparse_checkout("set", *sparse_paths)
+    worktree.git.checkout()
+    return worktree
+
+
+def list_worktrees(store: Repo) -> List[Dict[str, Any]]:
+    """Return the branch worktrees of a store (path, branch and HEAD commit)."""
+    worktrees: List[Dict[str, Any]] = []
+    for block in store.git.worktree("list", "--porcelain").split("\n\n"):
+        fields = dict(
+            line.split(" ", 1) if " " in line else (line, True)
+            for line in block.splitlines()
+        )
+        if "bare" in fields or "worktree" not in fields:
+            continue
+        worktrees.append({
+            "path": fields["worktree"],
+            "branch": str(fields.get("branch", "")).removeprefix("refs/heads/") or None,
+            "head": fields.get("HEAD"),
+            "prunable": "prunable" in fields,
+        })
+    return worktrees
+
+
+def clone_flags(clone_options: Dict[str, Any]) -> List[str]:
+    """Translate GitPython style clone keyword options into `git clone` flags."""
+    flags = []
+    for key, value in clone_options.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            flags.append(flag)
+        elif value not in (None, False):
+            flags.append(f"{flag}={value}")
+    return flags
+
+
+async def run_git_clone(
+    repo_url: str,
+    dest: Path,
+    clone_options: Dict[str, Any],
+    on_progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None,
+) -> None:
+    """
+    Run `git clone` as an asyncio subprocess, reporting progress as it arrives.
+
+    Args:
+        repo_url: URL or path to clone from.
+        dest: Destination directory.
+        clone_options: GitPython style options (e.g. {"depth": 1, "bare": True}).
+        on_progress: Called with {"phase", "percent", "done", "total"} for every
+            progress update git prints.
+        timeout: Seconds after which the clone is aborted with TimeoutError.
+
+    The git process is killed if the clone times out or the calling task is
+    cancelled; cleaning up the destination is left to the caller.
+    """
+    await run_git(["clone", "--progress", *clone_flags(clone_options), repo_url, str(dest)],
+                  on_progress, timeout)
+
+
+async def run_git_fetch(
+    git_dir: Path,
+    fetch_args: List[str],
+    on_progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None,
+) -> None:
+    """Run `git fetch` in a (bare) repository as an asyncio subprocess, like `run_git_clone`."""
+    await run_git(["--git-dir", str(git_dir), "fetch", "--progress", *fetch_args],
+                  on_progress, timeout)
+
+
+async def run_git(
+    git_args: List[str],
+    on_progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None,
+) -> None:
+    """
+    Run a git command as an asyncio subprocess, parsing the progress it prints on stderr.
+
+    The git process is killed if the command times out (TimeoutError) or the
+    calling task is cancelled; a failing command raises GitCommandError.
+    """
+    args = ["git", *git_args]
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            messages = await _read_progress(process.stderr, on_progress)
+            returncode = await process.wait()
+    except (TimeoutError, asyncio.CancelledError):
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    if returncode != 0:
+        raise GitCommandError(args, returncode, "\n".join(messages))
+
+
+async def _read_progress(stream: asyncio.StreamReader,
+                         on_progress: Optional[ProgressCallback]) -> List[str]:
+    """Parse git's carriage-return separated progress output; return the other messages."""
+    messages: List[str] = []
+    buffer = ""
+    while chunk := await stream.read(4096):
+        buffer += chunk.decode("utf-8", errors="replace")
+        *lines, buffer = re.split(r"[\r\n]", buffer)
+        for line in filter(None, (line.strip() for line in lines)):
+            match = GIT_PROGRESS_REGEX.match(line)
+            if match is None:
+                messages.append(line)
+            elif on_progress is not None:
+                on_progress({
+                    "phase": match.group("phase").strip(),
+                    "percent": int(match.group("percent")),
+                    "done": int(match.group("done")),
+                    "total": int(match.group("total")),
+                })
+    if buffer.strip():
+        messages.append(buffer.strip())
+    return messages
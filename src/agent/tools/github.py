@@ -1,214 +1,375 @@
 """
-This file defines tools to clone GitHub repositories and extract repository details.
+This file defines tools to clone GitHub repositories and check out their branches.
+
+The tools extracting repository details are in `extraction_tools`.
 """
 import os
 import shutil
-import json
 import asyncio
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from git import Repo, GitCommandError
 from git.exc import NoSuchPathError, InvalidGitRepositoryError
 from langchain.tools import tool
-from gitingest.config import MAX_FILE_SIZE
+from langgraph.config import get_stream_writer
 
 from src.agent.tools.navigation import resolve_repository_path
-from .config import GITINGEST_DEFAULT_OUTPUT_LOCATION
-from .gitingest_helpers import ingest_local_non_blocking, normalize_path
+from .config import DEFAULT_CLONE_TIMEOUT
+from .git_helpers import (
+    WORKTREE_STORE_DIR,
+    ProgressCallback,
+    run_git_clone,
+    run_git_fetch,
+    configure_worktree_store,
+    update_mirror,
+    update_mirror_async,
+    seed_mirror,
+    ensure_worktree_store,
+    open_worktree_store,
+    add_worktree,
+    list_worktrees,
+    worktree_fetch_args,
+)
+
 
 @tool("git_clone")
-def git_clone_tool(
+def git_clone_tool(  # pylint: disable=too-many-arguments,too-many-positional-arguments
     repo_url: str,
     dest: str,
     branch: Optional[str] = None,
     overwrite: bool = False,
+    depth: Optional[int] = None,
+    clone_filter: Optional[str] = None,
+    sparse_paths: Optional[List[str]] = None,
+    use_mirror: bool = True,
 ) -> Dict[str, Any]:
     """
     Clone a Git repository into ./repositories/{dest}.
 
     Args:
-        repo_url: HTTPS or SSH URL of the repository.
+        repo_url: HTTPS or SSH URL of the repository (local paths and file:// URLs also work).
         dest: Name of the destination folder for the clone inside ./repositories/.
-        branch: Optional branch to check out.
+        branch: Optional branch to check out. Branches are checked out as git worktrees
+            in ./repositories/{dest}/{branch} that share one object store, so several
+            branches of the same repository can be cloned side by side cheaply.
         overwrite: If True, overwrite existing destination folder.
+        depth: Optional history depth for a shallow clone (e.g. 1 for the latest commit only).
+        clone_filter: Optional partial clone filter, e.g. "blob:none" to fetch file
+            contents only when they are checked out.
+        sparse_paths: Optional list of directories to check out (sparse checkout);
+            everything else stays out of the working tree.
+        use_mirror: If True, borrow objects from the local mirror of the repository
+            (kept in temp/repositories) so repeated clones only fetch what changed.
     Returns:
         A dict with success (bool), dest (str), and error/stdout messages.
     """
 
     try:
-        # Ensure repositories/ root exists
-        repo_dir = resolve_repository_path("")  # Use navigation module to get path
-
-        # Full destination path inside repositories/
-        repo_root = Path(repo_dir)
-        full_dest = repo_root / dest
-
-        # Handle overwrite
-        if full_dest.exists():
-            if overwrite:
-                # Remove directory or file
-                if full_dest.is_dir():
-                    shutil.rmtree(full_dest)
-                else:
-                    full_dest.unlink()
-            else:
-                return {"success": False, "error": f"Destination {full_dest} already exists."}
+        full_dest, error = _prepare_destination(dest, branch, overwrite)
+        if error is not None:
+            return error
+
+        # Clone options (partial clones exist to avoid downloading objects: no mirror)
+        mirror = update_mirror(repo_url) if use_mirror and not clone_filter else None
+        kwargs = _clone_options(depth, clone_filter, sparse_paths, mirror)
 
-        # Clone options
-        kwargs = {}
         if branch:
-            kwargs["branch"] = branch
-            full_dest = f"{full_dest}/{branch}"
-
-        os.makedirs(full_dest, exist_ok=True)
-        repo = Repo.clone_from(repo_url, full_dest, **kwargs)
-
-        return {
-            "success": True,
-            "dest": str(full_dest),
-            "branch": repo.active_branch.name if not repo.head.is_detached else "detached",
-            "error": None,
-        }
+            result = _checkout_branch_worktree(
+                _clone_url(repo_url, kwargs), full_dest, branch, overwrite, kwargs, sparse_paths
+            )
+        else:
+            result = _clone_working_copy(_clone_url(repo_url, kwargs), full_dest, kwargs,
+                                         sparse_paths)
+
+        if result["success"] and _should_seed_mirror(use_mirror, mirror, depth, clone_filter):
+            seed_mirror(repo_url, full_dest / WORKTREE_STORE_DIR if branch else full_dest)
+        return result
     except (GitCommandError, NoSuchPathError, InvalidGitRepositoryError) as e:
         return {"success": False, "dest": dest, "error": str(e)}
 
-@tool("extract_git_repository_details_to_file")
-async def extract_repository_details(
-    local_repository_path: Optional[str],
-    output_path: Optional[str] = GITINGEST_DEFAULT_OUTPUT_LOCATION,
+
+@tool("git_clone_async")
+async def git_clone_async_tool(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    repo_url: str,
+    dest: str,
+    branch: Optional[str] = None,
+    overwrite: bool = False,
+    depth: Optional[int] = None,
+    clone_filter: Optional[str] = None,
+    sparse_paths: Optional[List[str]] = None,
+    use_mirror: bool = True,
+    timeout: Optional[float] = DEFAULT_CLONE_TIMEOUT,
 ) -> Dict[str, Any]:
     """
-    Extract and ingest a Git repository (local or remote) into a readable LLM format.
+    Clone a Git repository into ./repositories/{dest} without blocking other work.
+
+    Takes the same options as `git_clone`. git runs as a background process whose
+    progress is streamed as custom events while the clone runs.
 
     Args:
-        local_repository_path: Path to a local repository directory.
-        github_url: HTTPS URL of a remote GitHub repository.
-        output_path: Output path for the extraction
-            (default: "extract_repository_details.json" (GITINGEST_DEFAULT_OUTPUT_LOCATION),
-            use "-" or "stdout" for stdout).
+        repo_url: HTTPS or SSH URL of the repository (local paths and file:// URLs also work).
+        dest: Name of the destination folder for the clone inside ./repositories/.
+        branch: Optional branch to check out (as a worktree, see `git_clone`).
+        overwrite: If True, overwrite existing destination folder.
+        depth: Optional history depth for a shallow clone.
+        clone_filter: Optional partial clone filter, e.g. "blob:none".
+        sparse_paths: Optional list of directories to check out (sparse checkout).
+        use_mirror: If True, borrow objects from the local mirror of the repository.
+        timeout: Seconds after which the clone, or a fetch of the mirror or of the
+            shared branch store, is aborted (default: 30 minutes).
     Returns:
-        path to a JSON dict with summary (str), tree (str), and content (str) of the repository.
+        A dict with success (bool), dest (str), and error/stdout messages.
     """
-
     try:
-        exclude_patterns = {
-            "*.pyc",
-            "__pycache__",
-            ".git",
-            ".venv",
-            "venv",
-            "env",
-            "node_modules",
-            ".DS_Store",
-            "*.log",
-            ".pytest_cache",
-            "*.egg-info",
-            "dist",
-            "build",
-            "*.lock",
-            ".pylintrc"
-        }
-        # Get current working directory in a non-blocking way
-        cwd = await asyncio.to_thread(os.getcwd)
-        if local_repository_path is not None:
-            path = normalize_path(local_repository_path, cwd)
+        full_dest, error = await asyncio.to_thread(_prepare_destination, dest, branch, overwrite)
+        if error is not None:
+            return error
+        mirror = (await update_mirror_async(repo_url, timeout=timeout)
+                  if use_mirror and not clone_filter else None)
+        kwargs = _clone_options(depth, clone_filter, sparse_paths, mirror)
+        clone_url = _clone_url(repo_url, kwargs)
+        target = full_dest / WORKTREE_STORE_DIR if branch else full_dest
+
+        if not target.exists():
+            timed_out = await _run_clone_or_clean_up(
+                clone_url, target, kwargs, bare=bool(branch),
+                on_progress=progress_writer("git_clone_progress", dest=dest),
+                timeout=timeout,
+            )
+            if timed_out:
+                return {"success": False, "dest": dest,
+                        "error": f"Clone timed out after {timeout} seconds"}
+
+        if branch:
+            try:
+                await run_git_fetch(target, worktree_fetch_args(kwargs),
+                                    progress_writer("git_clone_progress", dest=dest), timeout)
+            except TimeoutError:
+                return {"success": False, "dest": dest,
+                        "error": f"Fetch timed out after {timeout} seconds"}
+            result = await asyncio.to_thread(
+                _checkout_branch_worktree, clone_url, full_dest, branch, overwrite, kwargs,
+                sparse_paths, fetch=False
+            )
         else:
-            return {
-                "success": False,
-                "error": "local_repository_path must be provided"
-            }
-
-        # Use non-blocking ingest for local repositories
-        summary, tree, content = await ingest_local_non_blocking(
-            path,
-            max_file_size=MAX_FILE_SIZE,
-            exclude_patterns=exclude_patterns,
-            include_gitignored=False
-        )
-
-        extraction = {"summary": summary, "tree": tree, "content": content}
-
-        if output_path in ["-", "stdout"]:
-            print(json.dumps(extraction, ensure_ascii=False, indent=2))
-            return {"success": True, "data": extraction}
-
-        if output_path is not None:
-            # Save the output file in the repository folder
-            output_file_path = os.path.join(path, output_path)
-            await asyncio.to_thread(
-                _write_json_file,
-                output_file_path,
-                extraction
+            result = await asyncio.to_thread(
+                lambda: _finish_working_copy(Repo(full_dest), full_dest, sparse_paths)
             )
-            return {"success": True, "path": output_file_path}
 
-        return {"success": True, "data": extraction}
+        if result["success"] and _should_seed_mirror(use_mirror, mirror, depth, clone_filter):
+            await asyncio.to_thread(seed_mirror, repo_url, target)
+        return result
+    except (GitCommandError, NoSuchPathError, InvalidGitRepositoryError) as e:
+        return {"success": False, "dest": dest, "error": str(e)}
+
+
+async def _run_clone_or_clean_up(  # pylint: disable=too-many-arguments
+    clone_url: str,
+    target: Path,
+    clone_options: Dict[str, Any],
+    *,
+    bare: bool,
+    on_progress: Optional[ProgressCallback],
+    timeout: Optional[float],
+) -> bool:
+    """
+    Clone into `target` asynchronously, removing the partial clone if it does not finish.
+
+    Returns:
+        True if the clone timed out. Cancellation is re-raised after cleaning up.
+    """
+    if bare:
+        # A bare store for branch worktrees: sparse paths apply to the worktrees instead
+        clone_options = {key: value for key, value in clone_options.items() if key != "sparse"}
+        clone_options["bare"] = True
+    try:
+        await run_git_clone(clone_url, target, clone_options, on_progress, timeout)
+    except (TimeoutError, asyncio.CancelledError) as e:
+        if target.exists():
+            await asyncio.to_thread(shutil.rmtree, target, True)
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return True
+    if bare:
+        await asyncio.to_thread(lambda: configure_worktree_store(Repo(target)))
+    return False
+
+
+def _prepare_destination(
+    dest: str,
+    branch: Optional[str],
+    overwrite: bool,
+) -> Tuple[Path, Optional[Dict[str, Any]]]:
+    """
+    Resolve the destination inside repositories/ and handle an existing folder.
+
+    Returns:
+        The destination path and, if the clone cannot proceed, the error result.
+    """
+    # Full destination path inside repositories/ (resolved by the navigation module)
+    full_dest = Path(resolve_repository_path("")) / dest
+
+    # Handle overwrite (branch checkouts reuse the shared store of other branches)
+    if full_dest.exists() and not (branch and (full_dest / WORKTREE_STORE_DIR).is_dir()):
+        if overwrite:
+            # Remove directory or file
+            if full_dest.is_dir():
+                shutil.rmtree(full_dest)
+            else:
+                full_dest.unlink()
+        else:
+            return full_dest, {"success": False,
+                               "error": f"Destination {full_dest} already exists."}
+    return full_dest, None
+
+
+def _should_seed_mirror(use_mirror: bool, mirror: Optional[Path], depth: Optional[int],
+                        clone_filter: Optional[str]) -> bool:
+    """Only complete clones of repositories without a mirror seed a new one."""
+    return use_mirror and mirror is None and not depth and not clone_filter
+
+
+def progress_writer(event: str, **context: Any) -> Optional[ProgressCallback]:
+    """Return a callback streaming progress as a custom LangGraph event, if streaming."""
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        # Not running inside a graph (e.g. the tool is invoked directly)
+        return None
+    return lambda progress: writer({event: {**context, **progress}})
 
-    except PermissionError as e:
-        return {"success": False, "error": f"Permission denied: {e}"}
-    # pylint: disable=broad-exception-caught
-    except Exception as e:
-        return {"success": False, "error": str(e)}
 
-def _write_json_file(file_path: str, data: Dict[str, Any]) -> None:
-    """Helper function to write JSON data to a file."""
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def _clone_working_copy(
+    repo_url: str,
+    full_dest: Path,
+    clone_options: Dict[str, Any],
+    sparse_paths: Optional[List[str]],
+) -> Dict[str, Any]:
+    """Clone the default branch of a repository into its own working copy."""
+    os.makedirs(full_dest, exist_ok=True)
+    repo = Repo.clone_from(repo_url, full_dest, **clone_options)
+    return _finish_working_copy(repo, full_dest, sparse_paths)
+
 
+def _finish_working_copy(repo: Repo, full_dest: Path,
+                         sparse_paths: Optional[List[str]]) -> Dict[str, Any]:
+    """Apply sparse paths to a fresh clone and describe the checked out branch."""
+    if sparse_paths:
+        repo.git.sparse_checkout("set", *sparse_paths)
+    return {
+        "success": True,
+        "dest": str(full_dest),
+        "branch": repo.active_branch.name if not repo.head.is_detached else "detached",
+        "error": None,
+    }
 
-@tool("load_extracted_repository_from_file")
-def load_extracted_repository(
-    path: str = GITINGEST_DEFAULT_OUTPUT_LOCATION,
-    include_summary: bool = True,
-    include_tree: bool = True,
-    include_content: bool = True
+
+def _checkout_branch_worktree(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    repo_url: str,
+    container: Path,
+    branch: str,
+    overwrite: bool,
+    clone_options: Dict[str, Any],
+    sparse_paths: Optional[List[str]],
+    fetch: bool = True,
 ) -> Dict[str, Any]:
+    """Check out a branch as a worktree of the repository's shared bare store."""
+    store = ensure_worktree_store(repo_url, container, clone_options, fetch)
+    worktree_path = container / branch
+
+    if worktree_path.exists():
+        if not overwrite:
+            return {"success": False, "error": f"Destination {worktree_path} already exists."}
+        registered = {Path(w["path"]) for w in list_worktrees(store)}
+        if worktree_path.resolve() in registered:
+            store.git.worktree("remove", "--force", str(worktree_path))
+        else:
+            shutil.rmtree(worktree_path)
+    store.git.worktree("prune")
+
+    add_worktree(store, worktree_path, branch, sparse_paths)
+    return {
+        "success": True,
+        "dest": str(worktree_path),
+        "branch": branch,
+        "store": str(container / WORKTREE_STORE_DIR),
+        "error": None,
+    }
+
+
+@tool("list_branch_worktrees")
+def list_branch_worktrees(dest: str) -> Dict[str, Any]:
     """
-    Load the extracted repository details from a file.
-    This file is expected to be generated by the `extract_repository_details` tool.
+    List the branch checkouts (git worktrees) of a repository cloned with `git_clone`.
 
     Args:
-        path: Path to the JSON file containing the extracted repository details.
-              Defaults to 'extract_repository_details.json'.
-              If a directory is provided, will look for the JSON file in that directory.
-        include_summary: If True, include the summary in the response.
-        include_tree: If True, include the tree structure in the response.
-        include_content: If True, include the file contents in the response.
-
+        dest: Name of the repository folder inside ./repositories/.
     Returns:
-        A dict with the loaded repository details containing the requested parts:
-        - summary (str): Overview of the repository (if include_summary=True)
-        - tree (str): Directory structure (if include_tree=True)
-        - content (str): File contents (if include_content=True)
-    """
-    # If path is a directory, look for the default JSON file in that directory
-    if os.path.isdir(path):
-        path = os.path.join(path, GITINGEST_DEFAULT_OUTPUT_LOCATION)
-    if not os.path.exists(path):
-        return {"success": False, "error": f"File not found: {path}"}
-    if not os.path.isfile(path):
-        return {"success": False, "error": f"Path is not a file: {path}"}
-
+        A dict with success (bool) and worktrees (list of path, branch, head, prunable).
+    """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        store = open_worktree_store(resolve_repository_path(dest) / WORKTREE_STORE_DIR)
+        return {"success": True, "worktrees": list_worktrees(store)}
+    except (GitCommandError, NoSuchPathError, InvalidGitRepositoryError) as e:
+        return {"success": False, "error": f"No branch worktrees for {dest}: {e}"}
 
-        result = {"success": True}
 
-        if include_summary and "summary" in data:
-            result["summary"] = data["summary"]
+@tool("prune_branch_worktrees")
+def prune_branch_worktrees(dest: str, branches: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Remove branch checkouts of a repository and forget worktrees whose folders are gone.
 
-        if include_tree and "tree" in data:
-            result["tree"] = data["tree"]
+    Args:
+        dest: Name of the repository folder inside ./repositories/.
+        branches: Optional branches whose worktrees should be removed.
+            If omitted, only stale worktree entries are pruned.
+    Returns:
+        A dict with success (bool), removed (list of paths) and the remaining worktrees.
+    """
+    try:
+        store = open_worktree_store(resolve_repository_path(dest) / WORKTREE_STORE_DIR)
+        removed = []
+        for worktree in list_worktrees(store):
+            if branches and worktree["branch"] in branches:
+                store.git.worktree("remove", "--force", worktree["path"])
+                removed.append(worktree["path"])
+        store.git.worktree("prune")
+        return {"success": True, "removed": removed, "worktrees": list_worktrees(store)}
+    except (GitCommandError, NoSuchPathError, InvalidGitRepositoryError) as e:
+        return {"success": False, "error": str(e)}
 
-        if include_content and "content" in data:
-            result["content"] = data["content"]
 
-        return result
+def _clone_options(
+    depth: Optional[int],
+    clone_filter: Optional[str],
+    sparse_paths: Optional[List[str]],
+    mirror: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Translate shallow, partial and sparse clone settings into `git clone` options,
+    referencing the (already updated) local mirror if there is one.
+    """
+    kwargs: Dict[str, Any] = {}
+    if mirror is not None:
+        kwargs["reference"] = str(mirror)
+    if depth:
+        kwargs["depth"] = depth
+    if clone_filter:
+        kwargs["filter"] = clone_filter
+    if sparse_paths:
+        # Only top-level files are checked out until the sparse paths are set
+        kwargs["sparse"] = True
+    return kwargs
 
-    except json.JSONDecodeError:
-        return {"success": False, "error": "Invalid JSON format in file"}
-    # pylint: disable=broad-exception-caught
-    except Exception as e:
-        return {"success": False, "error": f"Error loading file: {str(e)}"}
+
+def _clone_url(repo_url: str, clone_options: Dict[str, Any]) -> str:
+    """
+    Return the URL to clone from.
+
+    git ignores --depth and --filter for plain local paths, so local sources
+    are turned into file:// URLs when a shallow or partial clone is requested.
+    """
+    if ("depth" in clone_options or "filter" in clone_options) and os.path.isdir(repo_url):
+        return Path(repo_url).resolve().as_uri()
+    return repo_url
@@ -2,15 +2,31 @@
 Helper functions for gitingest operations to avoid blocking async event loops.
 """
 import asyncio
+import functools
+import multiprocessing
 import os
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 
 from gitingest.ingestion import ingest_query
 from gitingest.query_parser import parse_local_dir_path
-from gitingest.utils.ignore_patterns import load_ignore_patterns
+from gitingest.schemas import IngestionQuery
 from gitingest.utils.pattern_utils import process_patterns
 from gitingest.config import MAX_FILE_SIZE
 
+from src.agent.tools.config import EXTRACTION_DEFAULT_OUTPUT_LOCATION
+from src.agent.tools.extraction.artifact import write_artifact
+from src.agent.tools.extraction.cache import ExtractionCache
+from src.agent.tools.extraction.config import DEFAULT_BATCH_WORKERS, DEFAULT_EXCLUDE_PATTERNS
+from src.agent.tools.extraction.digest import artifact_fan_in
+from src.agent.tools.extraction.filesystem import build_file_tree, iter_file_nodes
+from src.agent.tools.extraction.git_objects import iter_revision_extraction
+from src.agent.tools.extraction.pipeline import iter_extraction, collect_extraction
+from src.agent.tools.extraction.secrets import SecretRedactor
+from src.agent.tools.navigation.ignore import ignore_rules_for
+from src.agent.tools.navigation.prefetch import PrefetchBudget
+
 
 async def ingest_local_non_blocking(
     source: str,
@@ -36,8 +52,357 @@ async def ingest_local_non_blocking(
     Returns:
         Tuple of (summary, tree, content) strings.
     """
-    # Parse the local directory path in a thread to avoid blocking
-    query = await asyncio.to_thread(parse_local_dir_path, source)
+    query = await _build_query(
+        source,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+    )
+
+    # ingest_query is CPU-bound but doesn't do blocking I/O
+    summary, tree, content = await asyncio.to_thread(ingest_query, query)
+
+    return summary, tree, content
+
+
+async def ingest_local_incremental(  # pylint: disable=too-many-arguments
+    source: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    include_gitignored: bool = False,
+    workers: int = 1,
+    use_cache: bool = True,
+    prune: bool = False,
+) -> tuple[str, str, str]:
+    """
+    Incremental variant of `ingest_local_non_blocking` backed by an `ExtractionCache`.
+
+    Produces the same (summary, tree, content) as gitingest, but only files whose
+    blob SHA changed since the previous extraction of `source` are read and rendered.
+    With `workers` > 1, large directories are rendered by a pool of processes.
+    With `prune`, vendored, generated and duplicate files are pruned from the content.
+    Secrets are redacted from the content. Single files are delegated to
+    `ingest_local_non_blocking`.
+    """
+    if not await asyncio.to_thread(os.path.isdir, source):
+        summary, tree, content = await ingest_local_non_blocking(
+            source,
+            max_file_size=max_file_size,
+            exclude_patterns=exclude_patterns,
+            include_patterns=include_patterns,
+            include_gitignored=include_gitignored,
+        )
+        return summary, tree, SecretRedactor().redact_text(content)[0]
+
+    query = await _build_query(
+        source,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+    )
+    return await asyncio.to_thread(
+        lambda: collect_extraction(iter_extraction(query, use_cache=use_cache,
+                                                   workers=workers, prune=prune))
+    )
+
+
+async def extract_local_to_artifact(  # pylint: disable=too-many-arguments
+    source: str,
+    output_file: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    include_gitignored: bool = False,
+    use_cache: bool = True,
+    workers: int = 1,
+    prune: bool = False,
+) -> dict:
+    """
+    Ingest a local directory straight into a streaming extraction artifact.
+
+    Each file record is appended to `output_file` as soon as it is rendered, so
+    memory use does not grow with the size of the repository.
+    If `use_cache` is True, unchanged files are served from the extraction cache.
+    With `workers` > 1, file contents of large directories are rendered by a
+    pool of processes; the artifact is identical to a serial extraction.
+    With `prune`, vendored, generated and duplicate files are pruned from the content.
+
+    Returns:
+        The artifact index (see `write_artifact`).
+    """
+    return await asyncio.to_thread(
+        extract_to_artifact,
+        source,
+        output_file,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+        use_cache=use_cache,
+        workers=workers,
+        prune=prune,
+    )
+
+
+async def extract_many_to_artifacts(  # pylint: disable=too-many-arguments,too-many-locals
+    jobs: Dict[str, Tuple[str, str]],
+    *,
+    max_workers: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    job_exclude_patterns: Optional[Dict[str, set[str]]] = None,
+    use_cache: bool = True,
+    prune: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Ingest several local directories into artifacts at the same time.
+
+    Every directory is extracted by `extract_to_artifact` in its own worker of a
+    bounded process pool, so the wall-clock time scales with the number of cores
+    rather than the number of directories.
+
+    Args:
+        jobs: Mapping of a name to the (source directory, output artifact) to extract.
+        max_workers: Size of the process pool (default: one worker per core).
+        on_progress: Called with {"repository", "status", "completed", "total", ...}
+            each time a directory finished or failed.
+        max_file_size: Maximum file size to process.
+        exclude_patterns: Set of patterns to exclude.
+        job_exclude_patterns: Additional patterns to exclude, by name.
+        use_cache: If True, unchanged files are served from the extraction cache.
+        prune: If True, vendored, generated and duplicate files are pruned from the content.
+
+    Returns:
+        Mapping of every name to {"success": True, "path", "files"} or
+        {"success": False, "error"}.
+    """
+    if not jobs:
+        return {}
+    workers = min(len(jobs), max_workers or DEFAULT_BATCH_WORKERS)
+    loop = asyncio.get_running_loop()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    # spawn, because forking a process running an event loop and threads is unsafe
+    pool = ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+    pending: set = set()
+    try:
+        futures = {
+            loop.run_in_executor(pool, functools.partial(
+                extract_to_artifact,
+                source,
+                output_file,
+                max_file_size=max_file_size,
+                exclude_patterns={*(exclude_patterns or ()),
+                                  *(job_exclude_patterns or {}).get(name, ())},
+                use_cache=use_cache,
+                prune=prune,
+            )): (name, output_file)
+            for name, (source, output_file) in jobs.items()
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                name, output_file = futures[future]
+                results[name] = _batch_result(future, output_file)
+                if on_progress is not None:
+                    on_progress({
+                        "repository": name,
+                        "status": "done" if results[name]["success"] else "failed",
+                        "completed": len(results),
+                        "total": len(jobs),
+                        **results[name],
+                    })
+    finally:
+        if pending:
+            # Cancelled: stop the extractions still running instead of orphaning them
+            _terminate_workers(pool)
+        # Wait for the workers off the event loop; they are finished or terminated by now
+        await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+    return results
+
+
+def _terminate_workers(pool: ProcessPoolExecutor) -> None:
+    """Terminate the worker processes of a pool, including those busy with a task."""
+    terminate_workers = getattr(pool, "terminate_workers", None)
+    if terminate_workers is not None:  # Python 3.14+
+        terminate_workers()
+        return
+    # pylint: disable=protected-access
+    for process in list((pool._processes or {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+
+def _batch_result(future: asyncio.Future, output_file: str) -> Dict[str, Any]:
+    """Describe the outcome of one extraction of `extract_many_to_artifacts`."""
+    if future.exception() is not None:
+        return {"success": False, "error": str(future.exception())}
+    return {"success": True, "path": output_file, "files": len(future.result()["files"])}
+
+
+def extract_to_artifact(  # pylint: disable=too-many-arguments
+    source: str,
+    output_file: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    include_gitignored: bool = False,
+    use_cache: bool = True,
+    workers: int = 1,
+    prune: bool = False,
+) -> dict:
+    """
+    Blocking counterpart of `extract_local_to_artifact`.
+
+    Module level so it can run in worker processes of `extract_many_to_artifacts`.
+    """
+    return write_artifact(output_file, extraction_records(
+        source,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+        use_cache=use_cache,
+        workers=workers,
+        prune=prune,
+    ))
+
+
+def extraction_records(  # pylint: disable=too-many-arguments
+    source: str,
+    *,
+    revision: Optional[str] = None,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    include_gitignored: bool = False,
+    use_cache: bool = True,
+    workers: int = 1,
+    prune: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Return the extraction records of a local directory, or of one of its git revisions.
+
+    Blocking; the walk starts when the records are first iterated.
+    """
+    if revision is not None:
+        return _revision_records(source, revision, max_file_size,
+                                 exclude_patterns, include_patterns, prune)
+    query = build_query(
+        source,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+    )
+    return iter_extraction(query, use_cache=use_cache, workers=workers, prune=prune)
+
+
+async def ingest_revision(  # pylint: disable=too-many-arguments
+    source: str,
+    revision: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    prune: bool = False,
+) -> tuple[str, str, str]:
+    """
+    Ingest a git revision of a local repository without checking it out.
+
+    Trees and blobs are read from the object database (see `iter_revision_extraction`),
+    so `revision` can be any commit, tag or branch known to the repository.
+
+    Returns:
+        Tuple of (summary, tree, content) strings.
+    """
+    records = _revision_records(source, revision, max_file_size,
+                                exclude_patterns, include_patterns, prune)
+    return await asyncio.to_thread(lambda: collect_extraction(records))
+
+
+async def extract_revision_to_artifact(  # pylint: disable=too-many-arguments
+    source: str,
+    revision: str,
+    output_file: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    prune: bool = False,
+) -> dict:
+    """
+    Stream a git revision of a local repository into an extraction artifact.
+
+    Returns:
+        The artifact index (see `write_artifact`).
+    """
+    records = _revision_records(source, revision, max_file_size,
+                                exclude_patterns, include_patterns, prune)
+    return await asyncio.to_thread(write_artifact, output_file, records)
+
+
+def _revision_records(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    source: str,
+    revision: str,
+    max_file_size: int,
+    exclude_patterns: Optional[set[str]],
+    include_patterns: Optional[set[str]],
+    prune: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Apply the same pattern processing as `_build_query` to a revision extraction."""
+    ignore_patterns, include_patterns = process_patterns(
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+    )
+    return iter_revision_extraction(
+        source,
+        revision,
+        ignore_patterns=ignore_patterns,
+        include_patterns=include_patterns,
+        max_file_size=max_file_size,
+        prune=prune,
+    )
+
+
+async def _build_query(
+    source: str,
+    *,
+    max_file_size: int,
+    exclude_patterns: Optional[set[str]],
+    include_patterns: Optional[set[str]],
+    include_gitignored: bool,
+) -> IngestionQuery:
+    """Non-blocking wrapper around `build_query` (path resolution and gitignore reads)."""
+    return await asyncio.to_thread(
+        build_query,
+        source,
+        max_file_size=max_file_size,
+        exclude_patterns=exclude_patterns,
+        include_patterns=include_patterns,
+        include_gitignored=include_gitignored,
+    )
+
+
+def build_query(
+    source: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    exclude_patterns: Optional[set[str]] = None,
+    include_patterns: Optional[set[str]] = None,
+    include_gitignored: bool = False,
+) -> IngestionQuery:
+    """Parse a local path into an ingestion query with patterns and gitignore rules applied."""
+    query = parse_local_dir_path(source)
 
     query.max_file_size = max_file_size
     query.ignore_patterns, query.include_patterns = process_patterns(
@@ -46,19 +411,42 @@ async def ingest_local_non_blocking(
     )
 
     if not include_gitignored:
-        # Load gitignore patterns (also needs to run in thread as it does file I/O)
-        for fname in (".gitignore", ".gitingestignore"):
-            ignore_pats = await asyncio.to_thread(
-                load_ignore_patterns,
-                query.local_path,
-                filename=fname
-            )
-            query.ignore_patterns.update(ignore_pats)
+        # Cached per repository; ignored directories are not searched for ignore files
+        rules = ignore_rules_for(query.local_path, query.ignore_patterns)
+        query.ignore_patterns.update(rules.patterns())
 
-    # ingest_query is CPU-bound but doesn't do blocking I/O
-    summary, tree, content = await asyncio.to_thread(ingest_query, query)
+    return query
+
+def warm_extraction_cache(path: Path, budget: PrefetchBudget) -> None:
+    """
+    Prefetch warmer: render a repository through its `ExtractionCache`.
+
+    Uses the same patterns as `extract_git_repository_details_to_file` and renders
+    the files it would prune too, so its next extraction only reads the files
+    changed in between, with or without `prune_content`.
+    """
+    query = build_query(str(path), exclude_patterns=DEFAULT_EXCLUDE_PATTERNS)
+    cache = ExtractionCache(str(query.local_path))
+    if not cache.start_run(wait=False):
+        # An extraction of the repository is running and fills the cache itself
+        return
+    try:
+        for node in iter_file_nodes(build_file_tree(query)):
+            budget.check()
+            cache.render(node)
+        # Only after a full pass: saving drops the cached objects missing from the manifest
+        cache.save()
+    finally:
+        cache.finish_run()
+
+
+def warm_dependency_graph(path: Path, budget: PrefetchBudget) -> None:
+    """Prefetch warmer: compute the import fan-in of an existing artifact for its digest."""
+    artifact = path / EXTRACTION_DEFAULT_OUTPUT_LOCATION
+    if artifact.is_file():
+        budget.check()
+        artifact_fan_in(str(artifact))
 
-    return summary, tree, content
 
 def normalize_path(local_repository_path: str, cwd: str) -> str:
     r"""
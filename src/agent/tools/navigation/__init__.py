@@ -8,6 +8,7 @@ from . import config # Import config first to initialize constants
 from .navigation import (
     list_files_in_directory,
     find_files,
+    search_code,
     get_current_directory,
     change_directory,
     navigate_to_repository,
@@ -30,6 +31,7 @@ def get_navigation_tools() -> List[BaseTool]:
     return [
         list_files_in_directory,
         find_files,
+        search_code,
         get_current_directory,
         change_directory,
         navigate_to_repository,
@@ -54,6 +56,7 @@ __all__ = [
     "get_file_management_tools",
     "list_files_in_directory",
     "find_files",
+    "search_code",
     "get_current_directory",
     "change_directory",
     "navigate_to_repository",
@@ -0,0 +1,482 @@
+"""
+Per-repository trigram index of file contents, behind `search_code`.
+
+Every file is indexed by the set of its lowercased byte trigrams. A query is
+turned into trigrams its matches must contain (see `required_literals`).
+Intersecting their posting lists leaves a few candidate files, and only those
+are read and searched.
+
+The index is a list of segments saved under CODE_INDEX_ROOT. A segment holds
+the sorted trigrams of its files and, for each trigram, the ids of the files
+containing it: three flat arrays, loaded without a Python object per trigram.
+The first build indexes the repository in segments of up to
+CODE_INDEX_SEGMENT_FILES files, on worker processes. Afterwards, changed files
+are marked deleted in their segment and indexed again into a new one, and the
+smallest segments are merged once there are more than CODE_INDEX_MAX_SEGMENTS.
+
+Which files exist comes from the repository's `FileIndex`; a refresh stats
+them to find changed ones, at most every CODE_INDEX_RECHECK_SECONDS. Searches
+only wait for segments being swapped in, not for a refresh; a refresh for a
+search takes over from a (throttled) prefetch refresh still running.
+"""
+import bisect
+import json
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.agent.tools.navigation.config import (
+    BINARY_SNIFF_BYTES,
+    CACHE_MAX_AGE_SECONDS,
+    CACHE_MAX_ENTRIES,
+    CODE_INDEX_MAX_FILE_SIZE,
+    CODE_INDEX_MAX_SEGMENTS,
+    CODE_INDEX_PARALLEL_MIN_FILES,
+    CODE_INDEX_RECHECK_SECONDS,
+    CODE_INDEX_ROOT,
+    CODE_INDEX_SEGMENT_FILES,
+    CODE_INDEX_VERSION,
+    CODE_INDEX_WORKERS,
+)
+from src.agent.tools.navigation.file_index import FileIndex, PathMatcher, index_name
+from src.agent.tools.navigation.util import evict_cache_entries
+
+MANIFEST_NAME = "manifest.json"
+
+# Quantifiers (group 1: the minimum of a {m,n} one) and escape sequences of a regex
+_QUANTIFIER = re.compile(r"[*+?]|\{(\d*),?\d*\}")
+_ESCAPE = re.compile(r"\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}"
+                     r"|[0-7]{1,3}|\d+|.)?", re.DOTALL)
+
+
+class _Segment:  # pylint: disable=too-many-instance-attributes
+    """Postings of a set of files: sorted trigrams, their offsets into the file ids, file ids."""
+
+    def __init__(self, entry: Dict[str, Any], postings: Tuple[array, array, array]):
+        """
+        Args:
+            entry: Manifest entry of the segment (see `build_segment`).
+            postings: The keys, offsets and ids arrays.
+        """
+        self.file = entry["file"]
+        self.paths: List[str] = entry["paths"]
+        self.stamps: List[Tuple[int, int]] = [tuple(stamp) for stamp in entry["stamps"]]
+        self.skipped: Set[int] = set(entry["skipped"])
+        self.dead: Set[int] = set(entry.get("dead", ()))
+        self.keys, self.offsets, self.ids = postings
+
+    @classmethod
+    def load(cls, directory: Path, entry: Dict[str, Any]) -> "_Segment":
+        """Read a segment of an index directory."""
+        keys, offsets, ids = array("I"), array("Q"), array("I")
+        with open(directory / entry["file"], "rb") as f:
+            keys.fromfile(f, entry["keys"])
+            offsets.fromfile(f, entry["keys"] + 1)
+            ids.fromfile(f, entry["ids"])
+        return cls(entry, (keys, offsets, ids))
+
+    def entry(self) -> Dict[str, Any]:
+        """Return the manifest entry of the segment."""
+        return {"file": self.file, "paths": self.paths, "stamps": self.stamps,
+                "skipped": sorted(self.skipped), "dead": sorted(self.dead),
+                "keys": len(self.keys), "ids": len(self.ids)}
+
+    def live(self) -> List[int]:
+        """Ids of the files that were not deleted or indexed again since."""
+        return [file_id for file_id in range(len(self.paths)) if file_id not in self.dead]
+
+    def candidates(self, required: Iterable[int]) -> List[int]:
+        """Ids of the live, indexed files containing every required trigram, in order."""
+        spans = []
+        for trigram in required:
+            position = bisect.bisect_left(self.keys, trigram)
+            if position == len(self.keys) or self.keys[position] != trigram:
+                return []
+            spans.append((self.offsets[position], self.offsets[position + 1]))
+        if not spans:
+            return [file_id for file_id in self.live() if file_id not in self.skipped]
+
+        # Rarest trigram first; the others are looked up in their (sorted) posting lists
+        spans.sort(key=lambda span: span[1] - span[0])
+        first, last = spans[0]
+        found = [file_id for file_id in self.ids[first:last] if file_id not in self.dead]
+        for first, last in spans[1:]:
+            found = [file_id for file_id in found if _contains(self.ids, file_id, first, last)]
+            if not found:
+                break
+        return found
+
+
+class _TakenOver(Exception):
+    """Raised inside a background refresh to let a waiting foreground refresh go first."""
+
+
+class CodeIndex:  # pylint: disable=too-many-instance-attributes
+    """Trigram index of the contents of the files of one `FileIndex`."""
+
+    def __init__(self, files: FileIndex, directory: Path):
+        """
+        Args:
+            files: File index of the repository; its files are the ones indexed.
+            directory: Directory holding the manifest and segment files.
+        """
+        self.files = files
+        self.root = files.root
+        self.directory = directory
+        # Guards the segment list; refreshes run one at a time under the refresh lock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        # Files of the segments dropped since the last save (only used by refreshes)
+        self._replaced: Set[str] = set()
+        # Segment and id of every live file, by path (only used by refreshes)
+        self._live: Dict[str, Tuple[_Segment, int]] = {}
+        for segment in self._load():
+            self._add(segment)
+        self._checked = -math.inf
+        # Foreground refreshes waiting for the refresh lock
+        self._waiting = 0
+
+    def refresh(self, check: Optional[Callable[[], None]] = None,
+                workers: int = CODE_INDEX_WORKERS, force: bool = False) -> int:
+        """
+        Index the files added or changed since the last refresh.
+
+        Args:
+            check: Called before each segment is built (e.g. `PrefetchBudget.check`);
+                segments built so far are kept when it raises. A refresh with a
+                check runs in the background: it stops at its next check when a
+                refresh without one (a search) is waiting, which then finishes it.
+            workers: Number of processes building segments (1: build in this thread).
+            force: If True, check the files even within CODE_INDEX_RECHECK_SECONDS
+                of the last check.
+
+        Returns:
+            The number of files indexed.
+        """
+        if check is not None:
+            with self._refresh_lock:
+                try:
+                    return self._refresh(self._yielding(check), workers, force)
+                except _TakenOver:
+                    return 0
+        with self._lock:
+            self._waiting += 1
+        try:
+            self._refresh_lock.acquire()  # pylint: disable=consider-using-with
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        try:
+            return self._refresh(None, workers, force)
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self, check: Optional[Callable[[], None]], workers: int, force: bool) -> int:
+        """Refresh with the refresh lock held; see `refresh`."""
+        if not force and time.monotonic() - self._checked < CODE_INDEX_RECHECK_SECONDS:
+            return 0
+        started = time.monotonic()
+        if check is None:
+            self.files.refresh()
+        else:
+            self.files.refresh(check=check, workers=1)
+        live = len(self._live)
+        changed = self._mark_changed(self.files.find("", PathMatcher()) or [])
+        if live == len(self._live) and not changed:
+            self._checked = started
+            return 0
+        try:
+            for entry in self._build(_chunks(changed, workers), check, workers):
+                segment = _Segment.load(self.directory, entry)
+                with self._lock:
+                    self._add(segment)
+            self._compact()
+            # Only a complete refresh counts: files not indexed yet are not live,
+            # so the next refresh picks them up
+            self._checked = started
+        finally:
+            self._save()
+        return len(changed)
+
+    def _yielding(self, check: Callable[[], None]) -> Callable[[], None]:
+        """Wrap the check of a background refresh to stop it for a waiting foreground one."""
+        def yielding_check() -> None:
+            if self._waiting:
+                raise _TakenOver()
+            check()
+        return yielding_check
+
+    def candidates(self, required: Set[int]) -> List[str]:
+        """Return the paths (relative to the root) of the files that may contain the trigrams."""
+        with self._lock:
+            segments = list(self._segments)
+        return sorted(segment.paths[file_id] for segment in segments
+                      for file_id in segment.candidates(required))
+
+    def _mark_changed(self, paths: List[str]) -> List[str]:
+        """Mark the deleted and changed files dead; return the files to index."""
+        changed, root = [], os.path.join(self.root, "")
+        dead: Dict[_Segment, Set[int]] = {}
+        for rel_path in paths:
+            segment, file_id = self._live.get(rel_path, (None, 0))
+            try:
+                info = os.stat(root + rel_path)
+            except OSError:
+                info = None
+            if segment is not None and info is not None and (
+                    segment.stamps[file_id] == (info.st_size, info.st_mtime_ns)):
+                continue
+            if segment is not None:
+                dead.setdefault(segment, set()).add(file_id)
+                del self._live[rel_path]
+            if info is not None:
+                changed.append(rel_path)
+        for rel_path in self._live.keys() - set(paths):
+            segment, file_id = self._live.pop(rel_path)
+            dead.setdefault(segment, set()).add(file_id)
+        with self._lock:
+            # New sets, as searches read the segments without the lock
+            for segment, file_ids in dead.items():
+                segment.dead = segment.dead | file_ids
+        return changed
+
+    def _add(self, segment: _Segment) -> None:
+        self._segments.append(segment)
+        for file_id in segment.live():
+            self._live[segment.paths[file_id]] = (segment, file_id)
+
+    def _build(self, chunks: List[List[str]], check: Optional[Callable[[], None]],
+               workers: int) -> Iterable[Dict[str, Any]]:
+        """Build a segment per chunk of files, in worker processes if there are enough."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        jobs = [(str(self.root), chunk, str(self.directory / f"{uuid.uuid4().hex}.bin"))
+                for chunk in chunks]
+        files = sum(map(len, chunks))
+        if check is not None or workers <= 1 or files < CODE_INDEX_PARALLEL_MIN_FILES:
+            for job in jobs:
+                if check is not None:
+                    check()
+                yield build_segment(*job)
+            return
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            yield from pool.map(build_segment, *zip(*jobs))
+
+    def _compact(self) -> None:
+        """Drop the segments without live files and merge the smallest ones if there are many."""
+        segments = [segment for segment in self._segments if segment.live()]
+        merged_segment = None
+        if len(segments) > CODE_INDEX_MAX_SEGMENTS:
+            segments.sort(key=lambda segment: len(segment.live()))
+            merged = segments[:len(segments) - CODE_INDEX_MAX_SEGMENTS // 2 + 1]
+            paths = sorted(segment.paths[file_id] for segment in merged
+                           for file_id in segment.live())
+            job = (str(self.root), paths, str(self.directory / f"{uuid.uuid4().hex}.bin"))
+            merged_segment = _Segment.load(self.directory, build_segment(*job))
+            segments = segments[len(merged):]
+        self._replaced.update({segment.file for segment in self._segments}
+                              - {segment.file for segment in segments})
+        with self._lock:
+            self._segments = segments
+            if merged_segment is not None:
+                self._add(merged_segment)
+
+    def _load(self) -> List[_Segment]:
+        try:
+            with open(self.directory / MANIFEST_NAME, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (manifest.get("version") != CODE_INDEX_VERSION
+                    or manifest.get("root") != str(self.root)):
+                return []
+            return [_Segment.load(self.directory, entry) for entry in manifest["segments"]]
+        except (OSError, ValueError, KeyError, EOFError):
+            return []
+
+    def _save(self) -> None:
+        """
+        Write the manifest and delete the files of the segments this index dropped.
+
+        Other segment files are left alone: another process (or index of the same
+        root) may have just written them.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"version": CODE_INDEX_VERSION, "root": str(self.root),
+                    "segments": [segment.entry() for segment in self._segments]}
+        tmp_path = self.directory / f"{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # json.dump would stream the (large) manifest through the pure Python encoder
+            f.write(json.dumps(manifest))
+        os.replace(tmp_path, self.directory / MANIFEST_NAME)
+        for segment_file in self._replaced:
+            (self.directory / segment_file).unlink(missing_ok=True)
+        self._replaced.clear()
+
+
+def build_segment(root: str, rel_paths: List[str], segment_file: str) -> Dict[str, Any]:
+    """
+    Index files into a segment file and return its manifest entry.
+
+    Module level so it can run in worker processes. Files that are binary or
+    larger than CODE_INDEX_MAX_FILE_SIZE are listed as skipped, so they are not
+    read again until they change.
+    """
+    postings: Dict[int, List[int]] = {}
+    paths, stamps, skipped = [], [], []
+    for rel_path in rel_paths:
+        path = os.path.join(root, rel_path)
+        try:
+            # Taken before reading, so a change during the read shows next time
+            info = os.stat(path)
+            data = b""
+            if info.st_size <= CODE_INDEX_MAX_FILE_SIZE:
+                with open(path, "rb") as f:
+                    data = f.read(CODE_INDEX_MAX_FILE_SIZE + 1)
+        except OSError:
+            continue
+        file_id = len(paths)
+        paths.append(rel_path)
+        stamps.append((info.st_size, info.st_mtime_ns))
+        if info.st_size > CODE_INDEX_MAX_FILE_SIZE or is_binary(data):
+            skipped.append(file_id)
+            continue
+        for trigram in trigrams(data):
+            postings.setdefault(trigram, []).append(file_id)
+    return {"file": os.path.basename(segment_file), "paths": paths, "stamps": stamps,
+            "skipped": skipped, "dead": [], **_write_postings(postings, segment_file)}
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Return the lowercased byte trigrams of some content, as 24-bit integers."""
+    data = data.lower()
+    return {(a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])}
+
+
+def is_binary(data: bytes) -> bool:
+    """Whether content looks binary: a NUL byte in its first BINARY_SNIFF_BYTES."""
+    return b"\0" in data[:BINARY_SNIFF_BYTES]
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Return strings that every match of a regex contains (possibly none).
+
+    The regex is read conservatively: runs of plain characters outside groups
+    and classes are kept, a `*`, `?` or `{0,...}` drops the character it applies
+    to, anything else ends a run, and an alternation outside groups gives up.
+    """
+    if re.compile(pattern).flags & re.VERBOSE:
+        return []
+    literals: List[str] = []
+    run: List[str] = []
+    depth, position, previous_literal = 0, 0, False
+    while position < len(pattern):
+        char, literal = pattern[position], None
+        quantifier = _QUANTIFIER.match(pattern, position)
+        if char == "\\":
+            escape = _ESCAPE.match(pattern, position).group()
+            literal = escape[1] if len(escape) == 2 and not escape[1].isalnum() else None
+            position += len(escape) - 1
+        elif char == "[":
+            position = _class_end(pattern, position)
+        elif quantifier:
+            minimum = quantifier.group(1)
+            if previous_literal and (char in "*?" or minimum is not None and not int(minimum or 0)):
+                run.pop()
+            position = quantifier.end() - 1
+        elif char == "|" and depth == 0:
+            return []
+        elif char not in "()|.^$":
+            literal = char
+        depth += (char == "(") - (char == ")")
+
+        previous_literal = literal is not None and depth == 0
+        if previous_literal:
+            run.append(literal)
+        elif run:
+            literals.append("".join(run))
+            run = []
+        position += 1
+    if run:
+        literals.append("".join(run))
+    return [literal for literal in literals if literal]
+
+
+def query_trigrams(literals: Iterable[str], case_sensitive: bool = True) -> Set[int]:
+    """
+    Return the trigrams (as indexed) of the strings a match must contain.
+
+    Without case sensitivity, only the ASCII parts of the strings are used: the
+    index lowercases ASCII letters only.
+    """
+    found: Set[int] = set()
+    for literal in literals:
+        parts = [literal] if case_sensitive else re.split(r"[^\x00-\x7f]+", literal)
+        for part in parts:
+            found |= trigrams(part.encode("utf-8"))
+    return found
+
+
+def _write_postings(postings: Dict[int, List[int]], segment_file: str) -> Dict[str, int]:
+    """Write postings as the arrays of a segment; return the length of its keys and ids."""
+    keys, offsets, ids = array("I", sorted(postings)), array("Q", [0]), array("I")
+    for key in keys:
+        ids.extend(postings[key])
+        offsets.append(len(ids))
+    with open(segment_file, "wb") as f:
+        keys.tofile(f)
+        offsets.tofile(f)
+        ids.tofile(f)
+    return {"keys": len(keys), "ids": len(ids)}
+
+
+def _contains(ids: array, file_id: int, first: int, last: int) -> bool:
+    position = bisect.bisect_left(ids, file_id, first, last)
+    return position < last and ids[position] == file_id
+
+
+def _chunks(paths: List[str], workers: int) -> List[List[str]]:
+    """Split files into segments: at least one per worker, of at most CODE_INDEX_SEGMENT_FILES."""
+    if not paths:
+        return []
+    count = max(min(workers, math.ceil(len(paths) / 100)),
+                math.ceil(len(paths) / CODE_INDEX_SEGMENT_FILES), 1)
+    size = math.ceil(len(paths) / count)
+    return [paths[start:start + size] for start in range(0, len(paths), size)]
+
+
+def _class_end(pattern: str, position: int) -> int:
+    """Return the position of the `]` closing the character class opened at `position`."""
+    end = position + 1
+    if pattern[end:end + 1] == "^":
+        end += 1
+    if pattern[end:end + 1] == "]":
+        end += 1
+    while end < len(pattern) and pattern[end] != "]":
+        end += 2 if pattern[end] == "\\" else 1
+    return end
+
+
+_INDEXES: Dict[Tuple[Path, Tuple[str, ...], Tuple[str, ...]], CodeIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def code_index_for(files: FileIndex) -> CodeIndex:
+    """Return the shared, persistent `CodeIndex` of a file index."""
+    key = (files.root, files.rules.base_rules.patterns, tuple(files.rules.ignore_files))
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            directory = CODE_INDEX_ROOT / index_name(*key).removesuffix(".json")
+            evict_cache_entries(CODE_INDEX_ROOT, directory, CACHE_MAX_ENTRIES,
+                                CACHE_MAX_AGE_SECONDS)
+            index = _INDEXES[key] = CodeIndex(files, directory)
+        return index
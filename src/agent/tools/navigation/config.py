@@ -1,4 +1,6 @@
 """Constants and configurations for the agent tools."""
+import os
+
 from .util import get_workspace_root
 
 REPOSITORIES_DIR = "repositories"
@@ -13,3 +15,72 @@ REQUIRED_DIRS = [
 ]
 
 AGENT_WORKSPACE_BASE_PATH = get_workspace_root()
+
+# Ignore files read at every directory level (see ignore.py)
+IGNORE_FILENAMES = (".gitignore", ".gitingestignore")
+# Never walked by the navigation tools, whatever the ignore files say
+NAVIGATION_IGNORE_PATTERNS = (
+    ".git",
+    ".bare",
+    ".langgraph_api",
+    "node_modules",
+    ".venv",
+    "venv",
+    "__pycache__",
+    ".pytest_cache",
+    ".mypy_cache",
+)
+
+# Background prefetch of a repository the agent enters (see prefetch.py): CPU seconds
+# one prefetch may use, share of one core it may keep busy and nice value of its thread
+PREFETCH_CPU_SECONDS = 60.0
+PREFETCH_CPU_SHARE = 0.5
+PREFETCH_NICENESS = 10
+# A repository whose prefetch completed (or used up its budget) this recently is not
+# prefetched again, e.g. when the agent changes into one of its subdirectories
+PREFETCH_FRESH_SECONDS = 300.0
+
+# Persistent caches under temp/ (extraction caches, file and code indexes): entries
+# kept per cache, and seconds after which an unused entry is deleted
+CACHE_MAX_ENTRIES = 64
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Files per page of find_files results
+FIND_FILES_PAGE_SIZE = 200
+
+# Persistent path index behind find_files (see file_index.py), one file per indexed root
+FILE_INDEX_DIR = "temp/file_index"
+FILE_INDEX_ROOT = AGENT_WORKSPACE_BASE_PATH / FILE_INDEX_DIR
+FILE_INDEX_VERSION = 1
+# Threads listing the changed directories of a refresh, and the number of changed
+# directories on one level of the tree before they are listed in parallel
+FILE_INDEX_WORKERS = min(8, os.cpu_count() or 1)
+FILE_INDEX_PARALLEL_MIN_DIRS = 16
+
+# Leading bytes of a file searched for a NUL byte to tell binary files apart
+BINARY_SNIFF_BYTES = 8192
+
+# Matching lines per page of search_code results, and characters kept of each line
+SEARCH_CODE_MAX_RESULTS = 100
+SEARCH_CODE_MAX_LINE_LENGTH = 300
+
+# Persistent trigram index behind search_code (see code_index.py), one directory per
+# indexed root; larger files are not indexed, so they are not searched either
+CODE_INDEX_DIR = "temp/code_index"
+CODE_INDEX_ROOT = AGENT_WORKSPACE_BASE_PATH / CODE_INDEX_DIR
+CODE_INDEX_VERSION = 1
+CODE_INDEX_MAX_FILE_SIZE = 1024 * 1024
+# Processes building the first index, files to index before they are used, and
+# largest number of files per segment
+CODE_INDEX_WORKERS = min(8, os.cpu_count() or 1)
+CODE_INDEX_PARALLEL_MIN_FILES = 2000
+CODE_INDEX_SEGMENT_FILES = 5000
+# Segments kept before the smallest ones are merged, and seconds a search trusts
+# the index without checking the files for changes
+CODE_INDEX_MAX_SEGMENTS = 32
+CODE_INDEX_RECHECK_SECONDS = 2.0
+
+# Bytes returned by one read_file call (the rest is read with its cursor), and size
+# from which files are memory-mapped instead of read whole
+READ_FILE_MAX_BYTES = 64 * 1024
+READ_FILE_MMAP_MIN_BYTES = 1024 * 1024
@@ -0,0 +1,387 @@
+"""
+Persistent index of the file paths below a root directory, behind `find_files`.
+
+The index keeps the listing of every directory that is not ignored, with the
+directory's mtime and the ignore rules it was filtered with. A refresh only
+stats the directories (and their ignore files); it lists again the ones whose
+mtime or rules changed. Indexes are saved under FILE_INDEX_ROOT, so a new
+session starts from the listings of the previous one.
+
+For lookups, the paths are laid out depth-first in one newline-separated
+string, so the files below a directory are one slice of it. Substring, glob
+and regex lookups search that slice with `str.find` and `re` instead of
+testing each path in Python, which makes them cost time proportional to the
+matches rather than to the size of the tree.
+"""
+import hashlib
+import itertools
+import json
+import os
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.agent.tools.navigation.config import (
+    FILE_INDEX_PARALLEL_MIN_DIRS,
+    CACHE_MAX_AGE_SECONDS,
+    CACHE_MAX_ENTRIES,
+    FILE_INDEX_ROOT,
+    FILE_INDEX_VERSION,
+    FILE_INDEX_WORKERS,
+)
+from src.agent.tools.navigation.ignore import IgnoreRules
+from src.agent.tools.navigation.util import evict_cache_entries
+
+
+class _Directory(NamedTuple):
+    """Listing of one directory, valid while its mtime and ignore rules are unchanged."""
+    mtime_ns: int
+    patterns: Tuple[str, ...]
+    dirs: Tuple[str, ...]
+    files: Tuple[str, ...]
+
+
+class PathMatcher:
+    """Filters of a file lookup: a name substring, a glob and a regex (all optional)."""
+
+    def __init__(self, keyword: str = "", glob: str = "", regex: str = ""):
+        """
+        Args:
+            keyword: Substring of the file name.
+            glob: Glob of the relative path (`**` spans directories); one without
+                "/" applies to the file name.
+            regex: Regex searched in the relative path.
+
+        Raises:
+            re.error: If the regex is invalid.
+        """
+        self.keyword = keyword.strip()
+        self.glob = re.compile(glob_to_regex(glob), re.MULTILINE) if glob.strip() else None
+        self.regex = re.compile(regex, re.MULTILINE) if regex else None
+
+    def search(self, text: str, limit: Optional[int] = None, offset: int = 0) -> List[str]:
+        """
+        Return the paths of a newline-terminated listing that match, in order.
+
+        The search starts at a line offset and stops at `limit` paths.
+        """
+        if not (self.keyword or self.glob or self.regex):
+            paths = text[offset:].split("\n", limit or -1)
+            return paths[:min(limit, len(paths) - 1)] if limit else paths[:-1]
+        # The most selective filter finds the candidates, `matches` checks them
+        pattern = self.regex or self.glob
+        found = []
+        while True:
+            if pattern is not None:
+                match = pattern.search(text, offset)
+                hit = match.start() if match else -1
+            else:
+                hit = text.find(self.keyword, offset)
+            if not 0 <= hit < len(text):
+                return found
+            end = text.find("\n", hit)
+            path = text[text.rfind("\n", 0, hit) + 1:end]
+            if self.matches(path):
+                found.append(path)
+                if limit and len(found) >= limit:
+                    return found
+            offset = end + 1
+
+    def matches(self, path: str) -> bool:
+        """Whether a relative path passes every filter."""
+        if self.keyword and self.keyword not in posixpath.basename(path):
+            return False
+        if self.glob is not None and not self.glob.fullmatch(path):
+            return False
+        return self.regex is None or self.regex.search(path) is not None
+
+
+class FileIndex:  # pylint: disable=too-many-instance-attributes
+    """Incrementally refreshed index of the files below one root directory."""
+
+    def __init__(self, rules: IgnoreRules, index_file: Optional[Path] = None):
+        """
+        Args:
+            rules: Ignore rules of the root; ignored entries are not indexed.
+            index_file: File the index is saved to and loaded from (none: in memory only).
+        """
+        self.rules = rules
+        self.root = rules.root
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._directories: Dict[str, _Directory] = self._load()
+        self._dirty = True
+        self._changed = False
+        self._starts: List[int] = [0]
+        self._text = ""
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+
+    def refresh(self, check: Optional[Callable[[], None]] = None,
+                workers: int = FILE_INDEX_WORKERS) -> int:
+        """
+        Bring the index up to date with the file system and save it if it changed.
+
+        Directories are visited level by level: the unchanged ones are only
+        stat'ed, and the changed ones of a level are listed on a thread pool
+        when there are at least FILE_INDEX_PARALLEL_MIN_DIRS of them.
+
+        Args:
+            check: Called before each directory; may raise to interrupt the refresh,
+                which leaves the index valid (e.g. `PrefetchBudget.check`).
+            workers: Number of threads listing directories (1: list in this thread).
+
+        Returns:
+            The number of directories listed again.
+        """
+        listed = 0
+        pool: Optional[ThreadPoolExecutor] = None
+        level = [("", self.rules.base_rules)]
+        try:
+            while level:
+                known, changed = self._check(level, check)
+                if workers > 1 and len(changed) >= FILE_INDEX_PARALLEL_MIN_DIRS:
+                    pool = pool or ThreadPoolExecutor(max_workers=workers,
+                                                      thread_name_prefix="file-index")
+                    listings = pool.map(self._list, changed)
+                else:
+                    listings = map(self._list, changed)
+                for (rel_dir, rules, _), directory in zip(changed, listings):
+                    if directory is not None:
+                        # Lookups and a refresh on another thread share the listings
+                        with self._lock:
+                            self._directories[rel_dir] = directory
+                            self._dirty = self._changed = True
+                        listed += 1
+                        known.append((rel_dir, rules, directory))
+
+                level = [(posixpath.join(rel_dir, name), rules)
+                         for rel_dir, rules, directory in known for name in directory.dirs]
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if self._changed:
+            self.save()
+        return listed
+
+    def find(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        rel_dir: str,
+        matcher: PathMatcher,
+        recursive: bool = True,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Optional[List[str]]:
+        """
+        Return the files below a directory whose path relative to it matches.
+
+        Args:
+            rel_dir: Directory relative to the root ("" for the root).
+            matcher: Filters of the lookup.
+            recursive: If False, only the files directly in the directory are searched.
+            limit: Maximum number of paths returned; the search stops once it has them.
+            after: Path (relative to the directory) returned last by a previous lookup;
+                the lookup resumes after it.
+
+        Returns:
+            Paths relative to the directory, directories first-to-last and files by
+            name, or None if the directory is not indexed (it is ignored, or was not
+            there at the last refresh).
+
+        Raises:
+            LookupError: If `after` is no longer in the directory.
+        """
+        with self._lock:
+            self._rebuild()
+            span = self._ranges.get(rel_dir)
+            if span is None:
+                return None
+            first, last = span
+            if not recursive:
+                last = first + len(self._directories[rel_dir].files)
+            text = self._slice(first, last, f"{rel_dir}/" if rel_dir else "")
+        offset = 0
+        if after is not None and text.startswith(f"{after}\n"):
+            offset = len(after) + 1
+        elif after is not None:
+            position = text.find(f"\n{after}\n")
+            if position < 0:
+                raise LookupError(f"'{after}' is no longer listed")
+            offset = position + len(after) + 2
+        return matcher.search(text, limit, offset)
+
+    def _check(self, level: List[Tuple[str, Any]], check: Optional[Callable[[], None]],
+               ) -> Tuple[List[Tuple[str, Any, _Directory]], List[Tuple[str, Any, int]]]:
+        """
+        Split the directories of a level, given with the rules of their parent.
+
+        Returns:
+            The unchanged directories, with their rules and listing, and the changed
+            ones, with their rules and mtime.
+        """
+        known, changed = [], []
+        for rel_dir, parent in level:
+            if check is not None:
+                check()
+            rules = self.rules.child_rules(parent, rel_dir)
+            with self._lock:
+                directory = self._directories.get(rel_dir)
+            try:
+                # Taken before listing, so a change during the listing shows next time
+                mtime_ns = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+            except OSError:
+                continue
+            if (directory is None or directory.mtime_ns != mtime_ns
+                    or directory.patterns != rules.patterns):
+                changed.append((rel_dir, rules, mtime_ns))
+            else:
+                known.append((rel_dir, rules, directory))
+        return known, changed
+
+    def _list(self, change: Tuple[str, Any, int]) -> Optional[_Directory]:
+        """List a changed directory (None if it is gone); runs on the refresh's threads."""
+        rel_dir, rules, mtime_ns = change
+        try:
+            dirs, files = self.rules.scan(os.path.join(self.root, rel_dir), rel_dir, rules)
+        except OSError:
+            return None
+        return _Directory(mtime_ns, rules.patterns, tuple(entry.name for entry in dirs),
+                          tuple(entry.name for entry in files if entry.is_file()))
+
+    def save(self) -> None:
+        """Write the index to its file."""
+        if self.index_file is None:
+            return
+        with self._lock:
+            directories = dict(self._directories)
+            self._changed = False
+        rule_sets: Dict[Tuple[str, ...], int] = {}
+        data = {
+            "version": FILE_INDEX_VERSION,
+            "root": str(self.root),
+            "directories": {
+                rel_dir: [directory.mtime_ns,
+                          rule_sets.setdefault(directory.patterns, len(rule_sets)),
+                          directory.dirs, directory.files]
+                for rel_dir, directory in directories.items()
+            },
+        }
+        data["rule_sets"] = list(rule_sets)
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_name(f"{self.index_file.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_file)
+
+    def _load(self) -> Dict[str, _Directory]:
+        if self.index_file is None:
+            return {}
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if data.get("version") != FILE_INDEX_VERSION or data.get("root") != str(self.root):
+            return {}
+        rule_sets = [tuple(patterns) for patterns in data["rule_sets"]]
+        return {
+            rel_dir: _Directory(mtime_ns, rule_sets[rules], tuple(dirs), tuple(files))
+            for rel_dir, (mtime_ns, rules, dirs, files) in data["directories"].items()
+        }
+
+    def _rebuild(self) -> None:
+        """Lay out the paths depth-first, dropping the directories no longer reachable."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        paths: List[str] = []
+        ranges: Dict[str, Tuple[int, int]] = {}
+        first: Dict[str, int] = {}
+        stack: List[Tuple[str, bool]] = [("", False)]
+        while stack:
+            rel_dir, done = stack.pop()
+            if done:
+                ranges[rel_dir] = (first.pop(rel_dir), len(paths))
+                continue
+            directory = self._directories.get(rel_dir)
+            if directory is None:
+                continue
+            first[rel_dir] = len(paths)
+            paths.extend(posixpath.join(rel_dir, name) for name in directory.files)
+            stack.append((rel_dir, True))
+            stack.extend((posixpath.join(rel_dir, name), False)
+                         for name in reversed(directory.dirs))
+
+        for rel_dir in self._directories.keys() - ranges.keys():
+            del self._directories[rel_dir]
+        self._text = "".join(f"{path}\n" for path in paths)
+        self._starts = list(itertools.accumulate((len(path) + 1 for path in paths), initial=0))
+        self._ranges = ranges
+
+    def _slice(self, first: int, last: int, prefix: str) -> str:
+        """The listing of paths [first, last), all starting with `prefix`, without it."""
+        text = self._text[self._starts[first]:self._starts[last]]
+        if prefix:
+            text = ("\n" + text).replace("\n" + prefix, "\n")[1:]
+        return text
+
+
+def glob_to_regex(glob: str) -> str:
+    """
+    Translate a glob into a regex matching whole lines of relative paths.
+
+    `*` and `?` stay within a path component, `**` spans components and `[...]`
+    is a character class (`[!...]` negated); a glob without "/" matches the file name.
+    """
+    glob = glob.strip().lstrip("/")
+    parts, position = [], 0
+    while position < len(glob):
+        char = glob[position]
+        if glob.startswith("**/", position):
+            parts.append(r"(?:[^\n]*/)?")
+            position += 3
+            continue
+        if glob.startswith("**", position):
+            parts.append(r"[^\n]*")
+            position += 2
+            continue
+        end = glob.find("]", position + 2) if char == "[" else -1
+        if char == "*":
+            parts.append(r"[^/\n]*")
+        elif char == "?":
+            parts.append(r"[^/\n]")
+        elif end > 0:
+            body = glob[position + 1:end].replace("\\", "\\\\")
+            parts.append(rf"[^/\n{body[1:]}]" if body.startswith("!") else f"[{body}]")
+            position = end
+        else:
+            parts.append(re.escape(char))
+        position += 1
+    return ("^" if "/" in glob else r"^(?:[^\n]*/)?") + "".join(parts) + "$"
+
+
+_INDEXES: Dict[Tuple[Path, Tuple[str, ...], Tuple[str, ...]], FileIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def file_index_for(rules: IgnoreRules) -> FileIndex:
+    """Return the shared, persistent `FileIndex` of some ignore rules (see `ignore_rules_for`)."""
+    key = (rules.root, rules.base_rules.patterns, tuple(rules.ignore_files))
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index_file = FILE_INDEX_ROOT / index_name(*key)
+            evict_cache_entries(FILE_INDEX_ROOT, index_file, CACHE_MAX_ENTRIES,
+                                CACHE_MAX_AGE_SECONDS)
+            index = _INDEXES[key] = FileIndex(rules, index_file)
+        return index
+
+
+def index_name(root: Path, base_patterns: Tuple[str, ...], ignore_files: Tuple[str, ...]) -> str:
+    """Return a stable, readable file name for the index of a root and its rules."""
+    key = "\n".join([str(root.resolve()), *base_patterns, "", *ignore_files])
+    digest = hashlib.sha1(key.encode("utf-8"), usedforsecurity=False).hexdigest()[:12]
+    return f"{root.name or 'root'}-{digest}.json"
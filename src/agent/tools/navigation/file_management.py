@@ -1,8 +1,36 @@
 """File management tools for the agent."""
+import mmap
+import os
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
 from langchain.tools import tool
-from src.agent.tools.navigation.config import AGENT_WORKSPACE_BASE_PATH
+from src.agent.tools.navigation.config import (
+    AGENT_WORKSPACE_BASE_PATH,
+    BINARY_SNIFF_BYTES,
+    READ_FILE_MAX_BYTES,
+    READ_FILE_MMAP_MIN_BYTES,
+)
+from src.agent.tools.navigation.code_index import is_binary
 from src.agent.tools.navigation.guardrails import enforce_workspace_boundary
+from src.agent.tools.navigation.pagination import decode_cursor, encode_cursor
+from src.agent.tools.navigation.util import normalize_path
+
+# Content of a file: read whole, or memory-mapped if large
+_Data = Union[bytes, mmap.mmap]
+# Bytes scanned at once when counting lines
+_SCAN_BYTES = 1024 * 1024
+
+
+class _ReadRange(NamedTuple):
+    """Bytes of a file left to read; the state of `read_file` cursors."""
+    path: str
+    start: int
+    end: int
+    # Number of the line `start` is on (0 if unknown, after a byte offset)
+    line: int
+    size: int
+    mtime_ns: int
 
 
 def make_directory(dirname: str, path: Path = AGENT_WORKSPACE_BASE_PATH) -> dict[str, str]:
@@ -39,11 +67,135 @@ def make_directory(dirname: str, path: Path = AGENT_WORKSPACE_BASE_PATH) -> dict
 
 @tool("read_file")
 @enforce_workspace_boundary
-def read_file(file_path: str) -> str:
-    """Read the contents of a file."""
+def read_file(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    file_path: str = "",
+    start_line: int = 0,
+    end_line: int = 0,
+    byte_offset: int = 0,
+    byte_count: int = 0,
+    max_bytes: int = READ_FILE_MAX_BYTES,
+    cursor: str = "",
+) -> str:
+    """
+    Read the contents of a file, or a range of its lines or bytes.
+
+    At most `max_bytes` are returned at once, cut at the end of a line when possible;
+    the text then ends with a note giving the cursor to pass to read the rest.
+    Binary files are not shown.
+
+    Args:
+        file_path: Path of the file to read
+        start_line: First line to read (1-based; default is the first line)
+        end_line: Last line to read (inclusive; default is the last line)
+        byte_offset: First byte to read, for a byte range instead of a line range
+        byte_count: Number of bytes to read from byte_offset (default is to the end)
+        max_bytes: Maximum number of bytes to return
+        cursor: Cursor of the note ending the previous read; the other arguments
+            but max_bytes are then ignored
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        if cursor:
+            try:
+                request = _ReadRange(**decode_cursor(cursor))
+            except (ValueError, TypeError) as e:
+                return f"Error: Invalid cursor: {e}"
+            file_path = request.path
+
+        with open(file_path, "rb") as file:
+            info = os.fstat(file.fileno())
+            if cursor and (request.size, request.mtime_ns) != (info.st_size, info.st_mtime_ns):
+                return f"Error: {file_path} changed since the cursor; read it again"
+            with _file_data(file, info.st_size) as data:
+                if is_binary(data[:BINARY_SNIFF_BYTES]):
+                    return f"Binary file {file_path} ({info.st_size} bytes), not shown"
+                if not cursor:
+                    start, end, line = _byte_range(data, (start_line, end_line),
+                                                   (byte_offset, byte_count))
+                    request = _ReadRange(str(normalize_path(file_path)), start, end, line,
+                                         info.st_size, info.st_mtime_ns)
+                return _read_page(data, request, max(1, max_bytes))
     # pylint: disable=broad-exception-caught
     except Exception as e:
         return f"Error reading file {file_path}: {e}"
+
+
+@contextmanager
+def _file_data(file, size: int) -> Iterator[_Data]:
+    """Yield the content of an open (binary) file, memory-mapped if it is large."""
+    if size < READ_FILE_MMAP_MIN_BYTES:
+        yield file.read()
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+def _byte_range(data: _Data, lines: Tuple[int, int],
+                byte_range: Tuple[int, int]) -> Tuple[int, int, int]:
+    """
+    Return the bytes [start, end) of a line or byte range, and the line `start` is on.
+
+    Raises:
+        ValueError: If both ranges are given, or the range is invalid.
+    """
+    (start_line, end_line), (byte_offset, byte_count) = lines, byte_range
+    if min(start_line, end_line, byte_offset, byte_count) < 0:
+        raise ValueError("line numbers, byte offsets and counts cannot be negative")
+    if not start_line and not end_line:
+        end = byte_offset + byte_count if byte_count else len(data)
+        return byte_offset, min(end, len(data)), 1 if byte_offset == 0 else 0
+    if byte_offset or byte_count:
+        raise ValueError("pass either a line range or a byte range")
+    if end_line and end_line < start_line:
+        raise ValueError(f"end_line {end_line} is before start_line {start_line}")
+
+    start_line = start_line or 1
+    start = _line_start(data, start_line)
+    if start is None or (start == len(data) and start_line > 1):
+        raise ValueError(f"line {start_line} is past the end of the file")
+    end = _line_start(data, end_line + 1, start, start_line) if end_line else None
+    return start, len(data) if end is None else end, start_line
+
+
+def _line_start(data: _Data, line: int, position: int = 0,
+                position_line: int = 1) -> Optional[int]:
+    """Return the offset of the start of a line (None past the end), scanning from a known one."""
+    while position_line < line:
+        chunk = data[position:position + _SCAN_BYTES]
+        if not chunk:
+            return None
+        newlines = chunk.count(b"\n")
+        if position_line + newlines >= line:
+            for _ in range(line - position_line):
+                position = data.find(b"\n", position) + 1
+            return position
+        position_line += newlines
+        position += len(chunk)
+    return position
+
+
+def _read_page(data: _Data, request: _ReadRange, max_bytes: int) -> str:
+    """Decode up to `max_bytes` of a range, ending with the cursor of the rest if any is left."""
+    start, end = request.start, min(request.end, request.start + max_bytes)
+    if end < request.end:
+        newline = data.rfind(b"\n", start, end)
+        end = newline + 1 if newline >= 0 else _char_boundary(data, start, end)
+    chunk = data[start:end]
+    text = chunk.decode("utf-8", errors="replace")
+    if end == request.end:
+        return text
+
+    line = request.line + chunk.count(b"\n") if request.line else 0
+    shown = f"bytes {start}-{end} of {request.size}"
+    if request.line:
+        shown = f"lines {request.line}-{max(line - 1, request.line)}, {shown}"
+    token = encode_cursor(request._replace(start=end, line=line)._asdict())
+    return (f"{text}\n[Truncated: showed {shown}. "
+            f"Call read_file with cursor=\"{token}\" to continue]")
+
+
+def _char_boundary(data: _Data, start: int, end: int) -> int:
+    """Move a cut back to the start of a UTF-8 character (unless that leaves nothing)."""
+    cut = end
+    while cut > start and cut > end - 4 and data[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return cut if cut > start else end
@@ -0,0 +1,303 @@
+"""
+Ignore rules of a repository, shared by ingestion and the navigation tools.
+
+The `.gitignore` and `.gitingestignore` files of every directory are parsed the
+way gitingest parses them (patterns relative to the repository root) and
+compiled into one matcher per directory: the rules of a directory are the base
+patterns plus the ignore files of every directory above it.
+
+Ignore files are only re-read when their mtime changes, and walks prune ignored
+directories instead of entering them, so the ignore files inside `node_modules`
+or `.git` are never looked at.
+"""
+import os
+import re
+import stat
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pathspec import PathSpec
+
+from src.agent.tools.navigation.config import IGNORE_FILENAMES
+
+# (mtime_ns, size) of an ignore file and the patterns parsed from it
+_IgnoreFile = Tuple[Tuple[int, int], Tuple[str, ...]]
+
+
+class _Rules(NamedTuple):
+    """Compiled rules of one directory: its patterns and those of every parent."""
+    patterns: Tuple[str, ...]
+    spec: PathSpec
+    # Any of the non-negated patterns, in one regex (None if there are none)
+    candidates: Optional[re.Pattern]
+
+    @classmethod
+    def compile(cls, patterns: Tuple[str, ...]) -> "_Rules":
+        """Compile patterns, in order, into one matcher."""
+        spec = PathSpec.from_lines("gitwildmatch", patterns)
+        # Group names must be unique in one regex; the directory marker group is not needed
+        included = [pattern.regex.pattern.replace("(?P<ps_d>", "(?:")
+                    for pattern in spec.patterns if pattern.include and pattern.regex]
+        return cls(patterns, spec, re.compile("|".join(included)) if included else None)
+
+
+class IgnoreRules:
+    """Ignore rules of one repository (or directory tree)."""
+
+    def __init__(self, root: Path, base_patterns: Iterable[str] = (),
+                 ignore_files: Tuple[str, ...] = IGNORE_FILENAMES):
+        """
+        Args:
+            root: Directory the patterns are relative to (usually the repository root).
+            base_patterns: Patterns applied everywhere, before the ignore files.
+            ignore_files: Names of the ignore files read in every directory.
+        """
+        self.root = Path(root)
+        self.ignore_files = ignore_files
+        self._base = _Rules.compile(tuple(sorted(base_patterns)))
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, _IgnoreFile]] = {}
+        self._rules: Dict[Tuple[str, int, Tuple[Tuple[int, int], ...]], _Rules] = {}
+        # Directory mtimes and ignore file patterns of the last full walk
+        self._snapshot: Optional[Tuple[Dict[str, int], frozenset]] = None
+
+    def is_ignored(self, path: Path, is_dir: Optional[bool] = None) -> bool:
+        """Return True if a path below the root is ignored (paths outside it never are)."""
+        try:
+            rel_path = _relative(Path(path), self.root)
+        except ValueError:
+            return False
+        if not rel_path:
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        return self._matches(self.rules_for(rel_path.rpartition("/")[0]), rel_path, is_dir)
+
+    def rules_for(self, directory: str) -> _Rules:
+        """Return the compiled rules that apply to the entries of a directory."""
+        rules = self.child_rules(self._base, "")
+        current = ""
+        for part in (part for part in directory.split("/") if part):
+            current = _join(current, part)
+            rules = self.child_rules(rules, current)
+        return rules
+
+    def walk(self, start: Optional[Path] = None,
+             ) -> Iterator[Tuple[Path, List[os.DirEntry], List[os.DirEntry]]]:
+        """
+        Walk a directory top-down, like `os.walk`, without entering ignored directories.
+
+        Yields:
+            (directory, subdirectory entries, file entries) of every visited
+            directory, with the ignored entries already left out. Removing entries
+            from the subdirectory list prunes the walk further.
+        """
+        start = Path(start) if start is not None else self.root
+        rel_start = _relative(start, self.root)
+        parent = self._base if not rel_start else self.rules_for(rel_start.rpartition("/")[0])
+        stack = [(start, rel_start, parent)]
+        while stack:
+            directory, rel_dir, parent_rules = stack.pop()
+            rules = self.child_rules(parent_rules, rel_dir)
+            try:
+                dirs, files = self.scan(directory, rel_dir, rules)
+            except OSError:
+                continue
+            yield directory, dirs, files
+            stack.extend((Path(entry.path), _join(rel_dir, entry.name), rules)
+                         for entry in reversed(dirs))
+
+    @property
+    def base_rules(self) -> _Rules:
+        """Rules applying above the root: the base patterns alone."""
+        return self._base
+
+    def scan(self, directory: str | Path, rel_dir: str,
+             rules: _Rules) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+        """
+        List one directory, sorted by name, leaving out its ignored entries.
+
+        Args:
+            directory: Directory to list.
+            rel_dir: The directory relative to the root.
+            rules: Rules of the directory (see `child_rules`).
+
+        Returns:
+            The subdirectory and file entries of the directory.
+
+        Raises:
+            OSError: If the directory cannot be listed.
+        """
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        dirs, files = [], []
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if self._matches(rules, _join(rel_dir, entry.name), is_dir):
+                continue
+            (dirs if is_dir else files).append(entry)
+        return dirs, files
+
+    def patterns(self) -> set[str]:
+        """
+        Return the patterns of every ignore file in the repository.
+
+        The same set as gitingest's `load_ignore_patterns` collects, without
+        looking inside ignored directories. The result is cached until a directory
+        or an ignore file changes.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is not None and self._unchanged(snapshot[0]):
+            return set(snapshot[1])
+
+        mtimes: Dict[str, int] = {}
+        patterns: set[str] = set()
+        for directory, _, _ in self.walk():
+            rel_dir = _relative(directory, self.root)
+            try:
+                mtimes[rel_dir] = directory.stat().st_mtime_ns
+            except OSError:
+                continue
+            for _, file_patterns in self._ignore_files(rel_dir).values():
+                patterns.update(file_patterns)
+        with self._lock:
+            self._snapshot = (mtimes, frozenset(patterns))
+        return patterns
+
+    def _unchanged(self, mtimes: Dict[str, int]) -> bool:
+        """Check that no directory and no ignore file changed since a snapshot."""
+        for rel_dir, mtime in mtimes.items():
+            try:
+                if (self.root / rel_dir).stat().st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+            with self._lock:
+                known = dict(self._files.get(rel_dir, {}))
+            if any(self._version(self.root / rel_dir / name) != version
+                   for name, (version, _) in known.items()):
+                return False
+        return True
+
+    def child_rules(self, parent: _Rules, rel_dir: str) -> _Rules:
+        """Return the rules of a directory, given the rules of its parent."""
+        own = self._ignore_files(rel_dir)
+        if not own:
+            return parent
+        key = (rel_dir, id(parent), tuple(version for version, _ in own.values()))
+        with self._lock:
+            rules = self._rules.get(key)
+        if rules is None:
+            patterns = parent.patterns + tuple(
+                pattern for _, file_patterns in own.values() for pattern in file_patterns)
+            rules = _Rules.compile(patterns)
+            with self._lock:
+                self._rules[key] = rules
+        return rules
+
+    def _ignore_files(self, rel_dir: str) -> Dict[str, _IgnoreFile]:
+        """Return the parsed ignore files of a directory, re-reading only changed ones."""
+        with self._lock:
+            cached = self._files.get(rel_dir, {})
+        found: Dict[str, _IgnoreFile] = {}
+        for name in self.ignore_files:
+            # Plain strings: this runs for every directory of every walk
+            path = os.path.join(self.root, rel_dir, name)
+            version = self._version(path)
+            if version is None:
+                continue
+            if name in cached and cached[name][0] == version:
+                found[name] = cached[name]
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    text = file.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            found[name] = (version, parse_ignore_lines(text.splitlines(), rel_dir))
+        with self._lock:
+            self._files[rel_dir] = found
+        return found
+
+    @staticmethod
+    def _version(path: str | Path) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size) if stat.S_ISREG(info.st_mode) else None
+
+    @staticmethod
+    def _matches(rules: _Rules, rel_path: str, is_dir: bool) -> bool:
+        # Directories also match directory-only patterns ("build/")
+        paths = (rel_path, rel_path + "/") if is_dir else (rel_path,)
+        # Most entries match no pattern: one regex search rules them out, while
+        # PathSpec tries the patterns one by one to apply the last match
+        if rules.candidates is None or not any(map(rules.candidates.match, paths)):
+            return False
+        return any(map(rules.spec.match_file, paths))
+
+
+def parse_ignore_lines(lines: Iterable[str], rel_dir: str) -> Tuple[str, ...]:
+    """
+    Turn the lines of an ignore file into root-relative patterns, like gitingest does.
+
+    Args:
+        lines: Lines of the ignore file.
+        rel_dir: Directory of the ignore file relative to the root ("" for the root).
+    """
+    patterns = []
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        # Path joining also drops trailing slashes, as in gitingest
+        pattern = (PurePosixPath(rel_dir) / line.lstrip("/")).as_posix()
+        patterns.append(f"!{pattern}" if negated else pattern)
+    return tuple(patterns)
+
+
+def _relative(path: Path, root: Path) -> str:
+    """Return a path relative to the root with forward slashes ("" for the root itself)."""
+    rel_path = path.relative_to(root).as_posix()
+    return "" if rel_path == "." else rel_path
+
+
+def _join(directory: str, name: str) -> str:
+    return f"{directory}/{name}" if directory else name
+
+
+def find_ignore_root(path: Path, boundary: Optional[Path] = None) -> Path:
+    """
+    Return the repository root of a path: the nearest directory holding `.git`.
+
+    The search stops at `boundary` (e.g. the agent workspace); without a
+    repository, the path itself is the root.
+    """
+    path = Path(path)
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+        if candidate == boundary:
+            break
+    return path
+
+
+_RULES: Dict[Tuple[Path, frozenset, Tuple[str, ...]], IgnoreRules] = {}
+_RULES_LOCK = threading.Lock()
+
+
+def ignore_rules_for(root: Path, base_patterns: Iterable[str] = (),
+                     ignore_files: Tuple[str, ...] = IGNORE_FILENAMES) -> IgnoreRules:
+    """Return the shared `IgnoreRules` of a root directory, compiled once per process."""
+    key = (Path(root), frozenset(base_patterns), tuple(ignore_files))
+    with _RULES_LOCK:
+        rules = _RULES.get(key)
+        if rules is None:
+            rules = _RULES[key] = IgnoreRules(*key)
+        return rules
@@ -1,41 +1,148 @@
 """Navigation tools for the agent to interact with the filesystem."""
 import os
+import re
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from langchain.tools import tool
 from src.agent.tools.navigation.util import normalize_path
-from src.agent.tools.navigation.config import (REPOSITORIES_DIR, AGENT_WORKSPACE_BASE_PATH,)
+from src.agent.tools.navigation.config import (
+    REPOSITORIES_DIR,
+    AGENT_WORKSPACE_BASE_PATH,
+    IGNORE_FILENAMES,
+    NAVIGATION_IGNORE_PATTERNS,
+    FIND_FILES_PAGE_SIZE,
+    SEARCH_CODE_MAX_RESULTS,
+    SEARCH_CODE_MAX_LINE_LENGTH,
+)
 from src.agent.tools.navigation.guardrails import enforce_workspace_boundary, _is_within_workspace
+from src.agent.tools.navigation.file_index import PathMatcher, file_index_for
+from src.agent.tools.navigation.code_index import (
+    code_index_for,
+    query_trigrams,
+    required_literals,
+)
+from src.agent.tools.navigation.pagination import decode_cursor, encode_cursor, group_by_directory
+from src.agent.tools.navigation.ignore import IgnoreRules, find_ignore_root, ignore_rules_for
+from src.agent.tools.navigation.prefetch import (
+    PrefetchBudget,
+    prefetch_repository,
+    register_warmer,
+)
+
+
+class _FileQuery(NamedTuple):
+    """Arguments of a `find_files` lookup; the state of its cursors."""
+    path: str
+    keyword: str = ""
+    recursive: bool = True
+    include_ignored: bool = False
+    glob: str = ""
+    regex: str = ""
+    grouped: bool = True
 
 
 @tool("find_files")
 @enforce_workspace_boundary
-def find_files(path: str = ".", keyword: str = "", recursive: bool = True) -> List[str]:
+def find_files(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    path: str = ".",
+    keyword: str = "",
+    recursive: bool = True,
+    include_ignored: bool = False,
+    glob: str = "",
+    regex: str = "",
+    max_results: int = FIND_FILES_PAGE_SIZE,
+    cursor: str = "",
+    grouped: bool = True,
+) -> Dict[str, Any]:
     """
     Find all files from the given path (default cwd), filtering optionally by keyword.
 
+    Files ignored by the repository's .gitignore/.gitingestignore files are skipped,
+    and .git, node_modules, virtual environments and caches are never searched.
+    Lookups are answered from a workspace file index that is refreshed incrementally.
+    Results come in pages of `max_results` files; pass the returned `next_cursor`
+    as `cursor` to get the next page of the same lookup.
+
     Args:
         path: Starting path for search (default is current directory)
         keyword: Optional keyword to filter filenames
         recursive: If True, search recursively; if False, only search immediate directory
+        include_ignored: If True, also return files ignored by .gitignore/.gitingestignore
+        glob: Optional glob of the path relative to `path` ("**/test_*.py", "src/*/config.*");
+            a glob without "/" applies to the filename ("*.md")
+        regex: Optional regex searched in the path relative to `path`
+        max_results: Maximum number of files per page
+        cursor: `next_cursor` of the previous page; the other filters are then ignored
+        grouped: If True, files are grouped by directory relative to `path`
+            ({"src/app": ["config.py", ...]}); otherwise they are a list of relative paths
+
+    Returns:
+        Dictionary with success, the absolute starting path, its matching files
+        (relative to it), their count and the cursor of the next page (None on the last).
     """
-    return _find_files(path=path, keyword=keyword, recursive=recursive)
+    query, after = _FileQuery(path, keyword, recursive, include_ignored, glob, regex, grouped), None
+    if cursor:
+        try:
+            state = decode_cursor(cursor)
+            after = state.pop("after")
+            query = _FileQuery(**state)
+        except (ValueError, KeyError, TypeError) as e:
+            return {"success": False, "error": f"Invalid cursor: {e}"}
+
+    max_results = max(1, max_results)
+    try:
+        # One more than a page tells whether there is a next one
+        start_path, found = _search_files(query, limit=max_results + 1, after=after)
+    except LookupError as e:
+        return {"success": False, "error": f"The listing changed since the cursor ({e}); "
+                                           "run the lookup again"}
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    except OSError as e:
+        return {"success": False, "error": f"Error finding files: {e}"}
+
+    return _files_page(query._replace(path=str(start_path)), found, max_results)
+
+
+def _files_page(query: _FileQuery, found: List[str], page_size: int) -> Dict[str, Any]:
+    """Build a page of `find_files` from up to one more file than fits in it."""
+    page = found[:page_size]
+    next_cursor = None
+    if len(found) > page_size:
+        next_cursor = encode_cursor({**query._asdict(), "after": page[-1]})
+    return {
+        "success": True,
+        "path": query.path,
+        "files": group_by_directory(page) if query.grouped else page,
+        "count": len(page),
+        "next_cursor": next_cursor,
+    }
 
 
 @tool("list_files_in_directory")
 @enforce_workspace_boundary
-def list_files_in_directory(keyword: str = "") -> List[str]:
+def list_files_in_directory(keyword: str = "", include_ignored: bool = False) -> List[str]:
     """
     List all files in the current working directory, filtering optionally by keyword.
 
-    This is a convenience wrapper around the file finding logic.
+    This is a convenience wrapper around the file finding logic; ignored files are
+    left out unless include_ignored is True.
     """
-    result = _find_files(path=".", keyword=keyword, recursive=False)
+    result = _find_files(path=".", keyword=keyword, recursive=False,
+                         include_ignored=include_ignored)
     if isinstance(result, list) and result and not result[0].startswith("Error:"):
         return [os.path.basename(f) for f in result]
     return result
 
-def _find_files(path: str = ".", keyword: str = "", recursive: bool = True) -> List[str]:
+def _find_files(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    path: str = ".",
+    keyword: str = "",
+    recursive: bool = True,
+    include_ignored: bool = False,
+    glob: str = "",
+    regex: str = "",
+    max_results: Optional[int] = None,
+) -> List[str]:
     """
     Core implementation for finding files.
 
@@ -43,44 +150,197 @@ def _find_files(path: str = ".", keyword: str = "", recursive: bool = True) -> L
         path: Starting path for search (default is current directory)
         keyword: Optional keyword to filter filenames
         recursive: If True, search recursively; if False, only search immediate directory
+        include_ignored: If True, the repository's ignore files are not applied
+        glob: Optional glob of the path relative to the starting path
+        regex: Optional regex searched in the path relative to the starting path
+        max_results: Optional maximum number of files to return
     """
     try:
-        start_path = normalize_path(path)
+        start_path, found = _search_files(
+            _FileQuery(path, keyword, recursive, include_ignored, glob, regex),
+            limit=max_results)
+    except ValueError as e:
+        return [f"Error: {e}"]
+    except OSError as e:
+        return [f"Error finding files: {e}"]
+    return [os.path.join(start_path, rel_path) for rel_path in found]
 
-        if not _is_within_workspace(str(start_path)):
-            return [f"Error: Path '{path}' is outside the allowed workspace"]
 
-        if not start_path.exists():
-            return [f"Error: Path '{path}' does not exist"]
+def _search_files(query: _FileQuery, limit: Optional[int] = None,
+                  after: Optional[str] = None) -> Tuple[Path, List[str]]:
+    """
+    Look files up in the index of the starting directory's repository.
 
-        if not start_path.is_dir():
-            return [f"Error: '{path}' is not a directory"]
+    Returns:
+        The resolved starting directory and the matching paths relative to it.
 
-        files = []
+    Raises:
+        ValueError: If the starting path or the regex is invalid.
+        LookupError: If `after` is no longer in the listing.
+    """
+    start_path = _start_directory(query.path)
+    try:
+        matcher = PathMatcher(query.keyword, query.glob, query.regex)
+    except re.error as e:
+        raise ValueError(f"Invalid regex '{query.regex}': {e}") from e
 
-        if recursive:
-            # Recursive search using os.walk
-            for root, _, files_in_dir in os.walk(start_path):
-                # Skip .langgraph_api directory
-                if ".langgraph_api" in root:
-                    continue
-                for file in files_in_dir:
-                    if not keyword or keyword.strip() == "" or keyword in file:
-                        files.append(os.path.join(root, file))
-        else:
-            # Non-recursive search - only current directory
-            dir_items = os.listdir(start_path)
-            no_filter = not keyword or keyword.strip() == ""
-            files = [
-                str(start_path / item) for item in dir_items
-                if item != ".langgraph_api"
-                and (no_filter or keyword in item)
-                and (start_path / item).is_file()
-            ]
-
-        return files
+    index = file_index_for(_search_rules(start_path, query.include_ignored))
+    index.refresh()
+    # None only if the starting directory vanished since the refresh
+    found = index.find(_relative_dir(start_path, index.root), matcher,
+                       recursive=query.recursive, limit=limit, after=after)
+    return start_path, found or []
+
+
+@tool("search_code")
+@enforce_workspace_boundary
+def search_code(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    query: str,
+    path: str = ".",
+    literal: bool = False,
+    case_sensitive: bool = True,
+    glob: str = "",
+    context: int = 0,
+    max_results: int = SEARCH_CODE_MAX_RESULTS,
+) -> Dict[str, Any]:
+    """
+    Search the contents of the files below a path (default cwd) for a regex or a string.
+
+    Use this instead of reading files one by one to find definitions and usages.
+    The search is answered from a trigram index of the repository, kept up to date
+    as files change. Ignored files (see `find_files`), binary files and files over
+    1 MB are not searched. Lines are matched one at a time.
+
+    Args:
+        query: Python regex searched in each line, or a plain string if `literal` is True
+        path: Directory to search below (default is current directory)
+        literal: If True, `query` is searched as a plain string
+        case_sensitive: If False, letter case is ignored
+        glob: Optional glob of the paths relative to `path` to search ("**/*.py", "src/**")
+        context: Number of lines shown before and after each matching line
+        max_results: Maximum number of matching lines returned
+
+    Returns:
+        Dictionary with success, the absolute starting path, the matching lines by
+        file relative to it (grep style: "12:matching line", "11-context line",
+        "--" between distant matches), their count, the number of files read and
+        whether the search stopped at `max_results`.
+    """
+    try:
+        regex = re.compile(re.escape(query) if literal else query,
+                           re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+    except re.error as e:
+        return {"success": False, "error": f"Invalid regex '{query}': {e}"}
+    try:
+        start_path, candidates = _code_candidates(regex, path, glob)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
     except OSError as e:
-        return [f"Error finding files: {e}"]
+        return {"success": False, "error": f"Error searching code: {e}"}
+
+    return {"success": True, "path": str(start_path),
+            **_grep_files(start_path, candidates, regex, max(0, context), max(1, max_results))}
+
+
+def _code_candidates(regex: re.Pattern, path: str, glob: str = "") -> Tuple[Path, List[str]]:
+    """
+    Return the starting directory and the files below it (relative paths) that may match.
+
+    Raises:
+        ValueError: If the starting path or the glob is invalid.
+    """
+    start_path = _start_directory(path)
+    try:
+        matcher = PathMatcher(glob=glob)
+    except re.error as e:
+        raise ValueError(f"Invalid glob '{glob}': {e}") from e
+
+    files = file_index_for(_search_rules(start_path))
+    index = code_index_for(files)
+    index.refresh()
+    literals = required_literals(regex.pattern)
+    rel_dir = _relative_dir(start_path, files.root)
+    prefix = f"{rel_dir}/" if rel_dir else ""
+    trigrams = query_trigrams(literals, case_sensitive=not regex.flags & re.IGNORECASE)
+    return start_path, [rel_path[len(prefix):] for rel_path in index.candidates(trigrams)
+                        if rel_path.startswith(prefix) and matcher.matches(rel_path[len(prefix):])]
+
+
+def _grep_files(start_path: Path, rel_paths: List[str], regex: re.Pattern, context: int,
+                max_results: int) -> Dict[str, Any]:
+    """Search files in order until `max_results` lines matched; return the `search_code` results."""
+    matches: Dict[str, List[str]] = {}
+    count, searched, truncated = 0, 0, False
+    for rel_path in rel_paths:
+        if count == max_results:
+            truncated = True
+            break
+        searched += 1
+        lines, found = _grep_file(start_path / rel_path, regex, context, max_results - count)
+        if lines:
+            matches[rel_path] = lines
+            truncated = found > max_results - count
+            count += min(found, max_results - count)
+    return {"matches": matches, "count": count, "files_searched": searched,
+            "truncated": truncated}
+
+
+def _grep_file(path: Path, regex: re.Pattern, context: int, limit: int) -> Tuple[List[str], int]:
+    """
+    Search a file line by line.
+
+    Returns:
+        The grep style output of its first `limit` matching lines and the number
+        of lines matching in all.
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return [], 0
+    # Most candidates of the index do not match at all
+    if regex.search(text) is None:
+        return [], 0
+
+    lines = text.splitlines()
+    hits = [number for number, line in enumerate(lines) if regex.search(line)]
+    return _context_lines(lines, hits[:limit], context), len(hits)
+
+
+def _context_lines(lines: List[str], hits: List[int], context: int) -> List[str]:
+    """Format matching lines (0-based numbers) and the lines around them grep style."""
+    matching = set(hits)
+    output: List[str] = []
+    shown = -1
+    for number in hits:
+        first, last = max(number - context, shown + 1), min(number + context, len(lines) - 1)
+        if output and first > shown + 1:
+            output.append("--")
+        for position in range(first, last + 1):
+            marker = ":" if position in matching else "-"
+            output.append(f"{position + 1}{marker}{lines[position][:SEARCH_CODE_MAX_LINE_LENGTH]}")
+        shown = max(shown, last)
+    return output
+
+
+def _start_directory(path: str) -> Path:
+    """
+    Resolve the starting directory of a search.
+
+    Raises:
+        ValueError: If it is outside the workspace, does not exist or is not a directory.
+    """
+    start_path = normalize_path(path)
+
+    if not _is_within_workspace(str(start_path)):
+        raise ValueError(f"Path '{path}' is outside the allowed workspace")
+
+    if not start_path.exists():
+        raise ValueError(f"Path '{path}' does not exist")
+
+    if not start_path.is_dir():
+        raise ValueError(f"'{path}' is not a directory")
+    return start_path
 
 
 @tool("get_current_directory")
@@ -126,6 +386,9 @@ def change_directory(path: str) -> str:
 
         # Change directory
         os.chdir(target_path)
+        repository = find_ignore_root(target_path, boundary=AGENT_WORKSPACE_BASE_PATH)
+        if (repository / ".git").exists():
+            prefetch_repository(repository)
         return f"Successfully changed to: {os.getcwd()}"
     # pylint: disable=broad-exception-caught
     except Exception as e:
@@ -146,6 +409,7 @@ def navigate_to_repository(repo_name: str) -> str:
             return f"Error: '{repo_path}' is not a directory"
 
         os.chdir(repo_path)
+        prefetch_repository(repo_path)
         return f"Successfully navigated to repository: {os.getcwd()}"
     # pylint: disable=broad-exception-caught
     except Exception as e:
@@ -174,6 +438,53 @@ def list_repositories() -> str:
     except Exception as e:
         return f"Error listing repositories: {e}"
 
+def _ignore_rules(path: Path, include_ignored: bool = False) -> IgnoreRules:
+    """Return the shared ignore rules for walking a directory of the workspace."""
+    return ignore_rules_for(
+        find_ignore_root(path, boundary=AGENT_WORKSPACE_BASE_PATH),
+        NAVIGATION_IGNORE_PATTERNS,
+        ignore_files=() if include_ignored else IGNORE_FILENAMES,
+    )
+
+
+def _search_rules(start_path: Path, include_ignored: bool = False) -> IgnoreRules:
+    """
+    Return the ignore rules (and so the file index) to search a starting directory with.
+
+    These are the rules of its repository, unless the directory is ignored there
+    (e.g. node_modules/dep or a build output): searching it was asked for
+    explicitly, so it gets rules rooted at itself.
+    """
+    rules = _ignore_rules(start_path, include_ignored)
+    parts = start_path.relative_to(rules.root).parts
+    if any(rules.is_ignored(rules.root.joinpath(*parts[:depth]), is_dir=True)
+           for depth in range(1, len(parts) + 1)):
+        return ignore_rules_for(start_path, NAVIGATION_IGNORE_PATTERNS,
+                                ignore_files=rules.ignore_files)
+    return rules
+
+
+def _relative_dir(directory: Path, root: Path) -> str:
+    """Return a directory relative to a root with forward slashes ("" for the root itself)."""
+    rel_dir = Path(directory).relative_to(root).as_posix()
+    return "" if rel_dir == "." else rel_dir
+
+
+def _warm_file_index(path: Path, budget: PrefetchBudget) -> None:
+    """Prefetch warmer: refresh the file index of a repository (and compile its ignore rules)."""
+    # In this (low priority) thread, where the budget measures the CPU time
+    file_index_for(_ignore_rules(path)).refresh(check=budget.check, workers=1)
+
+
+def _warm_code_index(path: Path, budget: PrefetchBudget) -> None:
+    """Prefetch warmer: index the contents of the files of a repository for `search_code`."""
+    code_index_for(file_index_for(_ignore_rules(path))).refresh(check=budget.check, force=True)
+
+
+register_warmer("file_index", _warm_file_index)
+register_warmer("code_index", _warm_code_index)
+
+
 def resolve_repository_path(repo_name: str) -> Path:
     """Get the full path to a repository by name."""
     repository_root = (AGENT_WORKSPACE_BASE_PATH / REPOSITORIES_DIR).resolve()
@@ -0,0 +1,49 @@
+"""
+Pages of navigation results: opaque cursors and directory-grouped listings.
+
+A cursor carries the query of a listing and the last path returned, so the
+next call resumes the index scan right after that path without the caller
+repeating its arguments. Listings name the starting directory once and group
+the files by directory, instead of repeating the absolute path of every file.
+"""
+import base64
+import binascii
+import json
+import posixpath
+from typing import Any, Dict, List
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Return the opaque cursor of a (JSON serializable) listing state."""
+    data = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Return the listing state of a cursor.
+
+    Raises:
+        ValueError: If the cursor was not returned by `encode_cursor`.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor.strip() + "=" * (-len(cursor.strip()) % 4))
+        state = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(str(e)) from e
+    if not isinstance(state, dict):
+        raise ValueError("not a listing state")
+    return state
+
+
+def group_by_directory(paths: List[str]) -> Dict[str, List[str]]:
+    """
+    Group relative paths by directory ("." for the starting one), keeping their order.
+
+    Example: ["a.py", "src/b.py", "src/c.py"] -> {".": ["a.py"], "src": ["b.py", "c.py"]}
+    """
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        directory, name = posixpath.split(path)
+        groups.setdefault(directory or ".", []).append(name)
+    return groups
@@ -0,0 +1,208 @@
+"""
+Speculative background prefetch of the repository the agent enters.
+
+When `navigate_to_repository` or `change_directory` lands in a repository, the
+registered warmers (file index, extraction cache, dependency graph, ...) run
+on a low priority daemon thread, so the first search or extraction that follows
+finds their caches warm. Entering another repository cancels the running
+prefetch; entering a repository prefetched within PREFETCH_FRESH_SECONDS does
+nothing.
+
+A prefetch stops once it used PREFETCH_CPU_SECONDS of CPU time, and sleeps as
+needed to stay under PREFETCH_CPU_SHARE of one core. Warmers are registered by
+the modules owning the caches (`register_warmer`), so navigation does not
+depend on them; they call `budget.check()` between two units of work, which
+raises `PrefetchCancelled` when they have to stop.
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from src.agent.tools.navigation.config import (
+    PREFETCH_CPU_SECONDS,
+    PREFETCH_CPU_SHARE,
+    PREFETCH_FRESH_SECONDS,
+    PREFETCH_NICENESS,
+)
+
+
+class PrefetchCancelled(Exception):
+    """Raised inside a warmer whose prefetch was cancelled or ran out of CPU budget."""
+
+
+class PrefetchBudget:
+    """Cancellation flag and CPU budget of one prefetch, checked by its warmers."""
+
+    def __init__(self, cpu_seconds: float = PREFETCH_CPU_SECONDS,
+                 cpu_share: float = PREFETCH_CPU_SHARE):
+        self.cpu_seconds = cpu_seconds
+        self.cpu_share = cpu_share
+        self._cancelled = threading.Event()
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the prefetch was cancelled."""
+        return self._cancelled.is_set()
+
+    def start(self) -> None:
+        """Start measuring; CPU time is that of the calling (prefetch) thread."""
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.monotonic()
+
+    def cancel(self) -> None:
+        """Make the next `check` raise."""
+        self._cancelled.set()
+
+    def used(self) -> float:
+        """CPU seconds used by the prefetch thread so far."""
+        return time.thread_time() - self._cpu_start
+
+    def check(self) -> None:
+        """
+        Throttle the prefetch to its CPU share.
+
+        Raises:
+            PrefetchCancelled: If the prefetch was cancelled or used up its CPU budget.
+        """
+        if self.cancelled:
+            raise PrefetchCancelled("cancelled")
+        used = self.used()
+        if used > self.cpu_seconds:
+            raise PrefetchCancelled(f"CPU budget of {self.cpu_seconds:g}s used up")
+        delay = used / self.cpu_share - (time.monotonic() - self._wall_start)
+        if delay > 0 and self._cancelled.wait(delay):
+            raise PrefetchCancelled("cancelled")
+
+
+Warmer = Callable[[Path, PrefetchBudget], None]
+
+# Warmers run in registration order
+_WARMERS: Dict[str, Warmer] = {}
+
+
+def register_warmer(name: str, warmer: Warmer) -> None:
+    """Run `warmer(repository_path, budget)` whenever the agent enters a repository."""
+    _WARMERS[name] = warmer
+
+
+class Prefetcher:  # pylint: disable=too-many-instance-attributes
+    """Runs the warmers of one repository at a time on a background thread."""
+
+    def __init__(self, warmers: Optional[Dict[str, Warmer]] = None,
+                 cpu_seconds: float = PREFETCH_CPU_SECONDS,
+                 cpu_share: float = PREFETCH_CPU_SHARE,
+                 fresh_seconds: float = PREFETCH_FRESH_SECONDS):
+        self.warmers = _WARMERS if warmers is None else warmers
+        self.cpu_seconds = cpu_seconds
+        self.cpu_share = cpu_share
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._budget: Optional[PrefetchBudget] = None
+        self._status: Dict[str, Any] = {"status": "idle"}
+        # Repository path -> time.monotonic() its latest prefetch finished
+        self._finished: Dict[str, float] = {}
+
+    def schedule(self, path: Path) -> bool:
+        """
+        Start prefetching a repository, cancelling the prefetch of any other one.
+
+        Returns:
+            False if the repository is already being prefetched, or was prefetched
+            less than `fresh_seconds` ago.
+        """
+        path = Path(path)
+        with self._lock:
+            if self._status.get("path") == str(path) and self._status["status"] == "running":
+                return False
+            finished = self._finished.get(str(path))
+            if finished is not None and time.monotonic() - finished < self.fresh_seconds:
+                return False
+            if self._budget is not None:
+                self._budget.cancel()
+            budget = self._budget = PrefetchBudget(self.cpu_seconds, self.cpu_share)
+            status = self._status = {"path": str(path), "status": "running", "warmers": {}}
+            self._thread = threading.Thread(target=self._run, args=(path, budget, status),
+                                            name=f"prefetch-{path.name}", daemon=True)
+            self._thread.start()
+        return True
+
+    def cancel(self) -> bool:
+        """Cancel the running prefetch; returns False if none is running."""
+        with self._lock:
+            if self._budget is None or self._status["status"] != "running":
+                return False
+            self._budget.cancel()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the current prefetch finished; returns False on timeout."""
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        """Return the repository, status and per warmer outcome of the latest prefetch."""
+        with self._lock:
+            return {**self._status, "warmers": dict(self._status.get("warmers", {}))}
+
+    def _run(self, path: Path, budget: PrefetchBudget, status: Dict[str, Any]) -> None:
+        _lower_thread_priority()
+        budget.start()
+        outcome = "completed"
+        for name, warmer in list(self.warmers.items()):
+            try:
+                budget.check()
+                warmer(path, budget)
+                result = "done"
+            except PrefetchCancelled as e:
+                outcome = "cancelled" if budget.cancelled else "stopped"
+                result = f"{outcome}: {e}"
+            # A failing warmer must not keep the others from running
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                result = f"failed: {e}"
+            with self._lock:
+                status["warmers"][name] = result
+            if outcome != "completed":
+                break
+        with self._lock:
+            status.update(status=outcome, cpu_seconds=round(budget.used(), 3))
+            # A cancelled prefetch is resumed the next time the repository is entered
+            if outcome != "cancelled":
+                self._finished[str(path)] = time.monotonic()
+
+
+def _lower_thread_priority() -> None:
+    """Renice the calling thread, so a prefetch yields to the agent's own work."""
+    # Only Linux applies priorities to single threads (by their native id)
+    if sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+        except OSError:
+            pass
+
+
+_PREFETCHER = Prefetcher()
+
+
+def prefetch_repository(path: Path) -> bool:
+    """Start the shared background prefetch of a repository (see `Prefetcher.schedule`)."""
+    return _PREFETCHER.schedule(path)
+
+
+def cancel_prefetch() -> bool:
+    """Cancel the shared background prefetch."""
+    return _PREFETCHER.cancel()
+
+
+def prefetch_status() -> Dict[str, Any]:
+    """Return the status of the shared background prefetch."""
+    return _PREFETCHER.status()
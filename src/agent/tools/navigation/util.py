@@ -1,5 +1,7 @@
-"""Utility functions for path normalization and environment variable handling."""
+"""Utility functions for path normalization, environment variables and workspace caches."""
 import os
+import shutil
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -29,3 +31,33 @@ def get_workspace_root() -> Path:
     if not root_dir:
         raise ValueError("AGENT_WORKSPACE_BASE_PATH environment variable is not set")
     return normalize_path(root_dir)
+
+
+def evict_cache_entries(cache_root: Path, keep: Path, max_entries: int, max_age: float) -> int:
+    """
+    Mark an entry of a workspace cache as used and delete the stale ones.
+
+    Entries (files or directories directly under `cache_root`) are ordered by
+    mtime, which `keep` gets bumped to. Entries unused for `max_age` seconds and
+    the least recently used ones beyond `max_entries` are deleted.
+
+    Returns:
+        The number of entries deleted.
+    """
+    try:
+        if keep.exists():
+            os.utime(keep)
+        entries = sorted(((entry.stat().st_mtime, entry) for entry in os.scandir(cache_root)
+                          if entry.path != str(keep)),
+                         key=lambda item: item[0], reverse=True)
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    stale = [entry for position, (mtime, entry) in enumerate(entries)
+             if mtime < cutoff or position >= max_entries - 1]
+    for entry in stale:
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            Path(entry.path).unlink(missing_ok=True)
+    return len(stale)
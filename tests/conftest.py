@@ -1,8 +1,28 @@
 """Pytest configuration and fixtures."""
 import os
 
+import pytest
+
 def pytest_configure():  # noqa: ARG001
     """Configure pytest with required environment variables."""
     # Set default environment variables for testing
     if "AGENT_WORKSPACE_BASE_PATH" not in os.environ:
         os.environ["AGENT_WORKSPACE_BASE_PATH"] = "/tmp/test_workspace"
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_workspace_caches(tmp_path_factory):
+    """Keep the persistent caches (extractions, indexes, git mirrors) of a run in a tmp dir."""
+    # Imported here: the workspace path is read at import time, after pytest_configure
+    # pylint: disable=import-outside-toplevel
+    from src.agent.tools import git_helpers
+    from src.agent.tools.extraction import cache
+    from src.agent.tools.navigation import code_index, file_index
+
+    cache_root = tmp_path_factory.mktemp("caches")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(cache, "EXTRACTION_CACHE_ROOT", cache_root / "extractions")
+        monkeypatch.setattr(file_index, "FILE_INDEX_ROOT", cache_root / "file_index")
+        monkeypatch.setattr(code_index, "CODE_INDEX_ROOT", cache_root / "code_index")
+        monkeypatch.setattr(git_helpers, "MIRROR_CACHE_ROOT", cache_root / "mirrors")
+        yield cache_root
@@ -1,9 +1,17 @@
 """Unit tests for GitHub-related functions."""
+import asyncio
+import subprocess
 import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 import pytest
-from src.agent.tools.github import git_clone_tool
+from src.agent.tools.git_helpers import run_git_clone
+from src.agent.tools.github import (
+    git_clone_tool,
+    git_clone_async_tool,
+    list_branch_worktrees,
+    prune_branch_worktrees,
+)
 
 @pytest.mark.parametrize(
     "repo_url, dest, expected_dest_suffix, branch",
@@ -33,7 +41,9 @@ def test_git_clone_creates_repository_at_destination_based_on_url(repo_url,
 
             result = git_clone_tool.invoke({
                 "repo_url": repo_url,
-                "dest": dest
+                "dest": dest,
+                # clone_from is mocked: keep the (real) mirror cache out of it
+                "use_mirror": False,
             })
 
             assert result["success"] is True
@@ -88,7 +98,8 @@ def test_git_clone_destination_exists_with_overwrite():
             result = git_clone_tool.invoke({
                 "repo_url": "https://github.com/user/repo.git",
                 "dest": "existing_repo",
-                "overwrite": True
+                "overwrite": True,
+                "use_mirror": False,
             })
 
             assert result["success"] is True
@@ -96,3 +107,163 @@ def test_git_clone_destination_exists_with_overwrite():
             mock_clone.assert_called_once()
             destination = repo_dir / "existing_repo"
             mock_makedirs.assert_called_with(destination, exist_ok=True)
+
+
+def _make_bare_repository(root: Path) -> Path:
+    """Create a bare repository with two commits touching two subtrees."""
+    work = root / "work"
+    work.mkdir()
+    git = ["git", "-C", str(work), "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(["git", "init", "-q", "-b", "main", str(work)], check=True)
+    for commit, subtree in enumerate(["service_a", "service_b"]):
+        (work / subtree).mkdir()
+        (work / subtree / "main.py").write_text(f"print({commit})\n", encoding="utf-8")
+        subprocess.run([*git, "add", "-A"], check=True)
+        subprocess.run([*git, "commit", "-q", "-m", f"add {subtree}"], check=True)
+    bare = root / "source.git"
+    subprocess.run(["git", "clone", "-q", "--bare", str(work), str(bare)], check=True)
+    return bare
+
+
+def test_git_clone_shallow_sparse_from_local_bare_repository():
+    """Shallow, sparse clones work offline from a local bare repository."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bare = _make_bare_repository(Path(temp_dir))
+        repo_dir = Path(temp_dir) / "repositories"
+
+        with patch('src.agent.tools.github.resolve_repository_path', return_value=str(repo_dir)):
+            result = git_clone_tool.invoke({
+                "repo_url": str(bare),
+                "dest": "sparse_repo",
+                "depth": 1,
+                "clone_filter": "blob:none",
+                "sparse_paths": ["service_b"],
+            })
+
+        assert result["success"] is True, result["error"]
+        clone = Path(result["dest"])
+        assert (clone / "service_b" / "main.py").exists()
+        assert not (clone / "service_a").exists()
+        log = subprocess.run(["git", "-C", str(clone), "rev-list", "--count", "HEAD"],
+                             capture_output=True, text=True, check=True)
+        assert log.stdout.strip() == "1"
+
+
+def test_git_clone_reuses_local_mirror_on_second_clone():
+    """The first clone seeds a bare mirror which later clones reference."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bare = _make_bare_repository(Path(temp_dir))
+        repo_dir = Path(temp_dir) / "repositories"
+        mirror_root = Path(temp_dir) / "mirrors"
+        mirror_root.mkdir()
+
+        with patch('src.agent.tools.github.resolve_repository_path', return_value=str(repo_dir)), \
+             patch('src.agent.tools.git_helpers.MIRROR_CACHE_ROOT', mirror_root):
+            first = git_clone_tool.invoke({"repo_url": str(bare), "dest": "first"})
+            second = git_clone_tool.invoke({"repo_url": str(bare), "dest": "second"})
+
+        assert first["success"] is True and second["success"] is True
+        mirrors = list(mirror_root.glob("*.git"))
+        assert len(mirrors) == 1
+        alternates = Path(second["dest"]) / ".git" / "objects" / "info" / "alternates"
+        assert alternates.read_text(encoding="utf-8").strip() == str(mirrors[0] / "objects")
+        assert not (Path(first["dest"]) / ".git" / "objects" / "info" / "alternates").exists()
+
+
+def test_git_clone_branches_share_one_worktree_store():
+    """Cloning two branches creates two worktrees of a single bare store, each sparse."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bare = _make_bare_repository(Path(temp_dir))
+        # A feature branch diverging from main~1 with a subtree of its own
+        work = Path(temp_dir) / "work"
+        git = ["git", "-C", str(work), "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        subprocess.run([*git, "checkout", "-q", "-b", "feature", "main~1"], check=True)
+        for subtree in ("service_a", "service_c"):
+            (work / subtree / "feature.py").parent.mkdir(exist_ok=True)
+            (work / subtree / "feature.py").write_text("FEATURE = 1\n", encoding="utf-8")
+        subprocess.run([*git, "add", "-A"], check=True)
+        subprocess.run([*git, "commit", "-q", "-m", "add feature"], check=True)
+        subprocess.run([*git, "push", "-q", str(bare), "feature"], check=True)
+        repo_dir = Path(temp_dir) / "repositories"
+
+        with patch('src.agent.tools.github.resolve_repository_path',
+                   side_effect=lambda name: repo_dir / name):
+            main = git_clone_tool.invoke({"repo_url": str(bare), "dest": "multi",
+                                          "branch": "main", "use_mirror": False,
+                                          "sparse_paths": ["service_b"]})
+            feature = git_clone_tool.invoke({"repo_url": str(bare), "dest": "multi",
+                                             "branch": "feature", "use_mirror": False,
+                                             "sparse_paths": ["service_c"]})
+            checked_out = {result["dest"]: sorted(path.name for path in
+                                                  Path(result["dest"]).iterdir())
+                           for result in (main, feature)}
+            sparse = {result["dest"]: subprocess.run(
+                ["git", "-C", result["dest"], "sparse-checkout", "list"],
+                capture_output=True, text=True, check=True).stdout.split()
+                      for result in (main, feature)}
+            listed = list_branch_worktrees.invoke({"dest": "multi"})
+            pruned = prune_branch_worktrees.invoke({"dest": "multi", "branches": ["feature"]})
+
+        assert main["success"] is True, main["error"]
+        assert feature["success"] is True, feature["error"]
+        assert main["store"] == feature["store"]
+        # Each worktree has its own sparse paths, and only the files of its own branch
+        assert checked_out == {main["dest"]: [".git", "service_b"],
+                               feature["dest"]: [".git", "service_c"]}
+        assert sparse == {main["dest"]: ["service_b"], feature["dest"]: ["service_c"]}
+        assert sorted(w["branch"] for w in listed["worktrees"]) == ["feature", "main"]
+        assert pruned["removed"] == [feature["dest"]]
+        assert [w["branch"] for w in pruned["worktrees"]] == ["main"]
+
+
+def test_git_clone_async_streams_progress_and_times_out():
+    """The async clone reports git progress and removes a clone that times out."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bare = _make_bare_repository(Path(temp_dir))
+        repo_dir = Path(temp_dir) / "repositories"
+        repo_dir.mkdir()
+
+        progress = []
+        asyncio.run(run_git_clone(bare.as_uri(), repo_dir / "direct", {"depth": 1},
+                                  on_progress=progress.append))
+        assert (repo_dir / "direct" / "service_b" / "main.py").exists()
+        assert progress and all(0 <= event["percent"] <= 100 for event in progress)
+
+        with patch('src.agent.tools.github.resolve_repository_path', return_value=str(repo_dir)):
+            cloned = asyncio.run(git_clone_async_tool.ainvoke({
+                "repo_url": str(bare), "dest": "async_repo", "use_mirror": False,
+            }))
+            timed_out = asyncio.run(git_clone_async_tool.ainvoke({
+                "repo_url": str(bare), "dest": "slow_repo", "use_mirror": False, "timeout": 0,
+            }))
+
+        assert cloned["success"] is True and cloned["branch"] == "main"
+        assert timed_out["success"] is False and "timed out" in timed_out["error"]
+        assert not (repo_dir / "slow_repo").exists()
+
+
+def test_git_clone_async_fetches_the_branch_store_within_the_timeout():
+    """Checking out another branch fetches the existing store asynchronously, with the timeout."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bare = _make_bare_repository(Path(temp_dir))
+        subprocess.run(["git", "-C", str(bare), "branch", "feature", "main~1"], check=True)
+        repo_dir = Path(temp_dir) / "repositories"
+        repo_dir.mkdir()
+
+        with patch('src.agent.tools.github.resolve_repository_path', return_value=str(repo_dir)):
+            main = asyncio.run(git_clone_async_tool.ainvoke({
+                "repo_url": str(bare), "dest": "multi", "branch": "main", "use_mirror": False,
+            }))
+            timed_out = asyncio.run(git_clone_async_tool.ainvoke({
+                "repo_url": str(bare), "dest": "multi", "branch": "feature",
+                "use_mirror": False, "timeout": 0,
+            }))
+            feature = asyncio.run(git_clone_async_tool.ainvoke({
+                "repo_url": str(bare), "dest": "multi", "branch": "feature", "use_mirror": False,
+            }))
+
+        assert main["success"] is True, main["error"]
+        assert timed_out["success"] is False and "Fetch timed out" in timed_out["error"]
+        assert feature["success"] is True, feature["error"]
+        assert feature["store"] == main["store"]
+        assert (Path(feature["dest"]) / "service_a" / "main.py").exists()
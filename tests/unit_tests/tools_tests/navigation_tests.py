@@ -0,0 +1,405 @@
+"""Unit tests for the navigation helpers."""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src.agent.tools.gitingest_helpers import build_query
+from src.agent.tools.navigation.code_index import CodeIndex, query_trigrams, required_literals
+from src.agent.tools.navigation.config import AGENT_WORKSPACE_BASE_PATH
+from src.agent.tools.navigation.file_index import FileIndex, PathMatcher
+from src.agent.tools.navigation.file_management import read_file
+from src.agent.tools.navigation.ignore import IgnoreRules
+from src.agent.tools.navigation.navigation import (
+    _find_files,
+    find_files,
+    list_files_in_directory,
+    search_code,
+)
+from src.agent.tools.navigation.prefetch import Prefetcher
+from src.agent.tools.navigation.util import evict_cache_entries
+
+
+def _make_repository(root: Path) -> None:
+    """Create a repository with ignore files at two levels."""
+    (root / ".git").mkdir()
+    (root / ".git" / "config").write_text("[core]\n", encoding="utf-8")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "node_modules" / "dep" / "index.js").write_text("module.exports = 1;\n",
+                                                            encoding="utf-8")
+    (root / "src" / "generated").mkdir(parents=True)
+    (root / "src" / "main.py").write_text("print('main')\n", encoding="utf-8")
+    (root / "src" / "debug.log").write_text("log\n", encoding="utf-8")
+    (root / "src" / "generated" / "api.py").write_text("API = 1\n", encoding="utf-8")
+    (root / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (root / "src" / ".gitignore").write_text("generated/\n", encoding="utf-8")
+
+
+def test_find_files_skips_ignored_files_and_directories():
+    """Ignored files, nested ignore rules and node_modules/.git are left out of the search."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+
+        found = {os.path.relpath(path, repo) for path in _find_files(temp_dir)}
+        assert found == {".gitignore", "src/.gitignore", "src/main.py"}
+
+        everything = {os.path.relpath(path, repo)
+                      for path in _find_files(temp_dir, include_ignored=True)}
+        assert {"src/debug.log", "src/generated/api.py"} <= everything
+        assert not any(path.startswith(("node_modules", ".git/")) for path in everything)
+
+        listed = {os.path.basename(path)
+                  for path in _find_files(str(repo / "src"), recursive=False)}
+        assert listed == {".gitignore", "main.py"}
+
+
+def test_an_ignored_directory_asked_for_explicitly_is_searched():
+    """Starting a search in an ignored directory lists and searches its files."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        (repo / "src" / "generated" / "nested").mkdir()
+        (repo / "src" / "generated" / "nested" / "client.py").write_text(
+            "def client():\n    return API\n", encoding="utf-8")
+
+        found = {os.path.relpath(path, repo)
+                 for path in _find_files(str(repo / "node_modules" / "dep"))}
+        assert found == {"node_modules/dep/index.js"}
+        found = {os.path.relpath(path, repo)
+                 for path in _find_files(str(repo / "src" / "generated"), include_ignored=True)}
+        assert found == {"src/generated/api.py", "src/generated/nested/client.py"}
+
+        cwd = os.getcwd()
+        os.chdir(repo / "src" / "generated")
+        try:
+            assert list_files_in_directory.invoke({}) == ["api.py"]
+            found = search_code.invoke({"query": "API"})
+            assert found["matches"] == {"api.py": ["1:API = 1"],
+                                        "nested/client.py": ["2:    return API"]}
+            found = search_code.invoke({"query": "module.exports", "literal": True,
+                                        "path": str(repo / "node_modules")})
+            assert list(found["matches"]) == ["dep/index.js"]
+        finally:
+            os.chdir(cwd)
+
+
+def test_ignore_rules_are_cached_until_an_ignore_file_changes():
+    """Ingestion reuses the collected patterns and picks up edited ignore files."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+
+        rules = IgnoreRules(repo, base_patterns={"node_modules"})
+        assert rules.patterns() == {"*.log", "src/generated"}
+        assert rules.is_ignored(repo / "src" / "generated" / "api.py")
+        assert not rules.is_ignored(repo / "src" / "main.py")
+
+        (repo / "src" / ".gitignore").write_text("generated/\n*.tmp\n", encoding="utf-8")
+        assert rules.patterns() == {"*.log", "src/generated", "src/*.tmp"}
+
+        query = build_query(temp_dir)
+        assert {"*.log", "src/generated", "src/*.tmp"} <= query.ignore_patterns
+
+
+def test_file_index_answers_lookups_and_refreshes_incrementally():
+    """Substring, glob and regex lookups; only changed directories are listed again."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        (repo / "src" / "app").mkdir()
+        (repo / "src" / "app" / "config.yaml").write_text("debug: true\n", encoding="utf-8")
+        (repo / "src" / "app" / "test_config.py").write_text("", encoding="utf-8")
+
+        def found(path=".", **filters):
+            return {os.path.relpath(result, repo) for result in _find_files(
+                os.path.join(temp_dir, path), **filters)}
+
+        assert found(keyword="config") == {"src/app/config.yaml", "src/app/test_config.py"}
+        assert found(glob="*.py") == {"src/main.py", "src/app/test_config.py"}
+        assert found(glob="src/*.py") == {"src/main.py"}
+        assert found("src", glob="**/test_*.py") == {"src/app/test_config.py"}
+        assert found("src", regex=r"^app/.*\.yaml$") == {"src/app/config.yaml"}
+        assert found("src", keyword="app") == set()
+        assert _find_files(temp_dir, regex="(")[0].startswith("Error: Invalid regex")
+
+        (repo / "src" / "app" / "settings.py").write_text("", encoding="utf-8")
+        (repo / "src" / "generated" / "api.py").unlink()
+        (repo / "src" / ".gitignore").write_text("app/\n", encoding="utf-8")
+        assert found("src") == {"src/.gitignore", "src/main.py"}
+        # An ignored directory is only searched when asked for explicitly
+        assert found("src/app") == found("src/app", include_ignored=True) == {
+            "src/app/config.yaml", "src/app/settings.py", "src/app/test_config.py"}
+
+        with tempfile.TemporaryDirectory() as index_dir:
+            index_file = Path(index_dir) / "index.json"
+            assert FileIndex(IgnoreRules(repo, {".git", "node_modules"}), index_file).refresh() == 3
+            reloaded = FileIndex(IgnoreRules(repo, {".git", "node_modules"}), index_file)
+            assert reloaded.refresh() == 0
+            assert reloaded.find("", PathMatcher(keyword="main")) == ["src/main.py"]
+
+            (repo / "docs").mkdir()
+            (repo / "docs" / "main.md").write_text("# Main\n", encoding="utf-8")
+            assert reloaded.refresh() == 2
+            assert reloaded.find("", PathMatcher(keyword="main")) == ["docs/main.md",
+                                                                      "src/main.py"]
+
+
+def test_parallel_refresh_prunes_ignored_directories_and_results_stop_at_the_limit():
+    """Threads list the same tree; negated patterns still re-include files."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        (repo / ".gitignore").write_text("*.log\n!keep.log\nbuild/\n", encoding="utf-8")
+        (repo / "src" / "keep.log").write_text("kept\n", encoding="utf-8")
+        for number in range(20):
+            package = repo / "packages" / f"package_{number:02}"
+            (package / "build").mkdir(parents=True)
+            (package / "build" / "config.json").write_text("{}\n", encoding="utf-8")
+            (package / "config.json").write_text("{}\n", encoding="utf-8")
+
+        rules = IgnoreRules(repo, {".git", "node_modules"})
+        parallel, sequential = FileIndex(rules), FileIndex(rules)
+        assert parallel.refresh(workers=4) == sequential.refresh(workers=1) == 23
+        everything = PathMatcher()
+        assert parallel.find("", everything) == sequential.find("", everything)
+        assert "src/keep.log" in parallel.find("", everything)
+        assert not parallel.find("", PathMatcher(glob="**/build/*"))
+
+        assert len(_find_files(temp_dir, keyword="config", max_results=5)) == 5
+        assert len(_find_files(temp_dir, max_results=3)) == 3
+        assert len(_find_files(temp_dir, keyword="config")) == 20
+
+
+def test_find_files_pages_results_with_a_cursor_and_groups_them_by_directory():
+    """Following the cursors lists every file once; directories are named once."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        for name in ("a.py", "b.py", "c.py"):
+            (repo / "src" / "app").mkdir(exist_ok=True)
+            (repo / "src" / "app" / name).write_text("", encoding="utf-8")
+
+        cwd = os.getcwd()
+        os.chdir(temp_dir)
+        try:
+            first = find_files.invoke({"path": "src", "max_results": 2})
+            assert first["success"] and first["path"] == str(repo / "src")
+            assert first["files"] == {".": [".gitignore", "main.py"]}
+
+            pages, cursor = [first], first["next_cursor"]
+            while cursor:
+                pages.append(find_files.invoke({"cursor": cursor, "max_results": 2}))
+                cursor = pages[-1]["next_cursor"]
+            assert [page["files"] for page in pages[1:]] == [
+                {"app": ["a.py", "b.py"]}, {"app": ["c.py"]}]
+
+            flat = find_files.invoke({"path": "src", "keyword": "py", "grouped": False})
+            assert flat["files"] == ["main.py", "app/a.py", "app/b.py", "app/c.py"]
+            assert flat["next_cursor"] is None
+
+            (repo / "src" / "app" / "a.py").unlink()
+            stale = find_files.invoke({"cursor": first["next_cursor"], "max_results": 2})
+            assert stale["files"] == {"app": ["b.py", "c.py"]}
+            assert not find_files.invoke({"cursor": "not-a-cursor"})["success"]
+        finally:
+            os.chdir(cwd)
+
+
+def test_search_code_finds_lines_with_context_and_follows_file_changes():
+    """Searches read only the candidate files of the index, which picks up edits."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        (repo / "src" / "util.py").write_text(
+            "import os\n\n\ndef load(path):\n    return open(path).read()\n",
+            encoding="utf-8")
+        (repo / "src" / "data.bin").write_bytes(b"\0def load(path)")
+        (repo / "README.md").write_text("Call load(path) to read a file.\n", encoding="utf-8")
+
+        cwd = os.getcwd()
+        os.chdir(temp_dir)
+        try:
+            found = search_code.invoke({"query": "load(path)", "literal": True})
+            assert found["success"] and found["count"] == 2
+            assert found["matches"] == {"README.md": ["1:Call load(path) to read a file."],
+                                        "src/util.py": ["4:def load(path):"]}
+            assert found["files_searched"] == 2
+
+            found = search_code.invoke({"query": r"^def \w+\(", "path": "src", "context": 1})
+            assert found["matches"] == {"util.py": ["3-", "4:def load(path):",
+                                                    "5-    return open(path).read()"]}
+            found = search_code.invoke({"query": "LOAD", "case_sensitive": False,
+                                        "glob": "*.md"})
+            assert list(found["matches"]) == ["README.md"]
+            found = search_code.invoke({"query": "o", "max_results": 2})
+            assert found["count"] == 2 and found["truncated"]
+            assert not search_code.invoke({"query": "load("})["success"]
+        finally:
+            os.chdir(cwd)
+
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = CodeIndex(FileIndex(IgnoreRules(repo, (".git", "node_modules"))),
+                              Path(index_dir))
+            assert index.refresh(force=True) == 6
+            # The binary file is not indexed
+            assert index.candidates(query_trigrams(required_literals(r"def load\("))) == [
+                "src/util.py"]
+            (repo / "src" / "util.py").write_text("def save(path):\n", encoding="utf-8")
+            (repo / "src" / "new.py").write_text("load()\n", encoding="utf-8")
+            # A segment another process just built is not deleted by this one's save
+            (Path(index_dir) / "other.bin").write_bytes(b"")
+            assert index.refresh(force=True) == 2
+            assert (Path(index_dir) / "other.bin").exists()
+            assert index.candidates(query_trigrams(["load"])) == ["README.md", "src/new.py"]
+            reloaded = CodeIndex(index.files, Path(index_dir))
+            assert reloaded.refresh(force=True) == 0
+            assert reloaded.candidates(query_trigrams(["save"])) == ["src/util.py"]
+
+
+def test_a_search_refresh_takes_over_from_a_background_refresh():
+    """A refresh without a check does not wait for a throttled refresh to finish its build."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        _make_repository(repo)
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = CodeIndex(FileIndex(IgnoreRules(repo, (".git", "node_modules"))),
+                              Path(index_dir))
+            throttled, resume = threading.Event(), threading.Event()
+
+            def slow_check():
+                throttled.set()
+                resume.wait(10)
+
+            indexed = []
+            background = threading.Thread(
+                target=lambda: indexed.append(index.refresh(check=slow_check, force=True)))
+            background.start()
+            assert throttled.wait(10)
+            threading.Timer(0.2, resume.set).start()
+            # The background refresh stops at its next check and this one indexes everything
+            assert index.refresh() == 3
+            background.join(10)
+            assert indexed == [0]
+            assert index.candidates(query_trigrams(["main"])) == ["src/main.py"]
+            assert index.refresh(force=True) == 0
+
+
+def test_read_file_reads_ranges_in_capped_pages_and_stubs_binary_files():
+    """Large reads end with a cursor to the rest; following it returns every line once."""
+    with tempfile.TemporaryDirectory(dir=AGENT_WORKSPACE_BASE_PATH) as temp_dir:
+        repo = Path(temp_dir)
+        (repo / "notes.txt").write_text("".join(f"line {i}\n" for i in range(1, 101)),
+                                        encoding="utf-8")
+        (repo / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+
+        cwd = os.getcwd()
+        os.chdir(temp_dir)
+        try:
+            assert read_file.invoke({"file_path": "notes.txt"}).startswith("line 1\nline 2\n")
+            assert read_file.invoke({"file_path": "notes.txt", "start_line": 99}) == (
+                "line 99\nline 100\n")
+            assert read_file.invoke({"file_path": "notes.txt", "start_line": 3,
+                                     "end_line": 4}) == "line 3\nline 4\n"
+            assert read_file.invoke({"file_path": "notes.txt", "byte_offset": 7,
+                                     "byte_count": 6}) == "line 2"
+
+            page = read_file.invoke({"file_path": "notes.txt", "start_line": 10,
+                                     "max_bytes": 50})
+            text = ""
+            while "cursor=" in page:
+                text += page.split("\n[Truncated: showed lines ")[0]
+                page = read_file.invoke({"cursor": page.split('cursor="')[1].split('"')[0],
+                                         "max_bytes": 50})
+            assert text + page == "".join(f"line {i}\n" for i in range(10, 101))
+
+            assert read_file.invoke({"file_path": "image.png"}).startswith("Binary file")
+            assert "past the end" in read_file.invoke({"file_path": "notes.txt",
+                                                       "start_line": 200})
+            assert "Invalid cursor" in read_file.invoke({"cursor": "not-a-cursor"})
+        finally:
+            os.chdir(cwd)
+
+
+def test_cache_eviction_keeps_the_entry_in_use_and_the_most_recent_ones():
+    """Entries past the age limit or beyond the entry limit are deleted, oldest first."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        root = Path(cache_dir)
+        for age, name in enumerate(["new", "recent", "old", "used", "expired"]):
+            entry = root / name
+            if name == "recent":
+                entry.mkdir()
+                (entry / "manifest.json").write_text("{}", encoding="utf-8")
+            else:
+                entry.write_text("", encoding="utf-8")
+            mtime = time.time() - (10_000 if name == "expired" else age * 60)
+            os.utime(entry, (mtime, mtime))
+
+        assert evict_cache_entries(root, root / "used", max_entries=3, max_age=3600) == 2
+        assert sorted(path.name for path in root.iterdir()) == ["new", "recent", "used"]
+        assert time.time() - (root / "used").stat().st_mtime < 60
+
+
+def test_cache_eviction_handles_entries_with_the_same_mtime():
+    """Entries created at the same time are ordered without comparing them."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        root = Path(cache_dir)
+        mtime = time.time() - 60
+        for name in ["a", "b", "c", "d", "used"]:
+            entry = root / name
+            entry.mkdir()
+            os.utime(entry, (mtime, mtime))
+
+        assert evict_cache_entries(root, root / "used", max_entries=3, max_age=3600) == 2
+        assert len(list(root.iterdir())) == 3
+        assert (root / "used").exists()
+
+
+def test_prefetch_runs_warmers_and_is_cancelled_by_the_next_repository():
+    """Entering another repository cancels the running prefetch; a budget stops it."""
+    warmed = []
+
+    def record(path, _budget):
+        warmed.append(path.name)
+
+    def loop(_path, budget):
+        while True:
+            budget.check()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first, second = Path(temp_dir) / "first", Path(temp_dir) / "second"
+        prefetcher = Prefetcher({"record": record})
+        assert prefetcher.schedule(first)
+        assert prefetcher.wait(timeout=10)
+        assert warmed == ["first"]
+        assert prefetcher.status()["status"] == "completed"
+        assert prefetcher.status()["warmers"] == {"record": "done"}
+        # Entering the repository again right away (e.g. a subdirectory) warms nothing
+        assert not prefetcher.schedule(first)
+        prefetcher.fresh_seconds = 0
+        assert prefetcher.schedule(first)
+        assert prefetcher.wait(timeout=10)
+        assert warmed == ["first", "first"]
+
+        prefetcher = Prefetcher({"loop": loop, "record": record})
+        assert prefetcher.schedule(first)
+        assert not prefetcher.schedule(first)
+        first_run = prefetcher._thread  # pylint: disable=protected-access
+        assert prefetcher.schedule(second)
+        first_run.join(timeout=10)
+        assert not first_run.is_alive()
+        assert prefetcher.status()["path"] == str(second)
+        assert prefetcher.cancel()
+        assert prefetcher.wait(timeout=10)
+        assert prefetcher.status()["status"] == "cancelled"
+        assert warmed == ["first", "first"]
+        # Cancelled prefetches are not fresh
+        assert prefetcher.schedule(first)
+        assert prefetcher.cancel()
+        assert prefetcher.wait(timeout=10)
+
+        prefetcher = Prefetcher({"loop": loop}, cpu_seconds=0.05, cpu_share=1.0)
+        prefetcher.schedule(first)
+        assert prefetcher.wait(timeout=10)
+        assert prefetcher.status()["status"] == "stopped"